@@ -0,0 +1,77 @@
+"""
+Micro-benchmark: single-pass code extraction vs the legacy regex/split chain
+
+    python benchmarks/bench_extraction.py
+
+On responses with color codes on every line, removing the escape
+sequences dominates both extractors and costs the same in each (one
+regex substitution per sequence), so there the single-pass extractor is
+only slightly ahead and within run-to-run noise; the "ansi" column shows
+that shared cost.
+"""
+import os
+import re
+import sys
+import timeit
+
+# Runnable from a checkout without installing the package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from codeweaver.extraction import ANSI_PATTERN, extract_code
+
+def legacy_extract(content):
+    """The post-processing chain CodingAgent.generate used to run"""
+    content = content.strip()
+    content = re.sub(r'\x1b\[\d+m', '', content)
+    if "> Code:" in content:
+        code = content.split("> Code:")[1].strip()
+    else:
+        code = content
+    if "INFO -" in code:
+        code = code.split("INFO -")[0].strip()
+    code = re.sub(r'\x1b\[\d+m', '', code)
+    return code
+
+def build_body(size):
+    """Build roughly `size` characters of Python code"""
+    lines = []
+    total = 0
+    i = 0
+    while total < size:
+        line = f"    value_{i} = compute({i}) if x > LIMIT else data[i - 1]  # step {i}\n"
+        lines.append(line)
+        total += len(line)
+        i += 1
+    return "def generated():\n" + "".join(lines) + "    return value_0\n"
+
+def build_camel_response(size):
+    """A verbose CAMEL response: colored labels and a trailing log line"""
+    return (
+        "\x1b[35m> Explanation:\nThe function computes values.\n"
+        "\x1b[35m> Code:\n" + build_body(size) +
+        "2024-12-08 20:45:02,014 - camel - INFO - Step finished\n"
+    )
+
+def build_colored_response(size):
+    """A CAMEL response with color codes on every line"""
+    body = re.sub(r'(\d+)\)', '\x1b[32m\\1\x1b[0m)', build_body(size))
+    return "\x1b[35m> Code:\n" + body
+
+def main():
+    """Time both extractors on increasingly large responses"""
+    print("\nCode extraction benchmark")
+    print("-" * 40)
+    for name, build in (("camel", build_camel_response), ("colored", build_colored_response)):
+        for size in (10_000, 100_000, 1_000_000):
+            response = build(size)
+            number = max(1, 2_000_000 // size)
+            legacy = min(timeit.repeat(lambda: legacy_extract(response), number=number, repeat=5)) / number
+            single = min(timeit.repeat(lambda: extract_code(response), number=number, repeat=5)) / number
+            ansi = min(timeit.repeat(lambda: ANSI_PATTERN.sub('', response), number=number,
+                                     repeat=5)) / number
+            print(f"{name:>8} {len(response):>9} chars  legacy {legacy * 1e3:8.3f} ms  "
+                  f"single-pass {single * 1e3:8.3f} ms  speedup {legacy / single:5.2f}x  "
+                  f"ansi {ansi * 1e3:8.3f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Load test: drive CodingAgent against the local mock LLM server
+
+Runs offline through the real client path (AsyncOpenAI, connection pool,
+scheduler, extraction) and reports throughput, latency percentiles,
+time to first token and memory for each calling style.
+
+    python benchmarks/bench_load.py --requests 200 --concurrency 16 --latency 0.05
+"""
+import argparse
+import asyncio
+import logging
+import os
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+
+# Runnable from a checkout without installing the package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from codeweaver.agent import CodingAgent, CodingTask
+from codeweaver.backends import create_backend
+from codeweaver.mock_server import MockLLMServer
+
+MODES = ("sync", "batch", "async", "stream")
+
+def percentiles(samples):
+    """Return p50, p95 and p99 of a list of seconds, in milliseconds"""
+    if len(samples) < 2:
+        value = samples[0] * 1e3 if samples else float("nan")
+        return value, value, value
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return cuts[49] * 1e3, cuts[94] * 1e3, cuts[98] * 1e3
+
+def run_sync(agent, tasks, concurrency):
+    """Blocking generate calls, one after another"""
+    latencies = []
+    for task in tasks:
+        start = time.perf_counter()
+        agent.generate(task)
+        latencies.append(time.perf_counter() - start)
+    return latencies, []
+
+def run_batch(agent, tasks, concurrency):
+    """generate_many with bounded concurrency"""
+    results = agent.generate_many(tasks, concurrency=concurrency)
+    return [result.elapsed for result in results], []
+
+def run_async(agent, tasks, concurrency):
+    """agenerate calls gathered under a semaphore"""
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+
+        async def one(task):
+            async with semaphore:
+                start = time.perf_counter()
+                await agent.agenerate(task)
+                latencies.append(time.perf_counter() - start)
+
+        await asyncio.gather(*(one(task) for task in tasks))
+        await agent.aclose()
+        return latencies, []
+    return asyncio.run(main())
+
+def run_stream(agent, tasks, concurrency):
+    """astream calls gathered under a semaphore, timing the first chunk"""
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+        first_tokens = []
+
+        async def one(task):
+            async with semaphore:
+                start = time.perf_counter()
+                first = None
+                async for _ in agent.astream(task):
+                    if first is None:
+                        first = time.perf_counter() - start
+                latencies.append(time.perf_counter() - start)
+                first_tokens.append(first)
+
+        await asyncio.gather(*(one(task) for task in tasks))
+        await agent.aclose()
+        return latencies, first_tokens
+    return asyncio.run(main())
+
+RUNNERS = {"sync": run_sync, "batch": run_batch, "async": run_async, "stream": run_stream}
+
+def bench(mode, server, args):
+    """Run one mode and return its report row"""
+    backend = create_backend("local", base_url=server.base_url, api_key="bench",
+                             max_connections=args.concurrency)
+    backend.scheduler.base_delay = 0.05
+    agent = CodingAgent(model=backend, max_connections=args.concurrency)
+    tasks = [CodingTask(f"Task {i}: double a number") for i in range(args.requests)]
+    served, errors = server.requests, server.errors
+
+    if args.trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    latencies, first_tokens = RUNNERS[mode](agent, tasks, args.concurrency)
+    wall = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 2**20 if args.trace_memory else None
+    if args.trace_memory:
+        tracemalloc.stop()
+    agent.close()
+
+    p50, p95, p99 = percentiles(latencies)
+    return {
+        "mode": mode,
+        "throughput": len(latencies) / wall,
+        "p50": p50, "p95": p95, "p99": p99,
+        "ttft": percentiles(first_tokens)[0] if first_tokens else None,
+        "upstream": server.requests - served,
+        "errors": server.errors - errors,
+        "peak": peak
+    }
+
+def main():
+    """Benchmark each calling style against a fresh mock server"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.05, help="Median upstream latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.3, help="Log-normal sigma of latency")
+    parser.add_argument("--tokens-per-second", type=float, default=500.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Report tracemalloc peaks (slows the run)")
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    print(f"\nLoad benchmark: {args.requests} requests, concurrency {args.concurrency}, "
+          f"latency {args.latency * 1e3:.0f} ms (sigma {args.jitter}), "
+          f"{args.tokens_per_second:.0f} tok/s, error rate {args.error_rate:.0%}")
+    header = (f"{'mode':<8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+              f"{'ttft ms':>8} {'upstream':>9} {'errors':>7} {'peak MiB':>9}")
+    print(header)
+    print("-" * len(header))
+    for mode in args.modes:
+        with MockLLMServer(latency=args.latency, jitter=args.jitter,
+                           tokens_per_second=args.tokens_per_second,
+                           error_rate=args.error_rate, seed=0) as server:
+            row = bench(mode, server, args)
+        ttft = f"{row['ttft']:8.1f}" if row["ttft"] is not None else f"{'-':>8}"
+        peak = f"{row['peak']:9.2f}" if row["peak"] is not None else f"{'-':>9}"
+        print(f"{row['mode']:<8} {row['throughput']:8.1f} {row['p50']:8.1f} {row['p95']:8.1f} "
+              f"{row['p99']:8.1f} {ttft} {row['upstream']:9d} {row['errors']:7d} {peak}")
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"\nMax RSS: {rss:.1f} MiB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Benchmark: snippet execution on a warm sandbox pool vs a cold interpreter per snippet
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+# Runnable from a checkout without installing the package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from codeweaver.sandbox import DEFAULT_PRELOAD, SandboxPool
+
+SNIPPET = (
+    "import json, re, unittest\n"
+    "def add(a, b):\n"
+    "    return a + b\n"
+    "assert add(2, 3) == 5\n"
+)
+
+async def cold(runs):
+    """Start a fresh interpreter for every snippet, as a one-shot executor would"""
+    times = []
+    preload = "import " + ", ".join(DEFAULT_PRELOAD) + "\n"
+    for _ in range(runs):
+        start = time.perf_counter()
+        process = await asyncio.create_subprocess_exec(sys.executable, "-c", preload + SNIPPET)
+        await process.wait()
+        times.append(time.perf_counter() - start)
+    return times
+
+async def warm(runs):
+    """Run every snippet on an already started pool"""
+    async with SandboxPool(size=2) as pool:
+        times = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            await pool.run(SNIPPET)
+            times.append(time.perf_counter() - start)
+    return times
+
+def main():
+    """Compare median per-snippet latency"""
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    print(f"\nSandbox benchmark (median of {runs} runs)")
+    print("-" * 40)
+    for name, bench in (("cold interpreter per snippet", cold), ("warm pool", warm)):
+        median = statistics.median(asyncio.run(bench(runs)))
+        print(f"{name:<30} {median * 1e3:8.2f} ms")
+
+if __name__ == "__main__":
+    main()
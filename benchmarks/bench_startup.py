@@ -0,0 +1,59 @@
+"""
+Benchmark: import time and agent construction time for CodeWeaver
+"""
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Each snippet runs in a fresh interpreter and prints its own timing, so
+# interpreter startup is excluded from the numbers
+SNIPPETS = {
+    "import codeweaver.agent": (
+        "import time; start = time.perf_counter()\n"
+        "import codeweaver.agent\n"
+        "print(time.perf_counter() - start)"
+    ),
+    "CodingAgent(model='deepseek')": (
+        "import time; start = time.perf_counter()\n"
+        "from codeweaver.agent import CodingAgent\n"
+        "CodingAgent(model='deepseek')\n"
+        "print(time.perf_counter() - start)"
+    ),
+    "CodingAgent() + system message": (
+        "import time; start = time.perf_counter()\n"
+        "from codeweaver.agent import CodingAgent\n"
+        "CodingAgent().system_message\n"
+        "print(time.perf_counter() - start)"
+    ),
+    "import camel + openai (eager baseline)": (
+        "import time; start = time.perf_counter()\n"
+        "import openai, camel.agents, camel.generators, camel.messages\n"
+        "print(time.perf_counter() - start)"
+    ),
+}
+
+def measure(snippet, runs):
+    """Return the median time reported by a snippet over several runs"""
+    env = dict(os.environ, OPENAI_API_KEY="bench", DEEPSEEK_API_KEY="bench",
+               PYTHONPATH=str(ROOT))
+    times = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", snippet], env=env, cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout
+        times.append(float(output.strip().splitlines()[-1]))
+    return statistics.median(times)
+
+def main():
+    """Time each startup step in fresh interpreters"""
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f"\nStartup benchmark (median of {runs} runs)")
+    print("-" * 40)
+    for name, snippet in SNIPPETS.items():
+        print(f"{name:<40} {measure(snippet, runs) * 1e3:8.1f} ms")
+
+if __name__ == "__main__":
+    main()
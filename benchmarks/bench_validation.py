@@ -0,0 +1,67 @@
+"""
+Benchmark: static validation of generated code vs running its tests in the sandbox
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+import timeit
+
+# Runnable from a checkout without installing the package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from codeweaver.sandbox import SandboxPool
+from codeweaver.validation import CodeValidator
+from codeweaver.verify import build_test_program
+
+TESTS = (
+    "import unittest\n"
+    "class TestFibonacci(unittest.TestCase):\n"
+    "    def test_values(self):\n"
+    "        self.assertEqual([fibonacci(i) for i in range(6)], [0, 1, 1, 2, 3, 5])\n"
+)
+
+SNIPPETS = {
+    "valid": (
+        "def fibonacci(n: int) -> int:\n"
+        "    \"\"\"Return the n-th Fibonacci number\"\"\"\n"
+        "    a, b = 0, 1\n"
+        "    for _ in range(n):\n"
+        "        a, b = b, a + b\n"
+        "    return a\n"
+    ),
+    "syntax error": "def fibonacci(n):\n    return fibonacci(n - 1) +\n",
+    "undefined name": "def fibonacci(n: int) -> int:\n    return fib(n - 1) + fib(n - 2)\n",
+}
+
+async def sandbox_times(runs):
+    """Median time to run each snippet's tests on a warm sandbox"""
+    async with SandboxPool(size=1) as pool:
+        medians = {}
+        for name, code in SNIPPETS.items():
+            times = []
+            for _ in range(runs):
+                start = time.perf_counter()
+                await pool.run(build_test_program(code, TESTS))
+                times.append(time.perf_counter() - start)
+            medians[name] = statistics.median(times)
+    return medians
+
+def main():
+    """Compare per-snippet validation and a warm sandbox test run"""
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    validator = CodeValidator()
+    sandbox = asyncio.run(sandbox_times(runs))
+    print(f"\nValidation benchmark (sandbox: median of {runs} runs)")
+    print("-" * 40)
+    for name, code in SNIPPETS.items():
+        number = 1000
+        seconds = min(timeit.repeat(lambda: validator.validate(code), number=number,
+                                    repeat=5)) / number
+        print(f"{name:<16} validate {seconds * 1e6:8.1f} us  "
+              f"sandbox tests {sandbox[name] * 1e3:8.2f} ms  "
+              f"ratio {sandbox[name] / seconds:8.0f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Benchmark: scaling of response post-processing (extraction and validation) with workers
+
+Post-processes a large batch of verbose responses inline on the event
+loop, then on process pools of increasing size. On a machine with N
+cores throughput should grow close to linearly up to N workers.
+"""
+import asyncio
+import os
+import sys
+import time
+
+# Runnable from a checkout without installing the package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from codeweaver.extraction import extract_code
+from codeweaver.validation import CodeValidator
+from codeweaver.workers import WorkerPool
+
+VALIDATOR = CodeValidator()
+
+def build_response(index, lines=300):
+    """A colored CAMEL-style response holding a long generated function"""
+    body = "".join(f"    value_{i} = \x1b[32m{i}\x1b[0m * n + value_{max(i - 1, 0)}\n"
+                   for i in range(1, lines))
+    return (f"\x1b[35m> Explanation:\nComputes values.\n\x1b[35m> Code:\n"
+            f"def generated_{index}(n: int) -> int:\n    value_0 = n\n{body}"
+            f"    return value_{lines - 1}\n"
+            f"2024-12-08 20:45:02,014 - camel - INFO - Step finished\n")
+
+def postprocess(response):
+    """The CPU-bound tail of a generation: extraction then validation"""
+    code = extract_code(response)
+    return code, VALIDATOR.validate(code)
+
+async def run_batch(responses, pool):
+    """Post-process every response, inline or concurrently on a pool"""
+    if pool is None:
+        return [postprocess(response) for response in responses]
+    return await asyncio.gather(*(pool.run(postprocess, response) for response in responses))
+
+def main():
+    """Time the batch inline and on 1, 2, 4, ... process workers"""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    cores = os.cpu_count() or 1
+    responses = [build_response(i) for i in range(count)]
+    assert not postprocess(responses[0])[1]
+
+    print(f"\nPost-processing benchmark ({count} responses, {cores} CPUs)")
+    print("-" * 40)
+    start = time.perf_counter()
+    asyncio.run(run_batch(responses, None))
+    inline = time.perf_counter() - start
+    print(f"{'inline':<12} {inline:8.2f} s  {count / inline:8.1f} responses/s")
+
+    for workers in [n for n in (1, 2, 4, 8, 16) if n < cores] + [cores]:
+        with WorkerPool("process", workers=workers) as pool:
+            # Start the workers before timing
+            asyncio.run(run_batch(responses[:workers], pool))
+            warmup = pool.busy
+            start = time.perf_counter()
+            asyncio.run(run_batch(responses, pool))
+            elapsed = time.perf_counter() - start
+            utilization = (pool.busy - warmup) / (elapsed * workers)
+        print(f"{workers:>2} workers   {elapsed:8.2f} s  {count / elapsed:8.1f} responses/s  "
+              f"speedup {inline / elapsed:5.2f}x  utilization {min(1.0, utilization):5.0%}")
+
+if __name__ == "__main__":
+    main()
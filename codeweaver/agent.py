@@ -1,149 +1,786 @@
 """
 Autonomous coding agent implementation using CAMEL EmbodiedAgent
 """
-import os
-import re
+import asyncio
+import functools
+import logging
+import time
+from collections import Counter
 from dataclasses import dataclass
-from typing import Optional
-from openai import AsyncOpenAI
-from camel.messages import BaseMessage
-from camel.agents import EmbodiedAgent
-from camel.generators import SystemMessageGenerator
-from camel.types import RoleType
+from typing import (
+    AsyncIterable, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+)
+from codeweaver.backends import Completion, ModelBackend, create_backend, message_text
+from codeweaver.cache import ResponseCache, SemanticCache, cache_key
+from codeweaver.extraction import StreamExtractor, extract_code
+from codeweaver.health import ABANDONED
+from codeweaver.memory import MemoryPolicy, Stateless, Turn
+from codeweaver.prompts import DEFAULT_TEMPLATE, PromptTemplate
+from codeweaver.sandbox import ExecutionResult, SandboxPool
+from codeweaver.validation import CodeValidator
+from codeweaver.workers import STAGES, WorkerPool
+from codeweaver.verify import (
+    VerificationResult, build_test_program, failure_output, repair_task
+)
+from codeweaver.scheduler import BATCH, INTERACTIVE
+from codeweaver.telemetry import CallRecord, Telemetry, current_call
+
+logger = logging.getLogger(__name__)
+
+# camel and openai take most of a second to import, so they are imported
+# where first needed rather than at module level
+
+# Role and task the default system message is rendered for
+DEFAULT_ROLE = "Expert Programmer"
+DEFAULT_ROLE_TASK = "Writing clean, efficient code following best practices"
+
+# Returned for blank task descriptions
+INVALID_TASK_RESPONSE = "def add(a, b):\n    return a + b"
+
+# Returned when code generation fails
+ERROR_RESPONSE = """def error_response():
+    \"\"\"This is a placeholder returned due to an error in code generation\"\"\"
+    raise NotImplementedError("Code generation failed - please try again")"""
+
+class InvalidTaskError(ValueError):
+    """A task that cannot be generated, however often it is tried"""
 
 @dataclass 
 class CodingTask:
     """A coding task to be performed by the agent"""
     description: str
 
+@dataclass
+class GenerationResult:
+    """Outcome of a single task from a batch generation"""
+    index: int
+    task: CodingTask
+    code: Optional[str] = None
+    error: Optional[str] = None
+    elapsed: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    # False if the task itself is invalid, so another attempt would fail too
+    retryable: bool = True
+
+    @property
+    def ok(self) -> bool:
+        """Whether the task produced code"""
+        return self.error is None
+
+@functools.lru_cache(maxsize=None)
+def render_system_message(role: str, task: str):
+    """Render the CAMEL system message for a role and task
+    
+    Memoized, so agents sharing a role and task render it only once.
+    """
+    from camel.generators import SystemMessageGenerator
+    from camel.types import RoleType
+    
+    meta_dict = {"role": role, "task": task}
+    role_tuple = (role, RoleType.EMBODIMENT)
+    return SystemMessageGenerator().from_dict(meta_dict=meta_dict, role_tuple=role_tuple)
+
+async def _aiter_tasks(tasks):
+    """Iterate over a plain or async iterable of tasks"""
+    if isinstance(tasks, AsyncIterable):
+        async for task in tasks:
+            yield task
+    else:
+        for task in tasks:
+            yield task
+
 class CodingAgent:
     """An autonomous coding agent using OpenAI API with CAMEL integration"""
     
-    def __init__(self, system_message=None, model="openai"):
+    def __init__(self, system_message=None, model: Union[str, ModelBackend] = "openai",
+                 max_connections=10, temperature=None, max_tokens=None,
+                 cache: Optional[ResponseCache] = None,
+                 semantic_cache: Optional[SemanticCache] = None,
+                 race: Optional[List[Union[str, ModelBackend]]] = None,
+                 hedge_delay: Optional[float] = None,
+                 fallback: Optional[List[Union[str, ModelBackend]]] = None,
+                 memory: Optional[MemoryPolicy] = None,
+                 prompt_template: Optional[PromptTemplate] = None,
+                 sandbox: Optional[SandboxPool] = None,
+                 telemetry: Optional[Telemetry] = None,
+                 validator: Optional[CodeValidator] = None,
+                 regenerate: int = 1,
+                 offload: Optional[Dict[str, WorkerPool]] = None):
         """Initialize the coding agent
         
         Args:
             system_message: Optional custom system message
-            model: Model to use - either 'openai' or 'deepseek'
-        """
-        self.model = model.lower()
-        
-        if self.model == "openai":
-            self.api_key = os.getenv("OPENAI_API_KEY")
-            if not self.api_key:
-                raise ValueError("OPENAI_API_KEY environment variable not set")
-        elif self.model == "deepseek":
-            self.api_key = os.getenv("DEEPSEEK_API_KEY")
-            if not self.api_key:
-                raise ValueError("DEEPSEEK_API_KEY environment variable not set")
+            model: Registered backend name ('openai', 'deepseek', 'local', ...)
+                or a ModelBackend instance
+            max_connections: Size of the backend's keep-alive connection pool
+            temperature: Sampling temperature, defaults to the backend's
+            max_tokens: Maximum number of tokens to generate, defaults to the
+                backend's
+            cache: Optional ResponseCache consulted before calling the API
+            semantic_cache: Optional SemanticCache returning the code of a
+                near-duplicate task description after an exact cache miss
+            race: Additional backends (names or instances) sent the same
+                task; the first valid code wins and the rest are cancelled
+            hedge_delay: If set, each racing backend is only started once
+                the requests already in flight have been pending this many
+                seconds (e.g. the primary's p95 latency), or have failed
+            fallback: Backends (names or instances) tried in order when the
+                primary fails or its circuit is open; a backend with an open
+                circuit fails at once, so a dead provider costs no timeout
+            memory: Policy deciding which earlier turns are sent with each
+                task (Stateless, SlidingWindow or TokenBudget); defaults
+                to Stateless
+            prompt_template: Template rendering the user prompt for a task
+            sandbox: Pool generate_verified runs tests in, by default one
+                is started on first use and closed with the agent
+            telemetry: Telemetry whose hooks receive the stage timings,
+                usage and outcome of every generate and stream call
+            validator: Static checks generated code must pass before it is
+                returned or tested; defaults to CodeValidator(). Streamed
+                code is already emitted, so it is not validated
+            regenerate: Fresh attempts made, with the problems found fed
+                back, when a response fails validation
+            offload: Worker pool per CPU-bound stage ("extract",
+                "validate") to run that stage off the event loop; other
+                stages run inline. The pools are not closed by the agent
+        """
+        unknown = set(offload or {}) - set(STAGES)
+        if unknown:
+            raise ValueError(f"Unknown stages to offload: {sorted(unknown)}")
+        if isinstance(model, ModelBackend):
+            self.backend = model
         else:
-            raise ValueError(f"Unsupported model: {model}")
-
-        # Initialize system message generator
-        role = "Expert Programmer"
-        task = "Writing clean, efficient code following best practices"
-        meta_dict = {"role": role, "task": task}
-        role_tuple = (role, RoleType.EMBODIMENT)
+            self.backend = create_backend(model, max_connections=max_connections)
+        self.model = self.backend.name
         
-        # Generate system message
-        sys_msg_gen = SystemMessageGenerator()
-        default_sys_msg = sys_msg_gen.from_dict(meta_dict=meta_dict, role_tuple=role_tuple)
-        
-        # Use provided system message or default
-        self.system_message = system_message or default_sys_msg
-        
-        # Initialize CAMEL embodied agent
-        self.agent = EmbodiedAgent(
-            system_message=self.system_message,
-            verbose=True
+        params = self.backend.params(temperature=temperature, max_tokens=max_tokens)
+        self.temperature = params["temperature"]
+        self.max_tokens = params["max_tokens"]
+        self.cache = cache
+        self.semantic_cache = semantic_cache
+        self.race_backends = [
+            backend if isinstance(backend, ModelBackend)
+            else create_backend(backend, max_connections=max_connections)
+            for backend in race or []
+        ]
+        self.hedge_delay = hedge_delay
+        self.fallback_backends = [
+            backend if isinstance(backend, ModelBackend)
+            else create_backend(backend, max_connections=max_connections)
+            for backend in fallback or []
+        ]
+        self.race_wins = Counter()
+        self.memory = memory if memory is not None else Stateless()
+        self.prompt_template = prompt_template or DEFAULT_TEMPLATE
+        self.last_completion: Optional[Completion] = None
+        self.sandbox = sandbox
+        self._owns_sandbox = sandbox is None
+        self.telemetry = telemetry or Telemetry()
+        self.validator = validator or CodeValidator()
+        self.regenerate = regenerate
+        self.offload = dict(offload or {})
+        self._runner = None
+        self._system_message = system_message
+
+    @property
+    def system_message(self):
+        """The system message, defaulting to one rendered on first use"""
+        if not self._system_message:
+            self._system_message = render_system_message(DEFAULT_ROLE, DEFAULT_ROLE_TASK)
+        return self._system_message
+
+    @property
+    def agent(self):
+        """The backend's CAMEL embodied agent, if it uses one"""
+        if hasattr(self.backend, "get_agent"):
+            return self.backend.get_agent(self.system_message)
+        return None
+
+    @property
+    def backend_health(self) -> Dict[str, str]:
+        """Circuit state of the primary, racing and fallback backends, by name"""
+        backends = [self.backend] + self.race_backends + self.fallback_backends
+        return {backend.name: backend.breaker.state for backend in backends}
+
+    @property
+    def cache_hits(self) -> int:
+        """Number of generations served from the response cache"""
+        return self.cache.hits if self.cache is not None else 0
+
+    @property
+    def cache_misses(self) -> int:
+        """Number of generations that missed the response cache"""
+        return self.cache.misses if self.cache is not None else 0
+
+    def _params(self) -> dict:
+        """Sampling params sent with every request"""
+        return {"temperature": self.temperature, "max_tokens": self.max_tokens}
+
+    def _build_prompt(self, task: CodingTask) -> str:
+        """Render the user prompt for a task, task description last"""
+        return self.prompt_template.render(task.description)
+
+    def _cache_key(self, prompt: str, history: List[dict]) -> str:
+        """Hash everything that determines the response to a prompt"""
+        backends = [self.backend] + self.race_backends
+        return cache_key(
+            model="+".join(backend.model_name for backend in backends),
+            system=message_text(self.system_message),
+            history=history,
+            prompt=prompt,
+            temperature=self.temperature,
+            max_tokens=self.max_tokens
         )
+
+    def _lookup(self, task: CodingTask, prompt: str, history: List[dict],
+                record: Optional[CallRecord] = None) -> Tuple[Optional[str], Optional[str]]:
+        """Look a request up in the exact, then the near-duplicate cache
         
-    def _generate_with_deepseek(self, prompt: str) -> str:
-        """Generate code using DeepSeek API"""
-        client = AsyncOpenAI(
-            api_key=self.api_key,
-            base_url="https://api.deepseek.com/v1"
-        )
+        Args:
+            task: The task being generated
+            prompt: Rendered user prompt
+            history: Chat messages sent ahead of the prompt
+            record: Telemetry record the cache result is noted on
+            
+        Returns:
+            The exact cache key (None without an exact cache) and the
+            cached code, or None on a miss
+        """
+        key = None
+        cached = None
+        result = "off"
+        if self.cache is not None:
+            key = self._cache_key(prompt, history)
+            cached = self.cache.get(key)
+            result = "miss" if cached is None else "hit"
+        if cached is None and self.semantic_cache is not None:
+            namespace = self._cache_key(self.prompt_template.prefix, history)
+            cached = self.semantic_cache.get(namespace, task.description)
+            # Not copied into the exact cache: a near duplicate is a guess,
+            # and stored under the exact key it would outlive the entry it came from
+            result = "miss" if cached is None else "semantic"
+        if cached is not None:
+            self.memory.record(Turn(task.description, prompt, cached))
+        if record is not None:
+            record.cache = result
+        return key, cached
+
+    def _remember(self, task: CodingTask, prompt: str, history: List[dict],
+                  key: Optional[str], code: str):
+        """Record generated code in the memory policy and caches"""
+        self.memory.record(Turn(task.description, prompt, code))
+        if key is not None:
+            self.cache.set(key, code)
+        if self.semantic_cache is not None:
+            namespace = self._cache_key(self.prompt_template.prefix, history)
+            self.semantic_cache.set(namespace, task.description, code)
+
+    def _run(self, coro):
+        """Run a coroutine on the agent's private event loop
         
-        # Convert system message to string if needed
-        system_content = str(self.system_message) if hasattr(self.system_message, 'content') else self.system_message
-        
-        response = client.chat.completions.create(
-            model="deepseek-chat",
-            messages=[
-                {"role": "system", "content": system_content},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=1000
-        )
+        The loop is kept alive between calls so that pooled connections
+        can be reused by consecutive blocking calls.
+        """
+        if self._runner is None:
+            self._runner = asyncio.Runner()
+        return self._runner.run(coro)
+
+    async def _next_result(self, results: AsyncIterator):
+        """Await the next item of an async iterator"""
+        return await anext(results)
+
+    def _iterate(self, results: AsyncIterator) -> Iterator:
+        """Drive an async iterator from blocking code on the private loop"""
+        try:
+            while True:
+                try:
+                    yield self._run(self._next_result(results))
+                except StopAsyncIteration:
+                    return
+        finally:
+            self._run(results.aclose())
+
+    async def aclose(self):
+        """Close the backends' pooled API clients and any sandbox the agent started"""
+        for backend in [self.backend] + self.race_backends + self.fallback_backends:
+            await backend.aclose()
+        if self._owns_sandbox and self.sandbox is not None:
+            await self.sandbox.close()
+            self.sandbox = None
+
+    def close(self):
+        """Close the backend's pooled API client and the private event loop"""
+        if self._runner is not None:
+            self._runner.run(self.aclose())
+            self._runner.close()
+            self._runner = None
+
+    def stream(self, task: CodingTask) -> Iterator[str]:
+        """Stream generated code for the given task
         
-        return response.choices[0].message.content
+        Blocking wrapper around astream.
+        """
+        return self._iterate(self.astream(task))
 
-    def generate(self, task: CodingTask) -> str:
-        """Generate code for the given task"""
-        # Validate task input
+    async def astream(self, task: CodingTask) -> AsyncIterator[str]:
+        """Stream generated code for the given task asynchronously
+        
+        Code extraction runs incrementally, so chunks are yielded as soon
+        as each line of code arrives from backends that support streaming.
+        """
         if not task.description.strip():
-            print("Invalid task input")
-            return "def add(a, b):\n    return a + b"  # Fallback for invalid input
+            logger.warning("Invalid task input")
+            yield INVALID_TASK_RESPONSE
+            return
             
-        try:
-            # Create prompt
-            prompt = (
-                f"Write a Python function that implements this task:\n"
-                f"{task.description}\n\n"
-                "Requirements:\n"
-                "1. Include proper error handling\n"
-                "2. Add type hints where applicable\n" 
-                "3. Follow Python best practices\n"
-                "4. Write clean, maintainable code\n"
-                "5. Only return the code, no explanations"
-            )
+        parts = []
+        telemetry = self.telemetry
+        # Not bound as the current call, so retries are not counted for streams
+        with telemetry.call(task.description, self.backend.name, bind=False) as record:
+            try:
+                with telemetry.stage(record, "prompt"):
+                    prompt = self._build_prompt(task)
+                    history = self.memory.context()
+                
+                with telemetry.stage(record, "cache"):
+                    key, cached = self._lookup(task, prompt, history, record)
+                if cached is not None:
+                    yield cached
+                    return
+                
+                extractor = StreamExtractor()
+                # Streams cannot fail over midway, so start on a healthy backend
+                backend = next((backend for backend in [self.backend] + self.fallback_backends
+                                if backend.breaker.available), self.backend)
+                if record is not None:
+                    record.backend = backend.name
+                deltas = backend.stream(self.system_message, prompt, history=history,
+                                             **self._params())
+                try:
+                    with telemetry.stage(record, "backend"):
+                        async for delta in deltas:
+                            telemetry.mark(record, "first_token")
+                            text = extractor.feed(delta)
+                            if text:
+                                parts.append(text)
+                                yield text
+                            if extractor.done:
+                                break
+                finally:
+                    await deltas.aclose()
+                    
+                text = extractor.finish()
+                if text:
+                    parts.append(text)
+                    yield text
+                    
+                if not parts:
+                    raise ValueError("No code found in response")
+                    
+                self._remember(task, prompt, history, key, "".join(parts))
+                    
+            except Exception as e:
+                logger.error("Error generating code for %r: %s", task.description[:80], e)
+                if record is not None:
+                    record.outcome = "fallback" if not parts else "error"
+                    record.error = str(e)
+                if not parts:
+                    yield ERROR_RESPONSE
+
+    def generate(self, task: CodingTask) -> str:
+        """Generate code for the given task
+        
+        Blocking wrapper around agenerate. Must not be called from inside a
+        running event loop; use agenerate there instead.
+        """
+        return self._run(self.agenerate(task))
+
+    def generate_many(self, tasks: Iterable[CodingTask], concurrency: int = 4,
+                      timeout: Optional[float] = None,
+                      ordered: bool = False) -> Iterator[GenerationResult]:
+        """Generate code for many tasks concurrently
+        
+        Blocking wrapper around agenerate_many; see there for the arguments.
+        """
+        return self._iterate(self.agenerate_many(tasks, concurrency=concurrency,
+                                                 timeout=timeout, ordered=ordered))
+
+    async def agenerate_many(self, tasks: Union[Iterable[CodingTask], AsyncIterable[CodingTask]],
+                             concurrency: int = 4, timeout: Optional[float] = None,
+                             ordered: bool = False) -> AsyncIterator[GenerationResult]:
+        """Generate code for many tasks with bounded concurrency
+        
+        Tasks are pulled from the input lazily, so at most `concurrency`
+        generations are in flight at any time.
+        
+        Args:
+            tasks: Iterable or async iterable of CodingTask
+            concurrency: Maximum number of in-flight generations
+            timeout: Optional per-task timeout in seconds
+            ordered: Yield results in input order instead of completion order
             
-            # Get response based on model
-            if self.model == "deepseek":
-                content = self._generate_with_deepseek(prompt)
-            else:
-                user_msg = BaseMessage.make_user_message(
-                    role_name="Programmer",
-                    content=prompt
+        Yields:
+            GenerationResult for each task; failed tasks carry an error
+            rather than placeholder code
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+
+        async def run(index, task):
+            start = time.perf_counter()
+            try:
+                code, completion = await asyncio.wait_for(self._agenerate(task, BATCH), timeout)
+                if completion is None and code in (ERROR_RESPONSE, INVALID_TASK_RESPONSE):
+                    # Placeholders stand in for code in the single-task API only
+                    error = "Invalid task input" if code == INVALID_TASK_RESPONSE else \
+                        "Code generation failed"
+                    return GenerationResult(index, task, error=error,
+                                            elapsed=time.perf_counter() - start,
+                                            retryable=code != INVALID_TASK_RESPONSE)
+                return GenerationResult(
+                    index, task, code=code, elapsed=time.perf_counter() - start,
+                    prompt_tokens=completion.prompt_tokens if completion else 0,
+                    completion_tokens=completion.completion_tokens if completion else 0,
+                    cached_tokens=completion.cached_tokens if completion else 0
                 )
-                response = self.agent.step(user_msg)
-                content = response.content if hasattr(response, 'content') else str(response)
+            except asyncio.TimeoutError:
+                return GenerationResult(index, task, error=f"Timed out after {timeout}s",
+                                        elapsed=time.perf_counter() - start)
+
+        source = _aiter_tasks(tasks)
+        pending = set()
+        finished = {}
+        next_index = 0
+        count = 0
+        exhausted = False
+        try:
+            while True:
+                while not exhausted and len(pending) < concurrency:
+                    try:
+                        task = await anext(source)
+                    except StopAsyncIteration:
+                        exhausted = True
+                        break
+                    pending.add(asyncio.create_task(run(count, task)))
+                    count += 1
+                    
+                if not pending:
+                    break
+                    
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    if ordered:
+                        finished[result.index] = result
+                    else:
+                        yield result
+                        
+                while next_index in finished:
+                    yield finished.pop(next_index)
+                    next_index += 1
+        finally:
+            for future in pending:
+                future.cancel(ABANDONED)
+
+    async def _stage(self, name: str, fn: Callable, *args):
+        """Run a CPU-bound stage on its worker pool, or inline if it has none"""
+        pool = self.offload.get(name)
+        if pool is None:
+            return fn(*args)
+        return await pool.run(fn, *args)
+
+    async def _complete_code(self, backend: ModelBackend, prompt: str,
+                             priority: int = INTERACTIVE,
+                             history: List[dict] = ()) -> Tuple[str, Completion]:
+        """Get a response from a backend and extract its code
+        
+        Code failing validation is regenerated, up to `regenerate` times,
+        with the problems found appended to the prompt.
+        """
+        record = current_call.get()
+        request = prompt
+        for attempt in range(self.regenerate + 1):
+            with self.telemetry.stage(record, "backend"):
+                completion = await backend.complete(self.system_message, request,
+                                                    priority=priority, history=history,
+                                                    **self._params())
+            content = completion.text
             
             if not content:
                 raise ValueError("Empty response from agent")
             
             # Extract code from response
-            content = content.strip()
-            
-            if not content:
-                raise ValueError("Empty response from agent")
-
-            # Remove ANSI color codes
-            content = re.sub(r'\x1b\[\d+m', '', content)
-                
-            # Look for code block after "> Code:" marker
-            if "> Code:" in content:
-                code = content.split("> Code:")[1].strip()
-            else:
-                code = content
-                
-            # Remove any trailing logging/debug info
-            if "INFO -" in code:
-                code = code.split("INFO -")[0].strip()
-                
-            # Clean up any remaining ANSI codes
-            code = re.sub(r'\x1b\[\d+m', '', code)
+            with self.telemetry.stage(record, "extract"):
+                code = await self._stage("extract", extract_code, content)
                 
             if not code:
                 raise ValueError("No code found in response")
                 
-            return code
+            with self.telemetry.stage(record, "validate"):
+                problems = await self._stage("validate", self.validator.validate, code)
+            if not problems:
+                return code, completion
+            logger.info("Generated code failed validation (attempt %d): %s",
+                        attempt + 1, "; ".join(problems))
+            if attempt < self.regenerate:
+                if record is not None:
+                    record.regenerations += 1
+                request = repair_task(prompt, code, "\n".join(problems))
+        raise ValueError(f"Generated code failed validation: {problems[0]}")
+
+    async def _failover(self, prompt: str, priority: int = INTERACTIVE,
+                        history: List[dict] = ()) -> Tuple[str, Completion]:
+        """Send a prompt to the primary, then each fallback backend until one succeeds
+
+        Time spent on the fallback backends is reported as the "fallback" stage.
+        """
+        record = current_call.get()
+        try:
+            return await self._complete_code(self.backend, prompt, priority, history)
+        except Exception as e:
+            if not self.fallback_backends:
+                raise
+            logger.warning("Backend '%s' failed, failing over: %s", self.backend.name, e)
+            error = e
+        with self.telemetry.stage(record, "fallback"):
+            for backend in self.fallback_backends:
+                try:
+                    code, completion = await self._complete_code(backend, prompt, priority,
+                                                                 history)
+                except Exception as e:
+                    logger.warning("Backend '%s' failed, failing over: %s", backend.name, e)
+                    error = e
+                    continue
+                if record is not None:
+                    record.backend = backend.name
+                return code, completion
+        raise error
+
+    async def _race(self, prompt: str, priority: int = INTERACTIVE,
+                    history: List[dict] = ()) -> Tuple[str, Completion]:
+        """Send a prompt to the primary and racing backends, first valid code wins
+        
+        Without a hedge delay every backend starts at once. With one, the
+        next backend starts when the requests in flight have been pending
+        for the delay or have all failed.
+        """
+        backends = [self.backend] + self.race_backends
+        pending = {}
+        error = None
+        try:
+            for index, backend in enumerate(backends):
+                future = asyncio.create_task(
+                    self._complete_code(backend, prompt, priority, history)
+                )
+                pending[future] = backend
+                is_last = index == len(backends) - 1
+                if self.hedge_delay is None and not is_last:
+                    continue
+                    
+                while pending:
+                    done, _ = await asyncio.wait(pending, timeout=None if is_last else self.hedge_delay,
+                                                 return_when=asyncio.FIRST_COMPLETED)
+                    if not done:
+                        break
+                    for future in done:
+                        winner = pending.pop(future)
+                        if future.exception() is None:
+                            self.race_wins[winner.name] += 1
+                            logger.debug("Race won by %s", winner.name)
+                            record = current_call.get()
+                            if record is not None:
+                                record.backend = winner.name
+                            return future.result()
+                        error = future.exception()
+                    if not is_last and not pending:
+                        break
+            raise error
+        finally:
+            for future in pending:
+                future.cancel(ABANDONED)
+
+    async def agenerate(self, task: CodingTask, priority: int = INTERACTIVE) -> str:
+        """Generate code for the given task asynchronously
+        
+        Token usage of the call is left in `last_completion`.
+        
+        Args:
+            task: The task to generate code for
+            priority: Scheduling priority against the backend's quota;
+                INTERACTIVE requests are served ahead of BATCH ones
+        """
+        code, completion = await self._agenerate(task, priority)
+        self.last_completion = completion
+        return code
+
+    async def agenerate_result(self, task: CodingTask, priority: int = BATCH,
+                               timeout: Optional[float] = None) -> GenerationResult:
+        """Generate code for a task, reporting failures as errors, not placeholder code
+        
+        Args:
+            task: The task to generate code for
+            priority: Scheduling priority against the backend's quota
+            timeout: Optional timeout in seconds
             
+        Returns:
+            GenerationResult with index 0, carrying the code and token usage,
+            or the exception that ended the generation as its error
+        """
+        start = time.perf_counter()
+        try:
+            code, completion = await asyncio.wait_for(
+                self._agenerate(task, priority, fallback=False), timeout
+            )
+        except asyncio.TimeoutError:
+            return GenerationResult(0, task, error=f"Timed out after {timeout}s",
+                                    elapsed=time.perf_counter() - start)
         except Exception as e:
-            print(f"Error generating code: {e}")
-            # Return a more informative error response
-            return """def error_response():
-    \"\"\"This is a placeholder returned due to an error in code generation\"\"\"
-    raise NotImplementedError("Code generation failed - please try again")"""
+            return GenerationResult(0, task, error=f"{type(e).__name__}: {e}",
+                                    elapsed=time.perf_counter() - start,
+                                    retryable=not isinstance(e, InvalidTaskError))
+        return GenerationResult(
+            0, task, code=code, elapsed=time.perf_counter() - start,
+            prompt_tokens=completion.prompt_tokens if completion else 0,
+            completion_tokens=completion.completion_tokens if completion else 0,
+            cached_tokens=completion.cached_tokens if completion else 0
+        )
+
+    async def _agenerate(self, task: CodingTask, priority: int = INTERACTIVE,
+                         fallback: bool = True) -> Tuple[str, Optional[Completion]]:
+        """Generate code, returning it with the backend's completion if one was made
+        
+        With fallback, failures return placeholder code; without, they raise.
+        """
+        # Validate task input
+        if not task.description.strip():
+            logger.warning("Invalid task input")
+            if not fallback:
+                raise InvalidTaskError("Invalid task input")
+            return INVALID_TASK_RESPONSE, None  # Fallback for invalid input
+            
+        telemetry = self.telemetry
+        with telemetry.call(task.description, self.backend.name) as record:
+            try:
+                # Create prompt
+                with telemetry.stage(record, "prompt"):
+                    prompt = self._build_prompt(task)
+                    history = self.memory.context()
+                
+                # Serve repeated and near-duplicate requests from the caches
+                with telemetry.stage(record, "cache"):
+                    key, cached = self._lookup(task, prompt, history, record)
+                if cached is not None:
+                    return cached, None
+                
+                if self.race_backends:
+                    code, completion = await self._race(prompt, priority, history)
+                else:
+                    code, completion = await self._failover(prompt, priority, history)
+                    
+                self._remember(task, prompt, history, key, code)
+                if record is not None:
+                    record.prompt_tokens = completion.prompt_tokens
+                    record.completion_tokens = completion.completion_tokens
+                    record.cached_tokens = completion.cached_tokens
+                return code, completion
+                
+            except Exception as e:
+                logger.error("Error generating code for %r: %s", task.description[:80], e)
+                if record is not None:
+                    record.outcome = "fallback" if fallback else "error"
+                    record.error = str(e)
+                if not fallback:
+                    raise
+                # Return a more informative error response
+                return ERROR_RESPONSE, None
+
+    def generate_verified(self, task: CodingTask, tests: str, candidates: int = 3,
+                          repair_rounds: int = 2,
+                          test_timeout: float = 10.0) -> VerificationResult:
+        """Generate code that passes the given tests
+        
+        Blocking wrapper around agenerate_verified; see there for the arguments.
+        """
+        return self._run(self.agenerate_verified(task, tests, candidates=candidates,
+                                                 repair_rounds=repair_rounds,
+                                                 test_timeout=test_timeout))
+
+    async def _try_candidate(self, prompt: str, history: List[dict], tests: str,
+                             test_timeout: float) -> Tuple[str, ExecutionResult]:
+        """Generate one candidate and run the tests on it"""
+        code, _ = await self._failover(prompt, INTERACTIVE, history)
+        return code, await self.sandbox.run(build_test_program(code, tests), test_timeout)
+
+    async def agenerate_verified(self, task: CodingTask, tests: str, candidates: int = 3,
+                                 repair_rounds: int = 2,
+                                 test_timeout: float = 10.0) -> VerificationResult:
+        """Generate code that passes the given tests
+        
+        Each round samples `candidates` responses concurrently, each tested
+        in the sandbox as soon as it arrives while the others are still
+        generating or testing; the first to pass is returned and the rest
+        are cancelled. If none pass, the first
+        failure and its output are fed back for another round, up to
+        `repair_rounds` times.
+        
+        Args:
+            task: The task to generate code for
+            tests: Python source run after each candidate; plain asserts
+                and unittest.TestCase classes are both supported
+            candidates: Responses sampled concurrently per round
+            repair_rounds: Rounds after the first that repair a failure
+            test_timeout: Seconds each candidate's test run may take
+            
+        Returns:
+            VerificationResult; when nothing passes, `code` is the last
+            candidate tried and `passed` is False
+        """
+        if candidates < 1:
+            raise ValueError("candidates must be at least 1")
+        if not task.description.strip():
+            logger.warning("Invalid task input")
+            return VerificationResult(code=INVALID_TASK_RESPONSE, passed=False)
+        if self.sandbox is None:
+            self.sandbox = SandboxPool(size=candidates)
+            
+        history = self.memory.context()
+        description = task.description
+        result = VerificationResult(code=ERROR_RESPONSE, passed=False)
+        for round_number in range(repair_rounds + 1):
+            result.rounds = round_number + 1
+            prompt = self.prompt_template.render(description)
+            pending = {
+                asyncio.create_task(self._try_candidate(prompt, history, tests, test_timeout))
+                for _ in range(candidates)
+            }
+            first_failure = None
+            try:
+                for future in asyncio.as_completed(pending):
+                    try:
+                        code, run = await future
+                    except Exception as e:
+                        logger.error("Error generating code for %r: %s", task.description[:80], e)
+                        continue
+                    result.candidates += 1
+                    result.code = code
+                    if run.ok:
+                        result.passed = True
+                        result.output = run.stderr
+                        self.memory.record(Turn(task.description, prompt, code))
+                        return result
+                    result.output = failure_output(run)
+                    result.failures.append(result.output)
+                    if first_failure is None:
+                        first_failure = (code, result.output)
+            finally:
+                for future in pending:
+                    future.cancel(ABANDONED)
+                # Let cancelled test runs hand their sandbox workers back
+                # before the caller can close the pool
+                await asyncio.gather(*pending, return_exceptions=True)
+                    
+            if first_failure is not None:
+                description = repair_task(task.description, *first_failure, tests=tests)
+        return result
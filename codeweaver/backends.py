@@ -0,0 +1,490 @@
+"""
+Model backends and the registry CodingAgent dispatches through
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import (
+    TYPE_CHECKING, Awaitable, AsyncIterator, Callable, Dict, List, Optional, Sequence, TypeVar
+)
+from codeweaver.health import ABANDONED, CircuitBreaker, CircuitOpenError
+from codeweaver.scheduler import INTERACTIVE, RequestScheduler, estimate_tokens
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+DEEPSEEK_BASE_URL = "https://api.deepseek.com/v1"
+LOCAL_BASE_URL = "http://localhost:8000/v1"
+
+# Seconds a health probe may take before the backend counts as down
+PROBE_TIMEOUT = 10.0
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+# camel configures the root logger on import (INFO to stdout) unless the
+# application already has; a handler on its own logger stops that, leaving
+# logging configuration to the application
+logging.getLogger("camel").addHandler(logging.NullHandler())
+
+@dataclass
+class Completion:
+    """A full response from a backend
+
+    cached_tokens counts the prompt tokens the provider served from its
+    prompt prefix cache; they are included in prompt_tokens.
+    """
+    text: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    @classmethod
+    def from_usage(cls, text: str, usage) -> "Completion":
+        """Build a completion from an API usage object or dict"""
+        def field(source, name):
+            value = source.get(name) if isinstance(source, dict) else getattr(source, name, None)
+            return value or 0
+
+        if usage is None:
+            return cls(text=text)
+        # OpenAI reports prompt_tokens_details.cached_tokens, DeepSeek
+        # reports prompt_cache_hit_tokens
+        details = field(usage, "prompt_tokens_details")
+        cached = field(details, "cached_tokens") if details else 0
+        return cls(
+            text=text,
+            prompt_tokens=field(usage, "prompt_tokens"),
+            completion_tokens=field(usage, "completion_tokens"),
+            cached_tokens=cached or field(usage, "prompt_cache_hit_tokens")
+        )
+
+def message_text(message) -> str:
+    """Return a CAMEL message or plain string as text"""
+    return message.content if hasattr(message, 'content') else message
+
+class ModelBackend:
+    """An OpenAI-compatible chat completions provider
+
+    Each backend owns its API client and keep-alive connection pool, its
+    default sampling params, the capability flags CodingAgent checks
+    before using a feature, a RequestScheduler enforcing its quotas and a
+    CircuitBreaker tracking its health. While the circuit is open requests
+    fail at once with CircuitOpenError, and once its reset timeout passes
+    a health probe runs in the background to close it again. Subclasses
+    set the class attributes below and may override _complete.
+    """
+    name = "base"
+    model_name = None
+    base_url = None
+    api_key_env = None
+    default_params = {"temperature": 0.7, "max_tokens": 1000}
+    max_output_tokens = 4096
+    supports_streaming = True
+
+    def __init__(self, api_key: Optional[str] = None, max_connections: int = 10,
+                 model_name: Optional[str] = None, base_url: Optional[str] = None,
+                 scheduler: Optional[RequestScheduler] = None,
+                 breaker: Optional[CircuitBreaker] = None):
+        """Initialize the backend
+
+        Args:
+            api_key: API key, read from `api_key_env` if not given
+            max_connections: Size of the backend's keep-alive connection pool
+            model_name: Override for the provider model name
+            base_url: Override for the API base URL
+            scheduler: Quota scheduler, defaults to unlimited quotas with
+                retries on rate-limit and server errors
+            breaker: Circuit breaker, defaults to opening at a 50% error
+                rate over the last 20 calls
+        """
+        if api_key is None and self.api_key_env:
+            api_key = os.getenv(self.api_key_env)
+            if not api_key:
+                raise ValueError(f"{self.api_key_env} environment variable not set")
+        self.api_key = api_key
+        self.max_connections = max_connections
+        self.model_name = model_name or self.model_name
+        self.base_url = base_url or self.base_url
+        self.scheduler = scheduler or RequestScheduler()
+        self.breaker = breaker or CircuitBreaker()
+        self._probe_task = None
+        self._client = None
+        self._client_loop = None
+
+    def params(self, **overrides) -> dict:
+        """Merge sampling params over the defaults, capping max_tokens"""
+        params = dict(self.default_params)
+        params.update({key: value for key, value in overrides.items() if value is not None})
+        if params.get("max_tokens"):
+            params["max_tokens"] = min(params["max_tokens"], self.max_output_tokens)
+        return params
+
+    def get_client(self) -> "AsyncOpenAI":
+        """Return the pooled API client, creating it on first use
+
+        httpx connections are bound to the event loop that opened them, so
+        the client is rebuilt if it is requested from a different loop.
+        The SDK's own retries are disabled; the scheduler does the retrying.
+        """
+        import httpx
+        from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            http_client = DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=60.0
+                )
+            )
+            self._client = AsyncOpenAI(
+                api_key=self.api_key or "unused",
+                base_url=self.base_url,
+                http_client=http_client,
+                max_retries=0
+            )
+            self._client_loop = loop
+        return self._client
+
+    def _messages(self, system, prompt: str, history: Sequence[dict] = ()) -> List[dict]:
+        """Build the chat messages for a request"""
+        return [
+            {"role": "system", "content": message_text(system)},
+            *history,
+            {"role": "user", "content": prompt}
+        ]
+
+    def _estimate(self, system, prompt: str, params: dict, history: Sequence[dict] = ()) -> int:
+        """Estimate the tokens a request will use, for the token quota"""
+        text = message_text(system) + prompt + "".join(m["content"] for m in history)
+        return estimate_tokens(text) + params.get("max_tokens", 0)
+
+    async def _complete(self, system, prompt: str, history: Sequence[dict] = (),
+                        **params) -> Completion:
+        """Send a single request for a full response"""
+        response = await self.get_client().chat.completions.create(
+            model=self.model_name,
+            messages=self._messages(system, prompt, history),
+            **params
+        )
+        return Completion.from_usage(response.choices[0].message.content, response.usage)
+
+    def _check_circuit(self):
+        """Refuse requests while the circuit is open, probing once it may close"""
+        if self.breaker.available:
+            return
+        if self.breaker.try_trial():
+            self._probe_task = asyncio.create_task(self._run_probe())
+        raise CircuitOpenError(self.name)
+
+    async def _guarded(self, request: Callable[[], Awaitable[T]]) -> T:
+        """Make one attempt at a request, recording its outcome on the breaker
+
+        A cancelled attempt, e.g. one cut off by a timeout, counts as failed
+        unless it was cancelled with ABANDONED.
+        """
+        self._check_circuit()
+        start = time.perf_counter()
+        try:
+            result = await request()
+        except Exception:
+            self.breaker.record(False)
+            raise
+        except asyncio.CancelledError as e:
+            if ABANDONED not in e.args:
+                self.breaker.record(False)
+            raise
+        self.breaker.record(True, time.perf_counter() - start)
+        return result
+
+    async def _probe(self):
+        """Send the smallest request that shows the backend is serving"""
+        await self._complete("You are a health check.", "Reply with OK", max_tokens=1)
+
+    async def _run_probe(self):
+        """Probe a half-open backend and close or reopen its circuit"""
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._probe(), PROBE_TIMEOUT)
+        except Exception as e:
+            logger.warning("Health probe of backend '%s' failed: %s", self.name, e)
+            self.breaker.record(False)
+        else:
+            self.breaker.record(True, time.perf_counter() - start)
+            logger.info("Backend '%s' is healthy again (circuit %s)", self.name,
+                        self.breaker.state)
+
+    async def complete(self, system, prompt: str, priority: int = INTERACTIVE,
+                       history: Sequence[dict] = (), **params) -> Completion:
+        """Return the full response for a prompt, within the backend's quota
+        
+        Args:
+            system: System message
+            prompt: User prompt
+            priority: Scheduling priority, see RequestScheduler.run
+            history: Earlier chat messages to send ahead of the prompt
+            **params: Sampling params overriding the backend's defaults
+        """
+        # Checked before queueing too, so a down backend fails without waiting for quota
+        self._check_circuit()
+        params = self.params(**params)
+        estimate = self._estimate(system, prompt, params, history)
+        completion = await self.scheduler.run(
+            lambda: self._guarded(lambda: self._complete(system, prompt, history=history,
+                                                         **params)),
+            tokens=estimate, priority=priority
+        )
+        if completion.total_tokens:
+            self.scheduler.settle(estimate, completion.total_tokens)
+        return completion
+
+    async def stream(self, system, prompt: str, priority: int = INTERACTIVE,
+                     history: Sequence[dict] = (), **params) -> AsyncIterator[str]:
+        """Yield the response text for a prompt as it arrives"""
+        if not self.supports_streaming:
+            completion = await self.complete(system, prompt, priority=priority,
+                                             history=history, **params)
+            yield completion.text
+            return
+
+        self._check_circuit()
+        params = self.params(**params)
+        start = 0.0
+
+        async def open_stream():
+            # Unlike _guarded, success is only recorded once the stream is read to the end
+            nonlocal start
+            self._check_circuit()
+            start = time.perf_counter()
+            try:
+                return await self.get_client().chat.completions.create(
+                    model=self.model_name,
+                    messages=self._messages(system, prompt, history),
+                    stream=True,
+                    **params
+                )
+            except Exception:
+                self.breaker.record(False)
+                raise
+            except asyncio.CancelledError as e:
+                if ABANDONED not in e.args:
+                    self.breaker.record(False)
+                raise
+
+        response = await self.scheduler.run(
+            open_stream, tokens=self._estimate(system, prompt, params, history),
+            priority=priority
+        )
+        try:
+            async for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception:
+            self.breaker.record(False)
+            raise
+        except asyncio.CancelledError as e:
+            if ABANDONED not in e.args:
+                self.breaker.record(False)
+            raise
+        except GeneratorExit:
+            # The caller stopped reading, having what it needed
+            self.breaker.record(True, time.perf_counter() - start)
+            raise
+        else:
+            self.breaker.record(True, time.perf_counter() - start)
+        finally:
+            await response.close()
+
+    async def aclose(self):
+        """Close the pooled API client and stop any running health probe"""
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            self._probe_task = None
+        if self._client is not None:
+            client, self._client = self._client, None
+            self._client_loop = None
+            await client.close()
+
+class OpenAIBackend(ModelBackend):
+    """OpenAI, with full responses generated through CAMEL EmbodiedAgents
+
+    An agent's memory holds the request while it steps, so each request in
+    flight takes its own agent from a pool. Steps block, so they run on the
+    backend's own thread pool of max_connections threads, which also caps
+    the number of agents. EmbodiedAgent.step only returns complete
+    responses, so streaming goes straight to the chat completions API.
+    """
+    name = "openai"
+    model_name = "gpt-4o-mini"
+    api_key_env = "OPENAI_API_KEY"
+    max_output_tokens = 16384
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._agent = None
+        self._idle_agents = []
+        self._agents_lock = threading.Lock()
+        self._executor = None
+
+    def _new_agent(self, system):
+        from camel.agents import EmbodiedAgent
+
+        # Verbose mode prints colored output for every step, which is
+        # slow under concurrency and interleaves between requests
+        return EmbodiedAgent(system_message=system, verbose=False)
+
+    def get_agent(self, system):
+        """Return the first CAMEL embodied agent, constructed on first use"""
+        with self._agents_lock:
+            if self._agent is None:
+                self._agent = self._new_agent(system)
+                self._idle_agents.append(self._agent)
+            return self._agent
+
+    def _acquire_agent(self):
+        """Take an idle agent, or None if all are stepping"""
+        with self._agents_lock:
+            return self._idle_agents.pop() if self._idle_agents else None
+
+    def _release_agent(self, agent):
+        """Return an agent to the pool, the first agent ahead of the others"""
+        with self._agents_lock:
+            if self._agent is None:
+                self._agent = agent
+            if agent is self._agent:
+                self._idle_agents.append(agent)
+            else:
+                self._idle_agents.insert(0, agent)
+
+    def _step(self, agent, prompt: str, history: Sequence[dict], params: Optional[dict] = None):
+        """Replace the agent's memory with the given history and step it
+
+        The sampling params are written into the agent's model config,
+        which only this request uses while it steps.
+        """
+        from camel.messages import BaseMessage
+        from camel.types import OpenAIBackendRole
+
+        if params:
+            agent.model_backend.model_config_dict.update(params)
+        agent.reset()
+        for message in history:
+            if message["role"] == "assistant":
+                record = BaseMessage.make_assistant_message(role_name="Assistant",
+                                                            content=message["content"])
+                agent.update_memory(record, OpenAIBackendRole.ASSISTANT)
+            else:
+                record = BaseMessage.make_user_message(role_name="Programmer",
+                                                       content=message["content"])
+                agent.update_memory(record, OpenAIBackendRole.USER)
+        user_msg = BaseMessage.make_user_message(
+            role_name="Programmer",
+            content=prompt
+        )
+        return agent.step(user_msg)
+
+    def _step_pooled(self, system, prompt: str, history: Sequence[dict], params: dict):
+        """Step an idle agent, or a new one if all are busy, returning it to the pool
+
+        Runs on the backend's thread pool, so no more agents are made than
+        it has threads. Released from the worker thread, so an agent whose
+        request was cancelled is not reused while its step is still running.
+        """
+        agent = self._acquire_agent() or self._new_agent(system)
+        try:
+            return self._step(agent, prompt, history, params)
+        finally:
+            self._release_agent(agent)
+
+    async def _probe(self):
+        """Probe the chat completions API directly, leaving the agent untouched"""
+        await ModelBackend._complete(self, "You are a health check.", "Reply with OK",
+                                     max_tokens=1)
+
+    async def _complete(self, system, prompt: str, history: Sequence[dict] = (),
+                        **params) -> Completion:
+        """Generate the full response through an embodied agent from the pool
+        
+        The agent's own memory is rebuilt from the given history on every
+        call, so the caller's memory policy decides what it sees.
+        """
+        if self._executor is None:
+            # Not the loop's default executor, whose few threads would cap
+            # the backend's concurrency below max_connections
+            self._executor = ThreadPoolExecutor(self.max_connections,
+                                                thread_name_prefix=f"{self.name}-agent")
+        response = await asyncio.get_running_loop().run_in_executor(
+            self._executor, self._step_pooled, system, prompt, history, params
+        )
+        content = response.content if hasattr(response, 'content') else str(response)
+        usage = getattr(response, "info", None)
+        usage = usage.get("usage") if isinstance(usage, dict) else None
+        return Completion.from_usage(content, usage if isinstance(usage, dict) else None)
+
+    async def aclose(self):
+        """Close the pooled API client and stop the agents' threads once idle"""
+        await super().aclose()
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            executor.shutdown(wait=False)
+
+class DeepSeekBackend(ModelBackend):
+    """DeepSeek's OpenAI-compatible API"""
+    name = "deepseek"
+    model_name = "deepseek-chat"
+    base_url = DEEPSEEK_BASE_URL
+    api_key_env = "DEEPSEEK_API_KEY"
+    max_output_tokens = 8192
+
+class LocalBackend(ModelBackend):
+    """A local OpenAI-compatible server such as vLLM, llama.cpp or Ollama
+
+    Configured through CODEWEAVER_LOCAL_BASE_URL, CODEWEAVER_LOCAL_MODEL and
+    the optional CODEWEAVER_LOCAL_API_KEY.
+    """
+    name = "local"
+    model_name = "local-model"
+    base_url = LOCAL_BASE_URL
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("api_key", os.getenv("CODEWEAVER_LOCAL_API_KEY", ""))
+        kwargs.setdefault("base_url", os.getenv("CODEWEAVER_LOCAL_BASE_URL"))
+        kwargs.setdefault("model_name", os.getenv("CODEWEAVER_LOCAL_MODEL"))
+        super().__init__(**kwargs)
+
+_REGISTRY: Dict[str, Callable[..., ModelBackend]] = {}
+
+def register_backend(name: str, factory: Callable[..., ModelBackend]):
+    """Register a backend factory under a model name
+
+    Args:
+        name: Name passed as CodingAgent(model=...)
+        factory: Callable accepting ModelBackend keyword arguments
+    """
+    _REGISTRY[name.lower()] = factory
+
+def create_backend(name: str, **kwargs) -> ModelBackend:
+    """Create the backend registered under a model name"""
+    factory = _REGISTRY.get(name.lower())
+    if factory is None:
+        raise ValueError(f"Unsupported model: {name}")
+    return factory(**kwargs)
+
+def available_backends() -> List[str]:
+    """Return the registered model names"""
+    return sorted(_REGISTRY)
+
+register_backend("openai", OpenAIBackend)
+register_backend("deepseek", DeepSeekBackend)
+register_backend("local", LocalBackend)
@@ -0,0 +1,327 @@
+"""
+Content-addressed response cache for generated code
+"""
+import hashlib
+import json
+import random
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Union
+
+def cache_key(**parts) -> str:
+    """Build a stable hash of a fully rendered request
+
+    Args:
+        **parts: Everything that influences the response (model, system
+            message, prompt, sampling params)
+    """
+    payload = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class LRUCache:
+    """In-memory LRU cache with optional time-to-live"""
+
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = None):
+        """Initialize the cache
+
+        Args:
+            max_size: Maximum number of entries kept
+            ttl: Optional entry lifetime in seconds
+        """
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached value or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, stored_at = entry
+            if self.ttl is not None and time.time() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, stored_at: Optional[float] = None):
+        """Store a value, evicting the least recently used entry if full"""
+        with self._lock:
+            self._entries[key] = (value, time.time() if stored_at is None else stored_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Remove all entries"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class DiskCache:
+    """Persistent SQLite-backed cache tier"""
+
+    def __init__(self, path: Union[str, Path], ttl: Optional[float] = None):
+        """Initialize the cache
+
+        Args:
+            path: SQLite database file, created if missing
+            ttl: Optional entry lifetime in seconds
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)"
+            )
+
+    def get(self, key: str) -> Optional[tuple]:
+        """Return (value, stored_at) or None if missing or expired"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, stored_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if self.ttl is not None and time.time() - row[1] > self.ttl:
+                with self._conn:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            return row
+
+    def set(self, key: str, value: str):
+        """Store a value"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, stored_at) VALUES (?, ?, ?)",
+                (key, value, time.time())
+            )
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
+
+class ResponseCache:
+    """Two-tier response cache: an LRU in memory backed by an optional disk store"""
+
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = None,
+                 path: Optional[Union[str, Path]] = None):
+        """Initialize the cache
+
+        Args:
+            max_size: Maximum number of entries kept in memory
+            ttl: Optional entry lifetime in seconds, applied to both tiers
+            path: Optional SQLite file for the persistent tier
+        """
+        self.memory = LRUCache(max_size=max_size, ttl=ttl)
+        self.disk = DiskCache(path, ttl=ttl) if path is not None else None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[str]:
+        """Look up a response, promoting disk hits into memory"""
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            row = self.disk.get(key)
+            if row is not None:
+                value = row[0]
+                self.memory.set(key, value, stored_at=row[1])
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value: str):
+        """Store a response in every tier"""
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    def close(self):
+        """Close the persistent tier"""
+        if self.disk is not None:
+            self.disk.close()
+
+# Words that say how a task is phrased rather than what it asks for.
+# Negations and direction words ("not", "from", "into") are kept since they
+# change what the code must do; "to" is mostly an infinitive, and the word
+# bigrams keep the order of "X to Y" without it
+STOPWORDS = frozenset("""
+a an the to of for in on at by with and or that this which is are be it its as if whether
+write create implement make build define generate develop code program function method
+python script please can you should will would given calculate compute find get return
+returns takes take using use
+""".split())
+
+# Words that flip the meaning of otherwise identical tasks; a near-duplicate
+# hit needs the same set of them on both sides
+POLARITY_WORDS = frozenset("""
+not no non never without except ascending descending increasing decreasing reverse reversed
+min max minimum maximum smallest largest lowest highest shortest longest first last odd even
+upper lower uppercase lowercase encode decode encrypt decrypt
+""".split())
+
+_WORD_PATTERN = re.compile(r'[a-z0-9]+')
+
+# Mersenne prime modulus for the MinHash permutations
+_MERSENNE = (1 << 61) - 1
+
+def task_words(text: str) -> tuple:
+    """Normalized content words of a task description, in order, each once"""
+    words = {}
+    for word in _WORD_PATTERN.findall(text.lower()):
+        if word in STOPWORDS:
+            continue
+        # Crude plural folding: "numbers" and "number" match
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        words.setdefault(word, None)
+    return tuple(words)
+
+def same_order(first: tuple, second: tuple) -> bool:
+    """Whether the words two descriptions share come in the same order in both
+
+    Tells "Fahrenheit to Celsius" from "Celsius to Fahrenheit", which
+    share all their words.
+    """
+    shared = set(first) & set(second)
+    return [word for word in first if word in shared] == [word for word in second if word in shared]
+
+def jaccard(first: frozenset, second: frozenset) -> float:
+    """Jaccard similarity of two token sets"""
+    if not first and not second:
+        return 1.0
+    return len(first & second) / len(first | second)
+
+class MinHasher:
+    """MinHash signatures estimating Jaccard similarity of token sets"""
+
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        """Initialize the hash permutations
+
+        Args:
+            num_perm: Signature length
+            seed: Seed for the permutations; signatures are only comparable
+                between hashers built with the same seed and length
+        """
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self._perms = [(rng.randrange(1, _MERSENNE), rng.randrange(0, _MERSENNE))
+                       for _ in range(num_perm)]
+
+    def signature(self, tokens: frozenset) -> tuple:
+        """Return the MinHash signature of a token set"""
+        hashes = [int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "big")
+                  for token in tokens] or [0]
+        return tuple(min((a * h + b) % _MERSENNE for h in hashes) for a, b in self._perms)
+
+class SemanticCache:
+    """Near-duplicate lookup of generated code by task description
+
+    Task descriptions are reduced to content words and indexed by MinHash
+    with locality-sensitive hashing, so a lookup only compares against
+    descriptions sharing a signature band. Candidates are confirmed by the
+    exact Jaccard similarity of their words against `threshold`, must have
+    the words they share in the same order, and must use the same
+    POLARITY_WORDS, so "not prime" never matches "prime". Entries live in
+    namespaces (the rest of the request: model, system message, prompt
+    template, history) so only otherwise identical requests match, and
+    the least recently used entry is evicted beyond `max_size`.
+    """
+
+    def __init__(self, threshold: float = 0.6, max_size: int = 4096,
+                 num_perm: int = 128, bands: int = 32):
+        """Initialize the cache
+
+        Args:
+            threshold: Minimum Jaccard similarity of the words for a hit
+            max_size: Maximum number of entries kept
+            num_perm: MinHash signature length
+            bands: LSH bands; more bands find less similar candidates
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.max_size = max_size
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm)
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._buckets = {}
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    def _band_keys(self, namespace: str, signature: tuple):
+        for band in range(self.bands):
+            yield namespace, band, signature[band * self.rows:(band + 1) * self.rows]
+
+    def get(self, namespace: str, description: str) -> Optional[str]:
+        """Return the value stored for the most similar description, if similar enough"""
+        words = task_words(description)
+        tokens = frozenset(words)
+        signature = self.hasher.signature(tokens)
+        with self._lock:
+            candidates = set()
+            for band_key in self._band_keys(namespace, signature):
+                candidates.update(self._buckets.get(band_key, ()))
+            best, best_score = None, self.threshold
+            polarity = tokens & POLARITY_WORDS
+            for entry_id in candidates:
+                entry_words, _, value = self._entries[entry_id]
+                entry_tokens = frozenset(entry_words)
+                if entry_tokens & POLARITY_WORDS != polarity or not same_order(words, entry_words):
+                    continue
+                score = jaccard(tokens, entry_tokens)
+                if score >= best_score:
+                    best, best_score = entry_id, score
+            if best is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best)
+            self.hits += 1
+            return self._entries[best][2]
+
+    def set(self, namespace: str, description: str, value: str):
+        """Store the value generated for a description"""
+        words = task_words(description)
+        signature = self.hasher.signature(frozenset(words))
+        with self._lock:
+            self._counter += 1
+            entry_id = self._counter
+            band_keys = list(self._band_keys(namespace, signature))
+            self._entries[entry_id] = (words, band_keys, value)
+            for band_key in band_keys:
+                self._buckets.setdefault(band_key, set()).add(entry_id)
+            while len(self._entries) > self.max_size:
+                self._evict()
+
+    def _evict(self):
+        """Drop the least recently used entry"""
+        entry_id, (_, band_keys, _) = self._entries.popitem(last=False)
+        for band_key in band_keys:
+            bucket = self._buckets[band_key]
+            bucket.discard(entry_id)
+            if not bucket:
+                del self._buckets[band_key]
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,371 @@
+"""
+Evaluation of backends on a suite of tasks with reference tests
+"""
+import asyncio
+import json
+import math
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+from codeweaver.agent import CodingAgent, CodingTask
+from codeweaver.backends import ModelBackend, create_backend
+from codeweaver.sandbox import SandboxPool
+from codeweaver.validation import CodeValidator
+
+# USD per million (prompt, completion) tokens by provider model name, as
+# listed when written; pass current prices to the Evaluator to override
+DEFAULT_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "deepseek-chat": (0.27, 1.10),
+}
+
+@dataclass
+class EvalTask:
+    """A task of the suite: a function to complete and its reference tests
+
+    Follows HumanEval: `prompt` holds the signature and docstring, `test`
+    defines check(candidate), which is called on `entry_point`. Without an
+    entry point the tests are plain statements run after the code.
+    """
+    task_id: str
+    prompt: str
+    test: str
+    entry_point: Optional[str] = None
+
+    @property
+    def description(self) -> str:
+        """Task description sent to the agent"""
+        return ("Complete the following Python function. Return the whole function, "
+                "including the imports it needs.\n\n" + self.prompt)
+
+    def program(self, code: str) -> str:
+        """The program testing generated code, run in the sandbox
+
+        The prompt goes first so its imports and helpers are defined; the
+        generated function then replaces the stub.
+        """
+        parts = [self.prompt, code, self.test]
+        if self.entry_point:
+            parts.append(f"check({self.entry_point})")
+        return "\n\n".join(parts) + "\n"
+
+def load_suite(path: Union[str, Path]) -> List[EvalTask]:
+    """Load a HumanEval-style JSONL suite
+
+    Each line needs task_id, prompt and test; entry_point is optional and
+    other fields (canonical_solution, ...) are ignored.
+    """
+    tasks = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            tasks.append(EvalTask(str(record["task_id"]), record["prompt"], record["test"],
+                                  record.get("entry_point")))
+    return tasks
+
+@dataclass
+class Sample:
+    """One generated sample and the outcome of its tests"""
+    backend: str
+    task_id: str
+    sample: int
+    passed: bool = False
+    elapsed: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    error: Optional[str] = None
+    code: Optional[str] = None
+
+@dataclass
+class BackendReport:
+    """Aggregate results of one backend over a run"""
+    backend: str
+    model: str
+    tasks: int
+    samples: int
+    pass_at: Dict[int, float]
+    latency: Dict[str, float]
+    prompt_tokens: int
+    completion_tokens: int
+    cost: Optional[float]
+    errors: int
+
+def pass_at_k(n: int, c: int, k: int) -> float:
+    """Unbiased estimate of pass@k from n samples of which c passed"""
+    if n - c < k:
+        return 1.0
+    return 1.0 - math.comb(n - c, k) / math.comb(n, k)
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile, 0.0 for no values"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+def summarize(samples: Iterable[Sample], models: Dict[str, str], ks: Sequence[int] = (1,),
+              prices: Optional[Dict[str, Tuple[float, float]]] = None) -> Dict[str, BackendReport]:
+    """Aggregate samples into a report per backend
+
+    Args:
+        samples: Samples of a run
+        models: Provider model name of each backend, for pricing
+        ks: k values to report pass@k for; those above the number of
+            samples per task are left out
+        prices: USD per million (prompt, completion) tokens by model name
+    """
+    prices = DEFAULT_PRICES if prices is None else prices
+    by_backend = defaultdict(list)
+    for sample in samples:
+        by_backend[sample.backend].append(sample)
+
+    reports = {}
+    for backend, backend_samples in by_backend.items():
+        by_task = defaultdict(list)
+        for sample in backend_samples:
+            by_task[sample.task_id].append(sample.passed)
+        pass_at = {}
+        for k in ks:
+            if all(len(results) >= k for results in by_task.values()):
+                pass_at[k] = sum(pass_at_k(len(results), sum(results), k)
+                                 for results in by_task.values()) / len(by_task)
+        latencies = [sample.elapsed for sample in backend_samples if sample.error is None]
+        prompt_tokens = sum(sample.prompt_tokens for sample in backend_samples)
+        completion_tokens = sum(sample.completion_tokens for sample in backend_samples)
+        price = prices.get(models.get(backend))
+        reports[backend] = BackendReport(
+            backend=backend,
+            model=models.get(backend) or "",
+            tasks=len(by_task),
+            samples=len(backend_samples),
+            pass_at=pass_at,
+            latency={f"p{q}": percentile(latencies, q) for q in (50, 90, 99)},
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            cost=(prompt_tokens * price[0] + completion_tokens * price[1]) / 1e6
+            if price else None,
+            errors=sum(sample.error is not None for sample in backend_samples)
+        )
+    return reports
+
+@dataclass
+class EvalRun:
+    """Every sample of one evaluation and the settings it ran with"""
+    suite: str
+    params: dict
+    models: Dict[str, str]
+    samples: List[Sample] = field(default_factory=list)
+    started_at: float = field(default_factory=time.time)
+    run_id: Optional[int] = None
+
+    def reports(self, ks: Optional[Sequence[int]] = None,
+                prices: Optional[Dict[str, Tuple[float, float]]] = None) -> Dict[str, BackendReport]:
+        """Per-backend reports, for the run's k values unless others are given"""
+        return summarize(self.samples, self.models, ks or self.params.get("ks", (1,)), prices)
+
+class Evaluator:
+    """Generates samples for a suite on several backends and tests them
+
+    All backends and samples are generated concurrently, and every sample
+    is tested in a pool of warm sandbox processes as soon as it arrives.
+    """
+
+    def __init__(self, backends: Sequence[Union[str, ModelBackend]], samples: int = 1,
+                 ks: Sequence[int] = (1,), concurrency: int = 8, workers: int = 4,
+                 temperature: Optional[float] = None, max_tokens: Optional[int] = None,
+                 test_timeout: float = 10.0):
+        """Initialize the evaluator
+
+        Args:
+            backends: Backend names or instances; names must be distinct
+            samples: Samples generated per task and backend (n)
+            ks: k values pass@k is reported for
+            concurrency: Generations in flight per backend
+            workers: Sandbox processes running tests
+            temperature: Sampling temperature, defaults to the backend's
+            max_tokens: Maximum tokens per sample, defaults to the backend's
+            test_timeout: Seconds a sample's tests may run
+        """
+        self.backends = [backend if isinstance(backend, ModelBackend) else create_backend(backend)
+                         for backend in backends]
+        names = [backend.name for backend in self.backends]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Backend names must be distinct: {names}")
+        self.samples = samples
+        self.ks = tuple(ks)
+        self.concurrency = concurrency
+        self.workers = workers
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.test_timeout = test_timeout
+
+    def run(self, suite: Sequence[EvalTask], name: str = "") -> EvalRun:
+        """Evaluate every backend on a suite; blocking wrapper around arun"""
+        return asyncio.run(self.arun(suite, name))
+
+    async def arun(self, suite: Sequence[EvalTask], name: str = "") -> EvalRun:
+        """Evaluate every backend on a suite
+
+        Args:
+            suite: Tasks to evaluate
+            name: Suite name recorded with the run, e.g. its file name
+        """
+        run = EvalRun(
+            suite=name,
+            params={"samples": self.samples, "ks": list(self.ks),
+                    "temperature": self.temperature, "max_tokens": self.max_tokens},
+            models={backend.name: backend.model_name for backend in self.backends}
+        )
+        async with SandboxPool(size=self.workers, timeout=self.test_timeout) as sandbox:
+            results = await asyncio.gather(*(self._evaluate(backend, suite, sandbox)
+                                             for backend in self.backends))
+        for samples in results:
+            run.samples.extend(samples)
+        return run
+
+    async def _evaluate(self, backend: ModelBackend, suite: Sequence[EvalTask],
+                        sandbox: SandboxPool) -> List[Sample]:
+        """Generate and test every sample of a suite on one backend
+
+        Each sample is a single draw: nothing is regenerated, and only
+        syntax is checked before the tests run, since the lint checks see
+        the completion without the imports and helpers of its prompt.
+        """
+        agent = CodingAgent(model=backend, temperature=self.temperature,
+                            max_tokens=self.max_tokens, regenerate=0,
+                            validator=CodeValidator(undefined_names=False,
+                                                    missing_returns=False))
+        jobs = [(task, index) for task in suite for index in range(self.samples)]
+        samples = []
+        tests = []
+        try:
+            results = agent.agenerate_many((CodingTask(task.description) for task, _ in jobs),
+                                           concurrency=self.concurrency)
+            async for result in results:
+                task, index = jobs[result.index]
+                sample = Sample(backend.name, task.task_id, index, elapsed=result.elapsed,
+                                prompt_tokens=result.prompt_tokens,
+                                completion_tokens=result.completion_tokens,
+                                error=result.error, code=result.code)
+                samples.append(sample)
+                if result.ok:
+                    tests.append(asyncio.create_task(self._test(task, sample, sandbox)))
+            await asyncio.gather(*tests)
+            return samples
+        finally:
+            for test in tests:
+                test.cancel()
+            await agent.aclose()
+
+    async def _test(self, task: EvalTask, sample: Sample, sandbox: SandboxPool):
+        """Run a sample against its task's tests, recording whether it passed"""
+        result = await sandbox.run(task.program(sample.code))
+        sample.passed = result.ok
+
+class ResultsDB:
+    """SQLite store of evaluation runs for run-over-run comparison"""
+
+    def __init__(self, path: Union[str, Path]):
+        """Open the database, creating it if missing
+
+        Args:
+            path: SQLite database file
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS runs ("
+                "run_id INTEGER PRIMARY KEY AUTOINCREMENT, started_at REAL NOT NULL, "
+                "suite TEXT NOT NULL, params TEXT NOT NULL, models TEXT NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS samples ("
+                "run_id INTEGER NOT NULL REFERENCES runs(run_id), backend TEXT NOT NULL, "
+                "task_id TEXT NOT NULL, sample INTEGER NOT NULL, passed INTEGER NOT NULL, "
+                "elapsed REAL NOT NULL, prompt_tokens INTEGER NOT NULL, "
+                "completion_tokens INTEGER NOT NULL, error TEXT, code TEXT)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS samples_run ON samples (run_id)")
+
+    def save(self, run: EvalRun) -> int:
+        """Store a run and its samples, returning its id"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO runs (started_at, suite, params, models) VALUES (?, ?, ?, ?)",
+                (run.started_at, run.suite, json.dumps(run.params), json.dumps(run.models))
+            )
+            run.run_id = cursor.lastrowid
+            self._conn.executemany(
+                "INSERT INTO samples (run_id, backend, task_id, sample, passed, elapsed, "
+                "prompt_tokens, completion_tokens, error, code) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(run.run_id, s.backend, s.task_id, s.sample, int(s.passed), s.elapsed,
+                  s.prompt_tokens, s.completion_tokens, s.error, s.code) for s in run.samples]
+            )
+        return run.run_id
+
+    def load(self, run_id: int) -> EvalRun:
+        """Load a stored run"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT started_at, suite, params, models FROM runs WHERE run_id = ?", (run_id,)
+            ).fetchone()
+            if row is None:
+                raise KeyError(f"No evaluation run {run_id}")
+            samples = self._conn.execute(
+                "SELECT backend, task_id, sample, passed, elapsed, prompt_tokens, "
+                "completion_tokens, error, code FROM samples WHERE run_id = ?", (run_id,)
+            ).fetchall()
+        return EvalRun(suite=row[1], params=json.loads(row[2]), models=json.loads(row[3]),
+                       samples=[Sample(*values[:3], bool(values[3]), *values[4:])
+                                for values in samples],
+                       started_at=row[0], run_id=run_id)
+
+    def runs(self) -> List[dict]:
+        """Every stored run, oldest first, without its samples"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT run_id, started_at, suite, params, models FROM runs ORDER BY run_id"
+            ).fetchall()
+        return [{"run_id": run_id, "started_at": started_at, "suite": suite,
+                 "params": json.loads(params), "models": json.loads(models)}
+                for run_id, started_at, suite, params, models in rows]
+
+    def compare(self, base_id: int, new_id: int,
+                ks: Optional[Sequence[int]] = None) -> Dict[str, Dict[str, float]]:
+        """Change of each backend's metrics from one run to another
+
+        Returns:
+            For each backend in both runs, the new minus the base value of
+            pass@k, latency percentiles and cost per sample
+        """
+        base, new = self.load(base_id), self.load(new_id)
+        ks = ks or sorted(set(base.params.get("ks", [1])) & set(new.params.get("ks", [1])))
+        base_reports, new_reports = base.reports(ks), new.reports(ks)
+        changes = {}
+        for backend in base_reports.keys() & new_reports.keys():
+            old, current = asdict(base_reports[backend]), asdict(new_reports[backend])
+            change = {f"pass@{k}": current["pass_at"][k] - old["pass_at"][k]
+                      for k in ks if k in old["pass_at"] and k in current["pass_at"]}
+            for name in current["latency"]:
+                change[f"latency_{name}"] = current["latency"][name] - old["latency"][name]
+            if old["cost"] is not None and current["cost"] is not None:
+                change["cost_per_sample"] = (current["cost"] / current["samples"]
+                                             - old["cost"] / old["samples"])
+            changes[backend] = change
+        return changes
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,257 @@
+"""
+Extraction of generated code from raw model responses
+"""
+import re
+from typing import List, NamedTuple, Optional
+
+# Full ANSI CSI escape sequences (colors, cursor movement, erase, ...)
+ANSI_PATTERN = re.compile(r'\x1b\[[0-?]*[ -/]*[@-~]')
+
+CODE_LABEL = "Code"
+
+# Fence languages taken as the generated code. Blocks in other languages,
+# e.g. a ```bash block with install commands, are only used when a
+# response has nothing else.
+PYTHON_LANGUAGES = frozenset({"python", "python3", "py"})
+
+# Everything the extractor reacts to starts a line: code fences, CAMEL
+# section labels ("> Explanation:", "> Code:", ...), possibly behind color
+# codes whose escape character was lost, and timestamped log lines leaked
+# by verbose agents ("2024-12-08 20:45:02,014 - camel - INFO - ...")
+_LINE_TOKEN = (
+    r'(?:(?P<fence>```)'
+    r'|(?:\[\d+(?:;\d+)*m)*> (?P<label>[A-Z][\w ]*):'
+    r'|(?P<log>20\d\d-\d\d-\d\d[^\n]*?\b(?:DEBUG|INFO|WARNING|ERROR|CRITICAL) -))'
+)
+LINE_TOKEN_PATTERN = re.compile(_LINE_TOKEN)
+
+# The same tokens after a newline. The lookahead on the first character
+# lets the regex engine reject ordinary lines without trying each branch.
+_TOKEN_PATTERN = re.compile(r'\n(?=[`>2\[])' + _LINE_TOKEN)
+
+class CodeSegment(NamedTuple):
+    """A block of code found in a response"""
+    language: Optional[str]
+    code: str
+
+def _cut(text: str, start: int, end: int, cuts: list) -> str:
+    """Slice text[start:end] leaving out the given sorted line ranges"""
+    pieces = []
+    for cut_start, cut_end in cuts:
+        if cut_end <= start:
+            continue
+        if cut_start >= end:
+            break
+        pieces.append(text[start:cut_start])
+        start = cut_end
+    pieces.append(text[start:end])
+    return "".join(pieces)
+
+def _tokens(text: str):
+    """Yield (line start, match) for every line of text opening with a token"""
+    match = LINE_TOKEN_PATTERN.match(text)
+    if match:
+        yield 0, match
+    for match in _TOKEN_PATTERN.finditer(text):
+        yield match.start() + 1, match
+
+def extract_segments(text: str) -> List[CodeSegment]:
+    """Extract code segments from a response
+
+    Handles ANSI escape sequences, leaked log lines, fenced code blocks
+    (possibly several) and CAMEL's "> Code:" sections. Fenced blocks take
+    precedence over CAMEL sections; a response with neither is treated as
+    one block of code. Escape sequences, if any, are removed in one
+    substitution; the response is then scanned once and only the extracted
+    code is copied.
+    """
+    if "\x1b" in text:
+        text = ANSI_PATTERN.sub('', text)
+
+    cuts = []
+    fenced = []
+    sections = []
+    fence_start = None
+    fence_lang = None
+    section_start = None
+
+    for line_start, match in _tokens(text):
+        line_end = text.find("\n", match.end())
+        line_end = len(text) if line_end == -1 else line_end + 1
+        if match.group("fence"):
+            if fence_start is None:
+                fence_lang = text[match.end():line_end].strip() or None
+                fence_start = line_end
+            else:
+                fenced.append((fence_lang, fence_start, line_start))
+                fence_start = None
+        elif match.group("label"):
+            if fence_start is not None:
+                continue
+            if section_start is not None:
+                sections.append((None, section_start, line_start))
+                section_start = None
+            if match.group("label") == CODE_LABEL:
+                section_start = match.end()
+        else:
+            cuts.append((line_start, line_end))
+
+    if fence_start is not None:
+        # Unterminated fence, e.g. a response cut off at max_tokens
+        fenced.append((fence_lang, fence_start, len(text)))
+    if section_start is not None:
+        sections.append((None, section_start, len(text)))
+
+    segments = []
+    for language, start, end in fenced or sections or [(None, 0, len(text))]:
+        code = _cut(text, start, end, cuts).strip()
+        if code:
+            segments.append(CodeSegment(language, code))
+    return segments
+
+def is_python(language: Optional[str]) -> bool:
+    """Whether a segment's fence language marks Python code (untagged counts)"""
+    return language is None or language.lower() in PYTHON_LANGUAGES
+
+def extract_code(text: str) -> str:
+    """Extract the code from a response, joining multiple segments
+
+    Only Python and untagged segments are joined; segments in other
+    languages are used only if there are no others.
+    """
+    segments = extract_segments(text)
+    segments = [segment for segment in segments if is_python(segment.language)] or segments
+    return "\n\n".join(segment.code for segment in segments)
+
+class StreamExtractor:
+    """Incrementally extract code from a streamed response
+
+    Applies the rules of extract_code one line at a time so that code can
+    be emitted while the response is still arriving. For responses that
+    open with code, a code fence or a CAMEL label the joined output equals
+    extract_code on the full response; prose ahead of a later fence is
+    emitted rather than dropped, since that cannot be known in advance.
+    Fenced blocks in other languages than Python are held back and only
+    emitted at the end if no Python block arrived.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._held = []
+        self._blank = ""
+        self._state = "start"
+        self._fence = False
+        self._fenced = False
+        self._foreign = None
+        self._foreign_blocks = []
+        self._python_fenced = False
+        self._emitted = False
+        self._separate = False
+
+    @property
+    def done(self) -> bool:
+        """Whether the end of the stream has been processed"""
+        return self._state == "done"
+
+    def feed(self, chunk: str) -> str:
+        """Consume a chunk of the response and return code ready to emit"""
+        if self.done:
+            return ""
+        self._buffer += chunk
+        lines = self._buffer.split("\n")
+        self._buffer = lines.pop()
+        return "".join(self._process(line) for line in lines)
+
+    def finish(self) -> str:
+        """Flush the remaining buffered response at the end of the stream"""
+        if self.done:
+            return ""
+        output = self._process(self._buffer.rstrip())
+        self._buffer = ""
+        if self._state == "preamble":
+            # No code section ever arrived, so the whole response is the code
+            self._state = "code"
+            held, self._held = self._held, []
+            output = "".join(self._emit(line) for line in held)
+        if self._foreign_blocks and not self._python_fenced:
+            # Only blocks in other languages arrived, so they are the code
+            self._state = "code"
+            for block in self._foreign_blocks:
+                self._separate = True
+                output += "".join(self._emit(line) for line in block)
+        self._state = "done"
+        return output
+
+    def _process(self, line: str) -> str:
+        """Handle one complete line of the response"""
+        if "\x1b" in line:
+            line = ANSI_PATTERN.sub('', line)
+        token = LINE_TOKEN_PATTERN.match(line)
+        if token and token.group("log"):
+            return ""
+
+        fence = token is not None and token.group("fence") is not None
+        if self._fence:
+            if fence:
+                self._fence = False
+                self._foreign = None
+                self._separate = True
+                return ""
+            if self._foreign is not None:
+                self._foreign.append(line)
+                return ""
+            return self._emit(line)
+        if fence:
+            self._fence = True
+            self._state = "code"
+            self._held = []
+            self._separate = self._fenced = True
+            if is_python(line[token.end():].strip() or None):
+                self._python_fenced = True
+            else:
+                self._foreign = []
+                self._foreign_blocks.append(self._foreign)
+            return ""
+
+        if token and token.group("label"):
+            label = token.group("label")
+            if self._state == "start":
+                self._state = "preamble"
+            if self._state == "preamble":
+                if label != CODE_LABEL:
+                    self._held.append(line)
+                    return ""
+                self._held = []
+            self._state = "code" if label == CODE_LABEL else "skip"
+            self._separate = True
+            return self._emit(line[token.end():])
+
+        if self._state == "start":
+            if not line.strip():
+                return ""
+            self._state = "code"
+        if self._state == "preamble":
+            self._held.append(line)
+            return ""
+        if self._fenced:
+            return ""
+        return self._emit(line)
+
+    def _emit(self, line: str) -> str:
+        """Emit a line, dropping blank lines at segment boundaries"""
+        if self._state == "skip":
+            return ""
+        if not line.strip():
+            if self._emitted and not self._separate:
+                self._blank += "\n" + line
+            return ""
+        if not self._emitted:
+            self._emitted = True
+            self._separate = False
+            return line.lstrip()
+        if self._separate:
+            self._separate = False
+            self._blank = ""
+            return "\n\n" + line.lstrip()
+        text, self._blank = self._blank + "\n" + line, ""
+        return text
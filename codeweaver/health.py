@@ -0,0 +1,109 @@
+"""
+Circuit breakers tracking the health of each backend
+"""
+import time
+from collections import deque
+from typing import Optional
+
+# Breaker states
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Message to cancel requests with whose result is no longer wanted, e.g. the
+# losers of a race. Unlike other cancellations, such as timeouts, these say
+# nothing about the backend's health and are not recorded.
+ABANDONED = "abandoned"
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a backend whose circuit is open"""
+
+    def __init__(self, backend: str):
+        super().__init__(f"Circuit open for backend '{backend}'")
+        self.backend = backend
+
+class CircuitBreaker:
+    """Error rate and latency driven circuit breaker for one backend
+
+    Closed, calls go through and their outcomes fill a sliding window.
+    Once the window holds enough calls and the share of failures (errors
+    and timeouts, plus calls slower than the slow call threshold) reaches the failure
+    rate, the circuit opens and calls are refused outright. After the
+    reset timeout it turns half-open: a single trial, normally a health
+    probe, is let through and closes the circuit on success or opens it
+    again on failure.
+    """
+
+    def __init__(self, failure_rate: float = 0.5, window: int = 20, min_calls: int = 5,
+                 slow_call: Optional[float] = None, reset_timeout: float = 30.0):
+        """Initialize the breaker, closed
+
+        Args:
+            failure_rate: Share of failed calls in the window that opens
+                the circuit
+            window: Number of most recent calls the rate is taken over
+            min_calls: Calls needed in the window before it can open
+            slow_call: Seconds after which a successful call counts as a
+                failure, or None to ignore latency
+            reset_timeout: Seconds the circuit stays open before a trial
+        """
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.slow_call = slow_call
+        self.reset_timeout = reset_timeout
+        self.opened = 0
+        self._outcomes = deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._trial = False
+
+    @property
+    def state(self) -> str:
+        """CLOSED, OPEN, or HALF_OPEN once an open circuit's timeout has passed"""
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = HALF_OPEN
+            self._trial = False
+        return self._state
+
+    @property
+    def available(self) -> bool:
+        """Whether regular traffic should be sent through"""
+        return self.state == CLOSED
+
+    def try_trial(self) -> bool:
+        """Claim the single trial call of a half-open circuit"""
+        if self.state != HALF_OPEN or self._trial:
+            return False
+        self._trial = True
+        return True
+
+    def record(self, ok: bool, latency: float = 0.0):
+        """Record the outcome of a call
+
+        Args:
+            ok: Whether the call succeeded
+            latency: Seconds the call took
+        """
+        failed = not ok or (self.slow_call is not None and latency > self.slow_call)
+        state = self.state
+        if state == HALF_OPEN:
+            if failed:
+                self._open()
+            else:
+                self._state = CLOSED
+                self._outcomes.clear()
+            return
+        if state == OPEN:
+            # A call started before the circuit opened
+            return
+        self._outcomes.append(failed)
+        if (len(self._outcomes) >= self.min_calls
+                and sum(self._outcomes) >= self.failure_rate * len(self._outcomes)):
+            self._open()
+
+    def _open(self):
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._trial = False
+        self._outcomes.clear()
+        self.opened += 1
@@ -0,0 +1,73 @@
+"""
+Minimal HTTP/1.1 plumbing shared by the asyncio servers (mock LLM server, service)
+"""
+import asyncio
+import json
+from typing import Awaitable, Callable, Optional
+
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               413: "Payload Too Large", 429: "Too Many Requests",
+               500: "Internal Server Error", 502: "Bad Gateway", 503: "Service Unavailable"}
+
+# respond(method, path, body, writer) answers one request
+Responder = Callable[[str, str, bytes, asyncio.StreamWriter], Awaitable[None]]
+
+async def serve_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                           respond: Responder, max_body: Optional[int] = None):
+    """Serve requests on one keep-alive connection until the client closes it
+
+    Args:
+        reader: Connection reader from asyncio.start_server
+        writer: Connection writer from asyncio.start_server
+        respond: Coroutine function writing the response to one request
+        max_body: Largest request body accepted; larger requests get a 413
+            and the connection is closed without reading the body
+    """
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            method, path, _ = request_line.decode("latin-1").split(" ", 2)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            length = int(headers.get("content-length", 0))
+            if max_body is not None and length > max_body:
+                send_json(writer, 413, {"error": "Request body too large"})
+                await writer.drain()
+                break
+            body = await reader.readexactly(length)
+            await respond(method, path, body, writer)
+            await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+def send_json(writer: asyncio.StreamWriter, status: int, payload: dict,
+              headers: Optional[dict] = None):
+    """Write a complete JSON response"""
+    body = json.dumps(payload).encode()
+    head = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, 'Error')}",
+            "Content-Type: application/json", f"Content-Length: {len(body)}"]
+    head += [f"{name}: {value}" for name, value in (headers or {}).items()]
+    writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + body)
+
+def start_event_stream(writer: asyncio.StreamWriter):
+    """Write the head of a chunked server-sent events response"""
+    writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                 b"Cache-Control: no-cache\r\nTransfer-Encoding: chunked\r\n\r\n")
+
+def send_event(writer: asyncio.StreamWriter, data: str):
+    """Write one server-sent event as a chunk"""
+    payload = f"data: {data}\n\n".encode()
+    writer.write(f"{len(payload):x}\r\n".encode() + payload + b"\r\n")
+
+def end_event_stream(writer: asyncio.StreamWriter):
+    """Write the closing chunk of an event stream"""
+    writer.write(b"0\r\n\r\n")
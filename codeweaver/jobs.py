@@ -0,0 +1,447 @@
+"""
+Durable SQLite job queue for generation tasks, worked by any number of processes
+
+    python -m codeweaver.jobs enqueue tasks.jsonl --db jobs.db
+    python -m codeweaver.jobs work --db jobs.db --workers 4 --model openai
+    python -m codeweaver.jobs status --db jobs.db
+    python -m codeweaver.jobs export results.jsonl --db jobs.db
+
+Workers lease jobs for a limited time and keep their leases alive while
+generating. Jobs leased by a worker that crashed or was killed are
+leased again once their lease expires, so stopping and restarting
+workers at any point loses no work.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+from codeweaver.agent import CodingAgent, CodingTask
+from codeweaver.scheduler import BATCH
+
+logger = logging.getLogger(__name__)
+
+# Job states
+QUEUED = "queued"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+@dataclass
+class Job:
+    """A job as stored in the queue"""
+    id: int
+    key: str
+    task: str
+    status: str = QUEUED
+    attempts: int = 0
+    owner: Optional[str] = None
+    code: Optional[str] = None
+    error: Optional[str] = None
+    elapsed: Optional[float] = None
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    enqueued_at: float = 0.0
+    finished_at: Optional[float] = None
+
+_COLUMNS = ("id, key, task, status, attempts, owner, code, error, elapsed, prompt_tokens, "
+            "completion_tokens, enqueued_at, finished_at")
+
+class JobQueue:
+    """Durable queue of generation tasks in a SQLite database
+
+    Jobs are leased to a named owner for `lease_seconds`; the owner acks
+    them with their result or fails them. Failed jobs are queued again
+    after `retry_delay` until they have been attempted `max_attempts`
+    times, and leases that expire, because their owner died, count as
+    failed attempts. Every state change is a single transaction, so any
+    number of processes can share a queue.
+    """
+
+    def __init__(self, path: Union[str, Path], lease_seconds: float = 300.0,
+                 max_attempts: int = 3, retry_delay: float = 5.0):
+        """Open the queue, creating the database if missing
+
+        Args:
+            path: SQLite database file
+            lease_seconds: How long a lease lasts without a heartbeat
+            max_attempts: Attempts before a job is marked failed for good
+            retry_delay: Seconds a failed job waits before it is retried
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._lock = threading.Lock()
+        # Autocommit mode; writes take the database lock up front with BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(str(self.path), timeout=60, isolation_level=None,
+                                     check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT NOT NULL UNIQUE, "
+            "task TEXT NOT NULL, status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, "
+            "owner TEXT, lease_expires REAL, available_at REAL NOT NULL, code TEXT, "
+            "error TEXT, elapsed REAL, prompt_tokens INTEGER NOT NULL DEFAULT 0, "
+            "completion_tokens INTEGER NOT NULL DEFAULT 0, enqueued_at REAL NOT NULL, "
+            "finished_at REAL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, available_at)"
+        )
+
+    @contextlib.contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Hold the database write lock for the statements run inside"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def enqueue(self, tasks: Iterable[Union[str, Tuple[str, str]]]) -> int:
+        """Add tasks, returning how many were new
+
+        Args:
+            tasks: Task descriptions, or (key, description) pairs; a task
+                whose key (the description by default) is already queued
+                is skipped, so enqueuing the same input again is harmless
+        """
+        now = time.time()
+        rows = [(task, task) if isinstance(task, str) else tuple(task) for task in tasks]
+        with self._transaction() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO jobs (key, task, status, available_at, enqueued_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(str(key), task, QUEUED, now, now) for key, task in rows]
+            )
+            return conn.total_changes - before
+
+    def lease(self, owner: str, count: int = 1) -> List[Job]:
+        """Lease up to `count` ready jobs, reclaiming expired leases first
+
+        Args:
+            owner: Name of the worker taking the jobs
+            count: Maximum number of jobs to lease
+        """
+        if count < 1:
+            return []
+        now = time.time()
+        with self._transaction() as conn:
+            self._reclaim(conn, now)
+            rows = conn.execute(
+                f"SELECT {_COLUMNS} FROM jobs WHERE status = ? AND available_at <= ? "
+                "ORDER BY available_at, id LIMIT ?", (QUEUED, now, count)
+            ).fetchall()
+            conn.executemany(
+                "UPDATE jobs SET status = ?, owner = ?, lease_expires = ?, "
+                "attempts = attempts + 1 WHERE id = ?",
+                [(LEASED, owner, now + self.lease_seconds, row[0]) for row in rows]
+            )
+        jobs = [Job(*row) for row in rows]
+        for job in jobs:
+            job.status, job.owner, job.attempts = LEASED, owner, job.attempts + 1
+        return jobs
+
+    def _reclaim(self, conn: sqlite3.Connection, now: float) -> int:
+        """Requeue or fail jobs whose lease expired, inside a transaction"""
+        expired = conn.execute(
+            "SELECT id, owner, attempts FROM jobs WHERE status = ? AND lease_expires < ?",
+            (LEASED, now)
+        ).fetchall()
+        for job_id, owner, attempts in expired:
+            logger.warning("Reclaiming job %d from %s after its lease expired", job_id, owner)
+            error = f"Lease held by {owner} expired"
+            if attempts >= self.max_attempts:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, owner = NULL, error = ?, finished_at = ? "
+                    "WHERE id = ?", (FAILED, error, now, job_id)
+                )
+            else:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, owner = NULL, error = ?, available_at = ? "
+                    "WHERE id = ?", (QUEUED, error, now, job_id)
+                )
+        return len(expired)
+
+    def reclaim(self) -> int:
+        """Requeue or fail every job whose lease has expired, returning how many"""
+        with self._transaction() as conn:
+            return self._reclaim(conn, time.time())
+
+    def heartbeat(self, owner: str) -> int:
+        """Extend every lease held by an owner, returning how many are held"""
+        with self._transaction() as conn:
+            return conn.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE status = ? AND owner = ?",
+                (time.time() + self.lease_seconds, LEASED, owner)
+            ).rowcount
+
+    def ack(self, job: Job, code: str, elapsed: float, prompt_tokens: int = 0,
+            completion_tokens: int = 0) -> bool:
+        """Record a leased job's result
+
+        Returns:
+            False if the lease was lost (expired and reclaimed) meanwhile,
+            in which case the result is discarded
+        """
+        with self._transaction() as conn:
+            return conn.execute(
+                "UPDATE jobs SET status = ?, owner = NULL, code = ?, error = NULL, elapsed = ?, "
+                "prompt_tokens = ?, completion_tokens = ?, finished_at = ? "
+                "WHERE id = ? AND status = ? AND owner = ?",
+                (DONE, code, elapsed, prompt_tokens, completion_tokens, time.time(),
+                 job.id, LEASED, job.owner)
+            ).rowcount == 1
+
+    def fail(self, job: Job, error: str, elapsed: Optional[float] = None,
+             retry: bool = True) -> bool:
+        """Record a failed attempt, queueing the job again if attempts remain
+
+        Args:
+            job: The leased job
+            error: What went wrong
+            elapsed: Seconds the attempt took
+            retry: Whether the job may be retried at all
+
+        Returns:
+            False if the lease was lost meanwhile
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            if retry and job.attempts < self.max_attempts:
+                cursor = conn.execute(
+                    "UPDATE jobs SET status = ?, owner = NULL, error = ?, elapsed = ?, "
+                    "available_at = ? WHERE id = ? AND status = ? AND owner = ?",
+                    (QUEUED, error, elapsed, now + self.retry_delay, job.id, LEASED, job.owner)
+                )
+            else:
+                cursor = conn.execute(
+                    "UPDATE jobs SET status = ?, owner = NULL, error = ?, elapsed = ?, "
+                    "finished_at = ? WHERE id = ? AND status = ? AND owner = ?",
+                    (FAILED, error, elapsed, now, job.id, LEASED, job.owner)
+                )
+            return cursor.rowcount == 1
+
+    def counts(self) -> dict:
+        """Number of jobs in each state"""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = {QUEUED: 0, LEASED: 0, DONE: 0, FAILED: 0}
+        counts.update(rows)
+        return counts
+
+    def finished(self) -> bool:
+        """Whether every job is done or failed for good"""
+        counts = self.counts()
+        return counts[QUEUED] == counts[LEASED] == 0
+
+    def results(self) -> Iterator[Job]:
+        """Every finished (done or failed) job, in enqueue order"""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM jobs WHERE status IN (?, ?) ORDER BY id", (DONE, FAILED)
+            ).fetchall()
+        return (Job(*row) for row in rows)
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
+
+class JobWorker:
+    """Works jobs from a queue with one CodingAgent until the queue is finished"""
+
+    def __init__(self, queue: JobQueue, agent: CodingAgent, concurrency: int = 4,
+                 timeout: Optional[float] = None, poll_interval: float = 1.0,
+                 owner: Optional[str] = None):
+        """Initialize the worker
+
+        Args:
+            queue: Queue to take jobs from
+            agent: Agent generating the code
+            concurrency: Jobs generated at the same time
+            timeout: Optional per-job timeout in seconds
+            poll_interval: Seconds between checks for new jobs when idle
+            owner: Name the worker leases jobs under, by default host and pid
+        """
+        self.queue = queue
+        self.agent = agent
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.owner = owner or f"{socket.gethostname()}-{os.getpid()}"
+        self.completed = 0
+        self.failed = 0
+
+    async def _work(self, job: Job):
+        """Generate one job and record its outcome"""
+        result = await self.agent.agenerate_result(CodingTask(job.task), BATCH, self.timeout)
+        if result.ok:
+            if not self.queue.ack(job, result.code, result.elapsed, result.prompt_tokens,
+                                  result.completion_tokens):
+                logger.warning("Lease of job %d was lost; result discarded", job.id)
+                return
+            self.completed += 1
+        else:
+            logger.warning("Job %d failed (attempt %d): %s", job.id, job.attempts, result.error)
+            self.queue.fail(job, result.error, result.elapsed, retry=result.retryable)
+            self.failed += 1
+
+    async def arun(self, exit_when_finished: bool = True):
+        """Lease and generate jobs, keeping leases alive, until the queue is finished
+
+        Args:
+            exit_when_finished: Return once no job is queued or leased;
+                otherwise keep polling for new jobs
+        """
+        pending = set()
+        wait = min(self.poll_interval, self.queue.lease_seconds / 3)
+        last_heartbeat = time.monotonic()
+        try:
+            while True:
+                jobs = self.queue.lease(self.owner, self.concurrency - len(pending))
+                pending.update(asyncio.create_task(self._work(job)) for job in jobs)
+                if not pending:
+                    if exit_when_finished and self.queue.finished():
+                        return
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+                _, pending = await asyncio.wait(pending, timeout=wait,
+                                                return_when=asyncio.FIRST_COMPLETED)
+                if pending and time.monotonic() - last_heartbeat > self.queue.lease_seconds / 3:
+                    self.queue.heartbeat(self.owner)
+                    last_heartbeat = time.monotonic()
+        finally:
+            for task in pending:
+                task.cancel()
+
+def _work_process(path: str, queue_options: dict, agent_options: dict, concurrency: int,
+                  timeout: Optional[float]):
+    """Entry point of a worker process"""
+    queue = JobQueue(path, **queue_options)
+    agent = CodingAgent(**agent_options)
+    worker = JobWorker(queue, agent, concurrency=concurrency, timeout=timeout)
+
+    async def work():
+        try:
+            await worker.arun()
+        finally:
+            await agent.aclose()
+
+    try:
+        asyncio.run(work())
+    finally:
+        queue.close()
+    logger.info("Worker %s done: %d completed, %d failed", worker.owner, worker.completed,
+                worker.failed)
+
+def run_workers(path: Union[str, Path], workers: int = 2, concurrency: int = 4,
+                timeout: Optional[float] = None, queue_options: Optional[dict] = None,
+                **agent_options) -> List[int]:
+    """Work a queue with several processes, each with its own CodingAgent
+
+    Args:
+        path: Queue database
+        workers: Number of worker processes
+        concurrency: Jobs each worker generates at the same time
+        timeout: Optional per-job timeout in seconds
+        queue_options: JobQueue arguments (lease_seconds, max_attempts, ...)
+        **agent_options: CodingAgent arguments, e.g. model; must be picklable
+
+    Returns:
+        The exit codes of the worker processes
+    """
+    processes = [
+        multiprocessing.Process(target=_work_process,
+                                args=(str(path), queue_options or {}, agent_options,
+                                      concurrency, timeout))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    return [process.exitcode for process in processes]
+
+def main():
+    """Command line interface to a job queue"""
+    parser = argparse.ArgumentParser(description="Durable CodeWeaver job queue")
+    parser.add_argument("--db", default="jobs.db", help="Queue database")
+    parser.add_argument("--log-level", default=os.getenv("LOGLEVEL", "INFO"))
+    commands = parser.add_subparsers(dest="command", required=True)
+    enqueue = commands.add_parser("enqueue", help="Add tasks from a JSONL file or stdin")
+    enqueue.add_argument("input", help="JSONL of {\"id\": ..., \"task\": ...}, or - for stdin")
+    work = commands.add_parser("work", help="Work the queue until it is finished")
+    work.add_argument("--workers", type=int, default=2)
+    work.add_argument("--concurrency", type=int, default=4)
+    work.add_argument("--model", default=os.getenv("CODEWEAVER_MODEL", "openai"))
+    work.add_argument("--timeout", type=float, help="Per-job timeout in seconds")
+    work.add_argument("--lease", type=float, default=300.0, help="Lease duration in seconds")
+    work.add_argument("--max-attempts", type=int, default=3)
+    commands.add_parser("status", help="Print the number of jobs in each state")
+    export = commands.add_parser("export", help="Write finished jobs as JSONL")
+    export.add_argument("output", help="Output file, or - for stdout")
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level.upper(),
+                        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    if args.command == "work":
+        codes = run_workers(args.db, workers=args.workers, concurrency=args.concurrency,
+                            timeout=args.timeout,
+                            queue_options={"lease_seconds": args.lease,
+                                           "max_attempts": args.max_attempts},
+                            model=args.model)
+        return 1 if any(codes) else 0
+
+    queue = JobQueue(args.db)
+    try:
+        if args.command == "enqueue":
+            source = sys.stdin if args.input == "-" else open(args.input)
+            with source:
+                tasks = []
+                for line in source:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    if isinstance(record, str):
+                        record = {"task": record}
+                    task = record.get("task") or record.get("description", "")
+                    # Without an id the description is the key, as in JobQueue.enqueue;
+                    # a line number would collide with the lines of earlier files
+                    tasks.append((record.get("id", task), task))
+            print(f"Enqueued {queue.enqueue(tasks)} new tasks of {len(tasks)}")
+        elif args.command == "status":
+            print(json.dumps(queue.counts()))
+        else:
+            out = sys.stdout if args.output == "-" else open(args.output, "w")
+            with out:
+                for job in queue.results():
+                    out.write(json.dumps({
+                        "id": job.key, "task": job.task, "status": job.status,
+                        "code": job.code, "error": job.error, "attempts": job.attempts,
+                        "elapsed": job.elapsed, "prompt_tokens": job.prompt_tokens,
+                        "completion_tokens": job.completion_tokens
+                    }) + "\n")
+    finally:
+        queue.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
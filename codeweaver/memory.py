@@ -0,0 +1,130 @@
+"""
+Conversation memory policies deciding which earlier turns go with a request
+"""
+import re
+from collections import deque
+from typing import Callable, List, NamedTuple, Optional
+from codeweaver.scheduler import estimate_tokens
+
+_DEFINITION_PATTERN = re.compile(r'^\s*(?:async\s+)?(?:def|class)\s+(\w+)', re.MULTILINE)
+
+class Turn(NamedTuple):
+    """One completed request and its response"""
+    task: str
+    prompt: str
+    response: str
+
+    @property
+    def tokens(self) -> int:
+        return estimate_tokens(self.prompt) + estimate_tokens(self.response)
+
+def turn_messages(turn: Turn) -> List[dict]:
+    """Chat messages replaying a turn"""
+    return [
+        {"role": "user", "content": turn.prompt},
+        {"role": "assistant", "content": turn.response}
+    ]
+
+def summarize_turns(turns: List[Turn], summary: str = "") -> str:
+    """Fold turns into a running summary, one line per turn
+
+    Keeps the first line of each task and the names the response defined,
+    which is usually what later requests in a session refer back to.
+    """
+    lines = [summary] if summary else []
+    for turn in turns:
+        task = turn.task.strip().splitlines()[0] if turn.task.strip() else ""
+        names = _DEFINITION_PATTERN.findall(turn.response)
+        defined = f" -> defined {', '.join(names)}" if names else ""
+        lines.append(f"- {task}{defined}")
+    return "\n".join(lines)
+
+class MemoryPolicy:
+    """Decides which earlier turns are sent along with each request
+
+    The base policy is stateless: every task is sent on its own, so prompt
+    size stays flat however long a session runs.
+    """
+
+    def context(self) -> List[dict]:
+        """Chat messages to send ahead of the next prompt"""
+        return []
+
+    def record(self, turn: Turn):
+        """Remember a completed turn"""
+
+    def clear(self):
+        """Forget every remembered turn"""
+
+class Stateless(MemoryPolicy):
+    """Send every task without any earlier turns"""
+
+class SlidingWindow(MemoryPolicy):
+    """Send the last N turns verbatim"""
+
+    def __init__(self, turns: int):
+        """Initialize the window
+
+        Args:
+            turns: Number of most recent turns to keep
+        """
+        if turns < 1:
+            raise ValueError("turns must be at least 1")
+        self.turns = deque(maxlen=turns)
+
+    def context(self) -> List[dict]:
+        return [message for turn in self.turns for message in turn_messages(turn)]
+
+    def record(self, turn: Turn):
+        self.turns.append(turn)
+
+    def clear(self):
+        self.turns.clear()
+
+class TokenBudget(MemoryPolicy):
+    """Send recent turns verbatim within a token budget, older ones summarized
+
+    When the remembered turns outgrow the budget the oldest are folded into
+    a running summary, which is itself trimmed to stay within the budget.
+    """
+
+    def __init__(self, max_tokens: int,
+                 summarize: Optional[Callable[[List[Turn], str], str]] = None):
+        """Initialize the budget
+
+        Args:
+            max_tokens: Estimated tokens of context allowed per request
+            summarize: Callable folding turns into the previous summary,
+                defaults to summarize_turns (no model call)
+        """
+        if max_tokens < 1:
+            raise ValueError("max_tokens must be at least 1")
+        self.max_tokens = max_tokens
+        self.summarize = summarize or summarize_turns
+        self.turns = deque()
+        self.summary = ""
+
+    def _summary_message(self) -> dict:
+        return {"role": "user", "content": f"Summary of earlier requests:\n{self.summary}"}
+
+    def context(self) -> List[dict]:
+        messages = [self._summary_message()] if self.summary else []
+        return messages + [message for turn in self.turns for message in turn_messages(turn)]
+
+    def record(self, turn: Turn):
+        self.turns.append(turn)
+        used = sum(turn.tokens for turn in self.turns)
+        evicted = []
+        while self.turns and used + estimate_tokens(self.summary) > self.max_tokens:
+            oldest = self.turns.popleft()
+            used -= oldest.tokens
+            evicted.append(oldest)
+        if evicted:
+            self.summary = self.summarize(evicted, self.summary)
+        # Drop the oldest summary lines if the summary alone is over budget
+        while self.summary and used + estimate_tokens(self.summary) > self.max_tokens:
+            _, _, self.summary = self.summary.partition("\n")
+
+    def clear(self):
+        self.turns.clear()
+        self.summary = ""
@@ -0,0 +1,245 @@
+"""
+Local OpenAI-compatible stand-in server for offline tests and benchmarks
+
+Run it standalone with `python -m codeweaver.mock_server --port 8000` and
+point the local backend at it via CODEWEAVER_LOCAL_BASE_URL.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from typing import Callable, Optional, Union
+from codeweaver.http_server import (
+    end_event_stream, send_event, send_json, serve_connection, start_event_stream
+)
+
+DEFAULT_RESPONSE = "```python\ndef solution(n: int) -> int:\n    \"\"\"Return n doubled\"\"\"\n    return n * 2\n```"
+
+_TOKEN_PATTERN = re.compile(r'\S+\s*|\s+')
+
+class MockLLMServer:
+    """Minimal asyncio HTTP server implementing /v1/chat/completions
+
+    Latency per request is drawn from a log-normal distribution around
+    `latency`, output is paced at `tokens_per_second`, and a fraction
+    `error_rate` of requests fails with `error_status`.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.05,
+                 jitter: float = 0.0, tokens_per_second: Optional[float] = None,
+                 error_rate: float = 0.0, error_status: int = 429,
+                 response: Union[str, Callable[[str], str]] = DEFAULT_RESPONSE,
+                 cache_block: int = 256, seed: Optional[int] = None):
+        """Initialize the server
+
+        Args:
+            host: Interface to listen on
+            port: Port to listen on, 0 picks a free one
+            latency: Median delay before the first token, in seconds
+            jitter: Log-normal sigma of the delay, 0 for a fixed delay
+            tokens_per_second: Output pacing, unlimited if None
+            error_rate: Fraction of requests answered with an error
+            error_status: HTTP status of injected errors
+            response: Response text, or a callable mapping the prompt to it
+            cache_block: Size in characters of the blocks prompt prefixes are
+                cached in, mimicking provider prompt caching; 0 disables it
+            seed: Random seed for reproducible latency and errors
+        """
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.response = response
+        self.cache_block = cache_block
+        self.requests = 0
+        self.errors = 0
+        self.prompts = []
+        self._random = random.Random(seed)
+        self._prefixes = set()
+        self._server = None
+        self._thread = None
+        self._loop = None
+
+    @property
+    def base_url(self) -> str:
+        """OpenAI-compatible base URL of the running server"""
+        return f"http://{self.host}:{self.port}/v1"
+
+    async def start(self):
+        """Start listening"""
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        """Stop listening"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    def __enter__(self):
+        """Run the server on its own event loop in a background thread"""
+        started = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self.start())
+            started.set()
+            self._loop.run_forever()
+            self._loop.run_until_complete(self.stop())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        started.wait()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    def _delay(self) -> float:
+        if self.jitter:
+            return self.latency * math.exp(self._random.gauss(0, self.jitter))
+        return self.latency
+
+    def _cached_chars(self, text: str) -> int:
+        """Length of the block-aligned prefix of text already seen, then remember it"""
+        if not self.cache_block:
+            return 0
+        digest = hashlib.sha256()
+        cached = 0
+        hit = True
+        for end in range(self.cache_block, len(text) + 1, self.cache_block):
+            digest.update(text[end - self.cache_block:end].encode())
+            key = digest.digest()
+            if hit and key in self._prefixes:
+                cached = end
+            else:
+                hit = False
+                self._prefixes.add(key)
+        return cached
+
+    def _render(self, prompt: str) -> str:
+        return self.response(prompt) if callable(self.response) else self.response
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve requests on one keep-alive connection"""
+        await serve_connection(reader, writer, self._respond)
+
+    async def _respond(self, method: str, path: str, body: bytes, writer: asyncio.StreamWriter):
+        if method != "POST" or not path.rstrip("/").endswith("/chat/completions"):
+            send_json(writer, 404, {"error": {"message": f"No route for {method} {path}"}})
+            return
+
+        request = json.loads(body or b"{}")
+        messages = request.get("messages", [])
+        prompt = messages[-1]["content"] if messages else ""
+        self.requests += 1
+        self.prompts.append(prompt)
+
+        await asyncio.sleep(self._delay())
+        if self._random.random() < self.error_rate:
+            self.errors += 1
+            send_json(writer, self.error_status,
+                            {"error": {"message": "Injected failure", "type": "mock_error"}},
+                            {"retry-after": "0"})
+            return
+
+        text = self._render(prompt)
+        tokens = _TOKEN_PATTERN.findall(text)
+        sent = "".join(f"{m.get('role')}:{m.get('content', '')}" for m in messages)
+        usage = {
+            "prompt_tokens": len(sent) // 4 + 1,
+            "completion_tokens": len(tokens),
+            "prompt_tokens_details": {"cached_tokens": self._cached_chars(sent) // 4}
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        model = request.get("model", "mock")
+        choices = request.get("n") or 1
+
+        if request.get("stream"):
+            await self._stream(writer, completion_id, model, tokens, choices)
+            return
+
+        if self.tokens_per_second:
+            await asyncio.sleep(len(tokens) / self.tokens_per_second)
+        send_json(writer, 200, {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [
+                {"index": i, "message": {"role": "assistant", "content": text},
+                 "finish_reason": "stop"}
+                for i in range(choices)
+            ],
+            "usage": usage
+        })
+
+    async def _stream(self, writer: asyncio.StreamWriter, completion_id: str, model: str,
+                      tokens: list, choices: int):
+        """Send the response as server-sent events, one token per event"""
+        start_event_stream(writer)
+        for token in tokens + [None]:
+            for i in range(choices):
+                delta = {"content": token} if token is not None else {}
+                send_event(writer, json.dumps({
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": i, "delta": delta,
+                                 "finish_reason": None if token is not None else "stop"}]
+                }))
+            await writer.drain()
+            if token is not None and self.tokens_per_second:
+                await asyncio.sleep(1 / self.tokens_per_second)
+        send_event(writer, "[DONE]")
+        end_event_stream(writer)
+        await writer.drain()
+
+def main():
+    """Run the mock server until interrupted"""
+    parser = argparse.ArgumentParser(description="OpenAI-compatible mock LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--tokens-per-second", type=float)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=429)
+    args = parser.parse_args()
+
+    async def serve():
+        server = MockLLMServer(args.host, args.port, latency=args.latency, jitter=args.jitter,
+                               tokens_per_second=args.tokens_per_second,
+                               error_rate=args.error_rate, error_status=args.error_status)
+        await server.start()
+        print(f"Mock LLM server listening on {server.base_url}")
+        await asyncio.Event().wait()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
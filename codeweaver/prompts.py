@@ -0,0 +1,45 @@
+"""
+Prompt templates with a stable prefix for provider-side prompt caching
+"""
+from dataclasses import dataclass, field
+from typing import Tuple
+
+DEFAULT_INSTRUCTIONS = "Write a Python function that implements the task given at the end."
+
+DEFAULT_REQUIREMENTS = (
+    "Include proper error handling",
+    "Add type hints where applicable",
+    "Follow Python best practices",
+    "Write clean, maintainable code",
+    "Only return the code, no explanations",
+)
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """Renders the user prompt for a task
+
+    Providers such as OpenAI and DeepSeek cache repeated prompt prefixes,
+    billing and serving them faster on later requests. Everything fixed
+    (instructions, requirements, few-shot examples) is therefore rendered
+    first, identically for every task, and the task description last.
+    """
+    instructions: str = DEFAULT_INSTRUCTIONS
+    requirements: Tuple[str, ...] = DEFAULT_REQUIREMENTS
+    examples: Tuple[Tuple[str, str], ...] = ()
+    prefix: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        parts = [self.instructions]
+        if self.requirements:
+            lines = [f"{i}. {requirement}" for i, requirement in enumerate(self.requirements, 1)]
+            parts.append("Requirements:\n" + "\n".join(lines))
+        for task, code in self.examples:
+            parts.append(f"Example task:\n{task}\n\nExample solution:\n```python\n{code}\n```")
+        # Rendered once; frozen dataclasses need object.__setattr__
+        object.__setattr__(self, "prefix", "\n\n".join(parts) + "\n\nTask:\n")
+
+    def render(self, task: str) -> str:
+        """Render the prompt for a task description"""
+        return self.prefix + task
+
+DEFAULT_TEMPLATE = PromptTemplate()
@@ -0,0 +1,182 @@
+"""
+Pool of pre-warmed worker processes for executing generated code
+"""
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+from dataclasses import dataclass
+from typing import Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sandbox_worker.py")
+
+# Imported by each worker while warming up, so snippets using them start fast
+DEFAULT_PRELOAD = ("collections", "dataclasses", "functools", "itertools", "json", "math",
+                   "re", "typing", "unittest")
+
+@dataclass
+class ExecutionResult:
+    """Outcome of executing one snippet"""
+    stdout: str = ""
+    stderr: str = ""
+    error: Optional[str] = None
+    elapsed: float = 0.0
+    timed_out: bool = False
+
+    @property
+    def ok(self) -> bool:
+        """Whether the snippet ran to completion without raising"""
+        return self.error is None and not self.timed_out
+
+class _Worker:
+    """One warm interpreter process and the number of snippets it has run"""
+
+    def __init__(self, process: asyncio.subprocess.Process, workdir: tempfile.TemporaryDirectory):
+        self.process = process
+        self.workdir = workdir
+        self.uses = 0
+
+    async def kill(self):
+        if self.process.returncode is None:
+            self.process.kill()
+        await self.process.wait()
+        self.workdir.cleanup()
+
+class SandboxPool:
+    """Executes code snippets in a pool of pre-warmed worker processes
+
+    Each worker is a separate Python process with common modules already
+    imported, running in its own temporary directory under a memory limit.
+    Snippets run in a fresh namespace; a worker is killed and replaced when
+    a snippet times out, and recycled after `max_uses` snippets so state
+    leaked through modules or the filesystem does not accumulate. Works
+    without Docker; it isolates crashes and runaway snippets, not hostile
+    code.
+    """
+
+    def __init__(self, size: int = 2, max_uses: int = 50, timeout: float = 10.0,
+                 memory_limit: Optional[int] = 512 * 2**20,
+                 preload: Sequence[str] = DEFAULT_PRELOAD):
+        """Initialize the pool; workers are started by start() or on first use
+
+        Args:
+            size: Number of worker processes
+            max_uses: Snippets a worker runs before it is replaced
+            timeout: Default per-snippet timeout in seconds
+            memory_limit: Address space limit per worker in bytes, None for
+                no limit (only enforced where the resource module exists)
+            preload: Modules each worker imports while warming up
+        """
+        if size < 1:
+            raise ValueError("size must be at least 1")
+        self.size = size
+        self.max_uses = max_uses
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        self.preload = tuple(preload)
+        self.runs = 0
+        self.recycled = 0
+        self.started = 0
+        self._idle = None
+        self._workers = set()
+        self._spawning = set()
+
+    async def _spawn(self) -> _Worker:
+        """Start a worker and wait until it is warm"""
+        workdir = tempfile.TemporaryDirectory(prefix="codeweaver-sandbox-")
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, WORKER_SCRIPT, str(self.memory_limit or 0), *self.preload,
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL, cwd=workdir.name, limit=2**24
+        )
+        worker = _Worker(process, workdir)
+        self._workers.add(worker)
+        line = await process.stdout.readline()
+        if not line or not json.loads(line).get("ready"):
+            await self._kill(worker)
+            raise RuntimeError("Sandbox worker failed to start")
+        self.started += 1
+        return worker
+
+    async def _kill(self, worker: _Worker):
+        self._workers.discard(worker)
+        await worker.kill()
+
+    async def _replace(self, worker: _Worker):
+        """Kill a worker and put a fresh one in its place"""
+        logger.debug("Replacing sandbox worker %d after %d uses", worker.process.pid, worker.uses)
+        await self._kill(worker)
+        self._idle.put_nowait(await self._spawn())
+
+    def _replace_later(self, worker: _Worker):
+        """Replace a worker in the background so the caller is not delayed"""
+        task = asyncio.create_task(self._replace(worker))
+        self._spawning.add(task)
+        task.add_done_callback(self._spawning.discard)
+
+    async def start(self):
+        """Start and warm every worker"""
+        if self._idle is not None:
+            return
+        self._idle = asyncio.Queue()
+        workers = await asyncio.gather(*(self._spawn() for _ in range(self.size)))
+        for worker in workers:
+            self._idle.put_nowait(worker)
+
+    async def run(self, code: str, timeout: Optional[float] = None) -> ExecutionResult:
+        """Execute a snippet on the next idle worker
+
+        Args:
+            code: Python source to execute
+            timeout: Seconds before the worker is killed, defaults to the
+                pool's timeout
+        """
+        await self.start()
+        timeout = self.timeout if timeout is None else timeout
+        worker = await self._idle.get()
+        self.runs += 1
+        worker.uses += 1
+        try:
+            worker.process.stdin.write((json.dumps({"code": code}) + "\n").encode())
+            await worker.process.stdin.drain()
+            line = await asyncio.wait_for(worker.process.stdout.readline(), timeout)
+            if not line:
+                raise ConnectionError("Sandbox worker exited")
+        except asyncio.TimeoutError:
+            self._replace_later(worker)
+            return ExecutionResult(error=f"Timed out after {timeout}s", elapsed=timeout,
+                                   timed_out=True)
+        except (ConnectionError, OSError) as e:
+            # Typically killed by the memory limit
+            self._replace_later(worker)
+            return ExecutionResult(error=f"Sandbox worker died: {e}")
+        except BaseException:
+            self._replace_later(worker)
+            raise
+
+        if worker.uses >= self.max_uses:
+            self.recycled += 1
+            self._replace_later(worker)
+        else:
+            self._idle.put_nowait(worker)
+        return ExecutionResult(**json.loads(line))
+
+    async def close(self):
+        """Stop every worker"""
+        if self._idle is None:
+            return
+        await asyncio.gather(*self._spawning, return_exceptions=True)
+        for worker in list(self._workers):
+            await self._kill(worker)
+        self._idle = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
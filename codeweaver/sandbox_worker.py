@@ -0,0 +1,75 @@
+"""
+Sandbox worker process executing code snippets for SandboxPool
+
+Run as a script, not imported: it reads one JSON request per line on stdin
+and writes one JSON reply per line to the original stdout. Only the
+standard library is used so the worker starts without the package.
+"""
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+import traceback
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# Captured output beyond this many characters is truncated
+MAX_OUTPUT = 64 * 1024
+
+def _limit_memory(limit: int):
+    """Cap the worker's address space so runaway allocations fail fast"""
+    if resource is not None and limit:
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+def _run(code: str) -> dict:
+    """Execute code in a fresh namespace, capturing its output"""
+    stdout, stderr = io.StringIO(), io.StringIO()
+    error = None
+    start = time.perf_counter()
+    try:
+        compiled = compile(code, "<generated>", "exec")
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            sys.stdin = io.StringIO()
+            exec(compiled, {"__name__": "__sandbox__", "__builtins__": __builtins__})
+    except BaseException:
+        error = traceback.format_exc(limit=-5)
+    finally:
+        sys.stdin = sys.__stdin__
+    return {
+        "stdout": stdout.getvalue()[:MAX_OUTPUT],
+        "stderr": stderr.getvalue()[:MAX_OUTPUT],
+        "error": error,
+        "elapsed": time.perf_counter() - start
+    }
+
+def main():
+    """Warm up, then serve requests until stdin closes"""
+    memory_limit = int(sys.argv[1]) if len(sys.argv) > 1 else 0
+    for name in sys.argv[2:]:
+        try:
+            __import__(name)
+        except ImportError:
+            pass
+    _limit_memory(memory_limit)
+
+    # Keep the real stdout for replies; output written straight to file
+    # descriptor 1 by the executed code (e.g. from C extensions) is discarded
+    replies = os.fdopen(os.dup(1), "w")
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+
+    def reply(message: dict):
+        replies.write(json.dumps(message) + "\n")
+        replies.flush()
+
+    reply({"ready": True, "pid": os.getpid()})
+    for line in sys.stdin:
+        reply(_run(json.loads(line)["code"]))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Client-side rate limiting and retry scheduling for provider quotas
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import time
+from typing import Awaitable, Callable, Optional, TypeVar
+from codeweaver.telemetry import current_call
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+# Request priorities; lower values are served first
+INTERACTIVE = 0
+BATCH = 10
+
+# HTTP statuses worth retrying: rate limited or a server-side failure
+RETRYABLE_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate, about four characters per token"""
+    return len(text) // 4 + 1
+
+def is_retryable(error: Exception) -> bool:
+    """Whether a failed request should be retried"""
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in RETRYABLE_STATUSES
+    try:
+        from openai import APIConnectionError
+    except ImportError:
+        return False
+    # Also covers APITimeoutError
+    return isinstance(error, APIConnectionError)
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Return the server's requested retry delay in seconds, if any"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+class TokenBucket:
+    """Token bucket refilled continuously at a per-minute rate"""
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        """Initialize the bucket, full
+
+        Args:
+            per_minute: Refill rate
+            capacity: Burst size, defaults to one minute's worth
+        """
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` can be taken (0 if available now)"""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        """Remove tokens; the level may go negative to record overuse"""
+        self._refill()
+        self.level -= amount
+
+class RequestScheduler:
+    """Per-backend scheduler enforcing request and token quotas
+
+    Requests wait in a priority queue (INTERACTIVE ahead of BATCH, then
+    first come first served) until both buckets can cover them, so
+    sustained throughput settles just under quota. Rate-limit and server
+    errors are retried with jittered exponential backoff.
+    """
+
+    def __init__(self, requests_per_minute: Optional[float] = None,
+                 tokens_per_minute: Optional[float] = None, max_retries: int = 3,
+                 base_delay: float = 1.0, max_delay: float = 30.0):
+        """Initialize the scheduler
+
+        Args:
+            requests_per_minute: Request quota, unlimited if None
+            tokens_per_minute: Token quota, unlimited if None
+            max_retries: Retries after a retryable failure
+            base_delay: First backoff ceiling in seconds, doubled per retry
+            max_delay: Largest backoff ceiling in seconds
+        """
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retries = 0
+        self._waiting = []
+        self._counter = itertools.count()
+        self._timer = None
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of requests waiting for quota"""
+        return len(self._waiting)
+
+    def _wait_time(self, tokens: int) -> float:
+        wait = 0.0
+        if self.requests is not None:
+            wait = max(wait, self.requests.wait_time(1))
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.wait_time(tokens))
+        return wait
+
+    def _dispatch(self):
+        """Release queued requests in priority order while quota allows"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._waiting:
+            _, _, tokens, future = self._waiting[0]
+            if future.done():
+                heapq.heappop(self._waiting)
+                continue
+            wait = self._wait_time(tokens)
+            if wait > 0:
+                self._timer = asyncio.get_running_loop().call_later(wait, self._dispatch)
+                return
+            heapq.heappop(self._waiting)
+            if self.requests is not None:
+                self.requests.take(1)
+            if self.tokens is not None:
+                self.tokens.take(tokens)
+            future.set_result(None)
+
+    async def acquire(self, tokens: int = 0, priority: int = INTERACTIVE):
+        """Wait until quota for one request of `tokens` tokens is granted"""
+        if self.requests is None and self.tokens is None:
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiting, (priority, next(self._counter), tokens, future))
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if not future.cancelled():
+                # Granted just before being cancelled; give the quota back
+                self.settle(tokens, 0, requests=1)
+            self._dispatch()
+            raise
+
+    def settle(self, estimated: int, actual: int, requests: int = 0):
+        """Correct the token bucket once a request's real usage is known"""
+        if self.tokens is not None:
+            self.tokens.take(actual - estimated)
+        if self.requests is not None and requests:
+            self.requests.take(-requests)
+
+    def backoff(self, attempt: int, error: Optional[Exception] = None) -> float:
+        """Delay before retry `attempt`, honouring Retry-After headers"""
+        delay = retry_after(error) if error is not None else None
+        if delay is None:
+            # Full jitter keeps retrying clients from synchronizing
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        return delay
+
+    async def run(self, request: Callable[[], Awaitable[T]], tokens: int = 0,
+                  priority: int = INTERACTIVE) -> T:
+        """Run a request under the quota, retrying retryable failures
+
+        Args:
+            request: Callable returning a fresh awaitable for each attempt
+            tokens: Estimated tokens the request will use
+            priority: INTERACTIVE, BATCH or any other int (lower first)
+        """
+        attempt = 0
+        while True:
+            await self.acquire(tokens, priority)
+            try:
+                return await request()
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                delay = self.backoff(attempt, e)
+                logger.info("Retrying failed request in %.2fs (retry %d of %d): %s",
+                            delay, attempt + 1, self.max_retries, e)
+                await asyncio.sleep(delay)
+                attempt += 1
+                self.retries += 1
+                record = current_call.get()
+                if record is not None:
+                    record.retries += 1
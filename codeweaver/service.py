@@ -0,0 +1,290 @@
+"""
+Long-running HTTP/JSON service around a pool of warm coding agents
+
+Run it with `python -m codeweaver.service --port 8080 --model openai`.
+
+    POST /v1/generate  {"task": "...", "stream": false}
+        -> {"code": "...", "error": null, "coalesced": false}
+        With "stream": true the code arrives as server-sent events,
+        data: {"code": "..."} per chunk, then data: [DONE]
+    GET /health
+        -> agent pool, request, circuit breaker and worker pool state
+
+Identical requests in flight at the same time are coalesced: the first
+starts one upstream generation and every caller receives its result,
+streaming or not. The first caller decides whether the generation streams.
+"""
+import argparse
+import asyncio
+import json
+import logging
+from typing import AsyncIterator, Callable, Dict, Optional, Tuple
+from codeweaver.agent import CodingAgent, CodingTask, ERROR_RESPONSE
+from codeweaver.http_server import (
+    end_event_stream, send_event, send_json, serve_connection, start_event_stream
+)
+
+logger = logging.getLogger(__name__)
+
+# Largest request body accepted, in bytes
+MAX_BODY = 1 << 20
+
+class _Flight:
+    """One upstream generation and the chunks it has produced so far
+
+    Any number of callers can follow a flight; each replays the chunks
+    already produced and then waits for the rest.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.error: Optional[str] = None
+        self.done = False
+        self._wakeup = asyncio.Event()
+
+    def _notify(self):
+        wakeup, self._wakeup = self._wakeup, asyncio.Event()
+        wakeup.set()
+
+    def publish(self, chunk: str):
+        self.chunks.append(chunk)
+        self._notify()
+
+    def finish(self, error: Optional[str] = None):
+        self.error = error
+        self.done = True
+        self._notify()
+
+    async def follow(self) -> AsyncIterator[str]:
+        index = 0
+        while True:
+            while index < len(self.chunks):
+                yield self.chunks[index]
+                index += 1
+            if self.done:
+                return
+            await self._wakeup.wait()
+
+class CodeWeaverService:
+    """asyncio HTTP server handing requests to a pool of warm CodingAgents
+
+    Agents are constructed and warmed (system message rendered, backend
+    client and CAMEL agent built) once at start, so requests pay neither
+    process startup nor agent construction. Each upstream generation
+    borrows one agent from the pool, so the pool size bounds the
+    generations in flight; further requests wait for a free agent.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8080, agents: int = 4,
+                 agent_factory: Optional[Callable[[], CodingAgent]] = None, **agent_kwargs):
+        """Initialize the service; agents are created by start()
+
+        Args:
+            host: Interface to listen on
+            port: Port to listen on, 0 picks a free one
+            agents: Number of agents in the pool
+            agent_factory: Callable building one agent, by default
+                CodingAgent(**agent_kwargs)
+            **agent_kwargs: Arguments for the default agent factory, e.g.
+                model, cache, fallback
+        """
+        if agents < 1:
+            raise ValueError("agents must be at least 1")
+        self.host = host
+        self.port = port
+        self.size = agents
+        self.agent_factory = agent_factory or (lambda: CodingAgent(**agent_kwargs))
+        self.requests = 0
+        self.upstream_calls = 0
+        self.coalesced = 0
+        self._agents = []
+        self._idle = None
+        self._flights: Dict[str, _Flight] = {}
+        self._tasks = set()
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        """Base URL of the running service"""
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self):
+        """Build and warm the agent pool, then start listening"""
+        self._idle = asyncio.Queue()
+        for _ in range(self.size):
+            agent = self.agent_factory()
+            # Rendered and built now rather than by the first request
+            _ = agent.system_message, agent.agent
+            self._agents.append(agent)
+            self._idle.put_nowait(agent)
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        """Stop listening, abandon running generations and close the agents"""
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        for agent in self._agents:
+            await agent.aclose()
+        self._agents = []
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    def health(self) -> dict:
+        """Pool, request, backend and worker state reported by /health"""
+        backends = {}
+        workers = {}
+        for agent in self._agents:
+            backends.update(agent.backend_health)
+            workers.update({stage: pool.stats() for stage, pool in agent.offload.items()})
+        return {
+            "status": "ok",
+            "agents": self.size,
+            "idle_agents": self._idle.qsize() if self._idle is not None else 0,
+            "in_flight": len(self._flights),
+            "requests": self.requests,
+            "upstream_calls": self.upstream_calls,
+            "coalesced": self.coalesced,
+            "backends": backends,
+            "workers": workers
+        }
+
+    def _join(self, task: str, stream: bool) -> Tuple[_Flight, bool]:
+        """Follow the flight generating a task, starting one if there is none
+
+        Streaming and non-streaming callers share a flight; a new flight
+        streams from upstream if its first caller streams.
+
+        Returns:
+            The flight and whether it was already in flight
+        """
+        flight = self._flights.get(task)
+        joined = flight is not None
+        if joined:
+            self.coalesced += 1
+        else:
+            flight = self._flights[task] = _Flight()
+            # Not tied to the caller, so other followers are served if it disconnects
+            runner = asyncio.create_task(self._fly(task, flight, stream))
+            self._tasks.add(runner)
+            runner.add_done_callback(self._tasks.discard)
+        return flight, joined
+
+    async def _fly(self, task: str, flight: _Flight, stream: bool):
+        """Run one upstream generation on a pooled agent"""
+        error = "Generation cancelled"
+        agent = None
+        try:
+            agent = await self._idle.get()
+            self.upstream_calls += 1
+            failed = False
+            if stream:
+                chunks = agent.astream(CodingTask(task))
+                try:
+                    async for chunk in chunks:
+                        if chunk == ERROR_RESPONSE and not flight.chunks:
+                            failed = True
+                            break
+                        flight.publish(chunk)
+                finally:
+                    await chunks.aclose()
+            else:
+                code = await agent.agenerate(CodingTask(task))
+                failed = code == ERROR_RESPONSE
+                if not failed:
+                    flight.publish(code)
+            error = "Code generation failed" if failed else None
+        except Exception as e:
+            logger.error("Generation for %r failed: %s", task[:80], e)
+            error = str(e)
+        finally:
+            if agent is not None:
+                self._idle.put_nowait(agent)
+            del self._flights[task]
+            flight.finish(error)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve requests on one keep-alive connection"""
+        await serve_connection(reader, writer, self._respond, max_body=MAX_BODY)
+
+    async def _respond(self, method: str, path: str, body: bytes, writer: asyncio.StreamWriter):
+        path = path.split("?", 1)[0].rstrip("/")
+        if path == "/health":
+            send_json(writer, 200, self.health())
+            return
+        if path != "/v1/generate":
+            send_json(writer, 404, {"error": f"No route for {path}"})
+            return
+        if method != "POST":
+            send_json(writer, 405, {"error": "Use POST"})
+            return
+        try:
+            request = json.loads(body or b"{}")
+            task = (request.get("task") or request.get("description") or "").strip()
+        except (ValueError, AttributeError):
+            send_json(writer, 400, {"error": "Body must be a JSON object"})
+            return
+        if not task:
+            send_json(writer, 400, {"error": "Missing task"})
+            return
+
+        self.requests += 1
+        flight, joined = self._join(task, bool(request.get("stream")))
+        if request.get("stream"):
+            await self._stream(writer, flight)
+            return
+        chunks = [chunk async for chunk in flight.follow()]
+        if flight.error is not None:
+            send_json(writer, 502, {"code": None, "error": flight.error,
+                                          "coalesced": joined})
+        else:
+            send_json(writer, 200, {"code": "".join(chunks), "error": None,
+                                          "coalesced": joined})
+
+    async def _stream(self, writer: asyncio.StreamWriter, flight: _Flight):
+        """Send a flight's chunks as server-sent events as they arrive"""
+        start_event_stream(writer)
+        async for chunk in flight.follow():
+            send_event(writer, json.dumps({"code": chunk}))
+            await writer.drain()
+        if flight.error is not None:
+            send_event(writer, json.dumps({"error": flight.error}))
+        send_event(writer, "[DONE]")
+        end_event_stream(writer)
+
+def main():
+    """Run the service until interrupted"""
+    parser = argparse.ArgumentParser(description="CodeWeaver HTTP service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--model", default="openai")
+    parser.add_argument("--fallback", nargs="*", default=[], help="Failover backends")
+    parser.add_argument("--agents", type=int, default=4, help="Size of the agent pool")
+    parser.add_argument("--log-level", default="INFO")
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level.upper(),
+                        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    async def serve():
+        service = CodeWeaverService(args.host, args.port, agents=args.agents,
+                                    model=args.model, fallback=args.fallback)
+        async with service:
+            logger.info("CodeWeaver service listening on %s", service.url)
+            await asyncio.Event().wait()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
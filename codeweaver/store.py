@@ -0,0 +1,133 @@
+"""
+Collision-free, atomic storage of generated code with a manifest
+"""
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows
+    fcntl = None
+
+MANIFEST_NAME = "manifest.jsonl"
+
+# Characters of the task description kept in file names, for readability
+SLUG_LENGTH = 30
+
+# Process umask, read once at import since os.umask can only be read by setting it
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+def slugify(text: str, length: int = SLUG_LENGTH) -> str:
+    """Lower-case alphanumeric rendering of text for file names"""
+    slug = re.sub(r'[^a-z0-9]+', '_', text.lower()).strip('_')
+    return slug[:length].rstrip('_') or "task"
+
+class OutputStore:
+    """Directory of generated code files plus a manifest describing them
+
+    Files are named after the task description and a hash of the task id
+    (the description itself when no id is given), so distinct tasks never
+    share a file and saving a task again replaces its file. Every file is
+    written to a temporary name and renamed into place, so readers never
+    see partial files. The manifest is an append-only JSONL file, one
+    record per save, appended under an exclusive lock so any number of
+    threads and processes can write to the same store.
+    """
+
+    def __init__(self, root: Union[str, Path], extension: str = ".py"):
+        """Initialize the store, creating the directory if missing
+
+        Args:
+            root: Directory files and the manifest are written to
+            extension: Extension of the code files
+        """
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.extension = extension
+        self.manifest_path = self.root / MANIFEST_NAME
+        self._lock = threading.Lock()
+
+    def path_for(self, task: str, task_id: Optional[str] = None) -> Path:
+        """Return the file a task's code is stored in"""
+        key = task_id if task_id is not None else task
+        digest = hashlib.sha256(str(key).encode()).hexdigest()[:12]
+        return self.root / f"{slugify(task)}-{digest}{self.extension}"
+
+    def _write_atomic(self, path: Path, data: str):
+        """Write data to a temporary file beside path, then rename it over path"""
+        fd, temp_path = tempfile.mkstemp(dir=self.root, prefix=f".{path.name}.", suffix=".tmp")
+        try:
+            # mkstemp creates the file as 0600; keep the replaced file's mode,
+            # or the mode open() would give a new file
+            try:
+                mode = os.stat(path).st_mode & 0o7777
+            except FileNotFoundError:
+                mode = 0o666 & ~_UMASK
+            os.chmod(temp_path, mode)
+            with os.fdopen(fd, "w") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def _append_manifest(self, record: dict):
+        """Append one record to the manifest with a single locked write"""
+        line = (json.dumps(record) + "\n").encode()
+        with self._lock:
+            fd = os.open(self.manifest_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                os.write(fd, line)
+            finally:
+                os.close(fd)
+
+    def save(self, task: str, code: str, task_id: Optional[str] = None, **metadata) -> Path:
+        """Store the code generated for a task
+
+        Args:
+            task: Task description
+            code: Generated code
+            task_id: Optional stable task id; the description is used if None
+            **metadata: Extra manifest fields, e.g. model, elapsed, tokens
+
+        Returns:
+            Path of the written file
+        """
+        path = self.path_for(task, task_id)
+        self._write_atomic(path, code)
+        self._append_manifest({
+            "id": task_id,
+            "task": task,
+            "file": path.name,
+            "sha256": hashlib.sha256(code.encode()).hexdigest(),
+            "saved_at": time.time(),
+            **metadata
+        })
+        return path
+
+    def index(self) -> Dict[str, dict]:
+        """Return the latest manifest record per task, keyed by id or description"""
+        records = {}
+        if not self.manifest_path.exists():
+            return records
+        with open(self.manifest_path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                key = record["id"] if record.get("id") is not None else record["task"]
+                records[key] = record
+        return records
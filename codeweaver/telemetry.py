@@ -0,0 +1,243 @@
+"""
+Per-call telemetry: stage timings, usage and outcome of every generation
+"""
+import contextlib
+import contextvars
+import json
+import threading
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import asdict, dataclass, field
+from typing import IO, Callable, Dict, Optional, Union
+
+# Stages a generation reports, in the order they happen
+STAGES = ("prompt", "cache", "backend", "first_token", "extract", "validate", "fallback")
+
+@dataclass
+class CallRecord:
+    """Everything measured about one generation call
+
+    Stage times are in seconds. first_token is measured from the start of
+    the call; the other stages are the duration of that stage alone.
+    """
+    task: str
+    backend: str
+    call_id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+    started_at: float = field(default_factory=time.time)
+    total: float = 0.0
+    stages: Dict[str, float] = field(default_factory=dict)
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    retries: int = 0
+    regenerations: int = 0
+    cache: str = "off"
+    outcome: str = "ok"
+    error: Optional[str] = None
+
+# The record of the generation running in the current task, read by the
+# scheduler to count retries and inherited by tasks spawned for racing
+current_call: contextvars.ContextVar[Optional[CallRecord]] = contextvars.ContextVar(
+    "current_call", default=None
+)
+
+Hook = Callable[[str, CallRecord], None]
+
+class Telemetry:
+    """Times the stages of each call and passes them to hooks
+
+    Hooks are called as hook(event, record): once per completed stage with
+    the stage name, and once with "call" when the call is over. With no
+    hooks nothing is recorded, so the agent pays no overhead.
+    """
+
+    def __init__(self, *hooks: Hook):
+        """Initialize telemetry
+
+        Args:
+            *hooks: Callables or exporters receiving (event, record)
+        """
+        self.hooks = list(hooks)
+
+    def add_hook(self, hook: Hook):
+        """Register another hook"""
+        self.hooks.append(hook)
+
+    def _emit(self, event: str, record: CallRecord):
+        for hook in self.hooks:
+            hook(event, record)
+
+    @contextlib.contextmanager
+    def call(self, task: str, backend: str, bind: bool = True):
+        """Measure one generation call, yielding its record (None if disabled)
+
+        Args:
+            task: Task description
+            backend: Name of the backend serving the call
+            bind: Make the record the current call, so retries made by the
+                scheduler are counted; async generators must not bind, as
+                they can be resumed from other contexts
+        """
+        if not self.hooks:
+            yield None
+            return
+        record = CallRecord(task=task[:200], backend=backend)
+        start = time.perf_counter()
+        token = current_call.set(record) if bind else None
+        try:
+            yield record
+        finally:
+            if token is not None:
+                current_call.reset(token)
+            record.total = time.perf_counter() - start
+            self._emit("call", record)
+
+    @contextlib.contextmanager
+    def stage(self, record: Optional[CallRecord], name: str):
+        """Time a stage of a call; failed stages are not recorded"""
+        if record is None:
+            yield
+            return
+        start = time.perf_counter()
+        yield
+        record.stages[name] = time.perf_counter() - start
+        self._emit(name, record)
+
+    def mark(self, record: Optional[CallRecord], name: str):
+        """Record an instant of a call, timed from its start"""
+        if record is None or name in record.stages:
+            return
+        record.stages[name] = time.time() - record.started_at
+        self._emit(name, record)
+
+class JSONLExporter:
+    """Writes one JSON line per completed call"""
+
+    def __init__(self, target: Union[str, IO[str]]):
+        """Initialize the exporter
+
+        Args:
+            target: File path to append to, or an open text stream
+        """
+        self._file = open(target, "a") if isinstance(target, str) else target
+        self._owns_file = isinstance(target, str)
+        self._lock = threading.Lock()
+
+    def __call__(self, event: str, record: CallRecord):
+        if event != "call":
+            return
+        line = json.dumps(asdict(record)) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self):
+        """Close the file if the exporter opened it"""
+        if self._owns_file:
+            self._file.close()
+
+# Histogram buckets for stage and call durations, in seconds
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class PrometheusExporter:
+    """Aggregates calls into Prometheus metrics served in the text format"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, prefix: str = "codeweaver"):
+        """Initialize the exporter
+
+        Args:
+            buckets: Upper bounds of the duration histogram buckets
+            prefix: Metric name prefix
+        """
+        self.buckets = tuple(buckets)
+        self.prefix = prefix
+        self._counters = defaultdict(float)
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+    def _observe(self, labels: tuple, value: float):
+        histogram = self._histograms.get(labels)
+        if histogram is None:
+            histogram = self._histograms[labels] = [[0] * len(self.buckets), 0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                histogram[0][i] += 1
+        histogram[1] += value
+        histogram[2] += 1
+
+    def __call__(self, event: str, record: CallRecord):
+        if event != "call":
+            return
+        backend = record.backend
+        with self._lock:
+            self._counters[("calls_total", backend, "outcome", record.outcome)] += 1
+            self._counters[("cache_lookups_total", backend, "result", record.cache)] += 1
+            self._counters[("retries_total", backend, None, None)] += record.retries
+            self._counters[("regenerations_total", backend, None, None)] += record.regenerations
+            for kind in ("prompt", "completion", "cached"):
+                tokens = getattr(record, f"{kind}_tokens")
+                self._counters[("tokens_total", backend, "kind", kind)] += tokens
+            self._observe((backend, "call"), record.total)
+            for stage, seconds in record.stages.items():
+                self._observe((backend, stage), seconds)
+
+    def render(self) -> str:
+        """Return the metrics in the Prometheus text exposition format"""
+        lines = []
+        seen = set()
+        with self._lock:
+            for (name, backend, label, value), count in sorted(self._counters.items()):
+                metric = f"{self.prefix}_{name}"
+                if metric not in seen:
+                    seen.add(metric)
+                    lines.append(f"# TYPE {metric} counter")
+                extra = f',{label}="{value}"' if label else ""
+                lines.append(f'{metric}{{backend="{backend}"{extra}}} {count:g}')
+
+            metric = f"{self.prefix}_stage_seconds"
+            if self._histograms:
+                lines.append(f"# TYPE {metric} histogram")
+            for (backend, stage), (counts, total, count) in sorted(self._histograms.items()):
+                labels = f'backend="{backend}",stage="{stage}"'
+                for bound, bucket_count in zip(self.buckets, counts):
+                    lines.append(f'{metric}_bucket{{{labels},le="{bound:g}"}} {bucket_count}')
+                lines.append(f'{metric}_bucket{{{labels},le="+Inf"}} {count}')
+                lines.append(f"{metric}_sum{{{labels}}} {total:.6f}")
+                lines.append(f"{metric}_count{{{labels}}} {count}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int = 9464, host: str = "127.0.0.1"):
+        """Serve /metrics over HTTP from a background thread
+
+        Returns:
+            The running ThreadingHTTPServer; its server_address holds the
+            bound port when 0 was requested
+        """
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = exporter.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server
+
+    def shutdown(self):
+        """Stop the HTTP server started by serve()"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
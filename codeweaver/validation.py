@@ -0,0 +1,155 @@
+"""
+Fast in-process static checks of generated code
+"""
+import ast
+import builtins
+from typing import Iterable, Iterator, List
+
+# Names available to any module without being bound in it
+MODULE_NAMES = frozenset(dir(builtins)) | {"__file__", "__builtins__", "__annotations__"}
+
+# Return annotations that do not promise a value
+_NO_VALUE_RETURNS = {"None", "NoReturn", "Never"}
+
+_FUNCTIONS = (ast.FunctionDef, ast.AsyncFunctionDef)
+
+def _annotation_name(node: ast.expr) -> str:
+    """Last dotted component of a simple annotation, '' for anything else"""
+    if isinstance(node, ast.Constant):
+        return str(node.value)
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    return ""
+
+def _own_nodes(function: ast.AST) -> Iterator[ast.AST]:
+    """Walk a function's body, not descending into nested scopes"""
+    stack = list(function.body)
+    while stack:
+        node = stack.pop()
+        yield node
+        for child in ast.iter_child_nodes(node):
+            if not isinstance(child, (*_FUNCTIONS, ast.ClassDef, ast.Lambda)):
+                stack.append(child)
+
+def _is_stub(function: ast.AST) -> bool:
+    """Whether a function body is only a docstring, pass or ..."""
+    for statement in function.body:
+        if isinstance(statement, ast.Pass):
+            continue
+        if isinstance(statement, ast.Expr) and isinstance(statement.value, ast.Constant):
+            continue
+        return False
+    return True
+
+class CodeValidator:
+    """Cheap static checks run on generated code before it is returned
+
+    Code must parse and compile; with the lint checks enabled it must also
+    not load names that are bound nowhere in it (a scope-insensitive check,
+    so it has no false positives on valid code), must return a value from
+    every function annotated to return one and must not import forbidden
+    modules. Everything runs on one walk of the AST, typically a fraction of
+    a millisecond for a generated function.
+    """
+
+    def __init__(self, undefined_names: bool = True, missing_returns: bool = True,
+                 forbidden_imports: Iterable[str] = (), require_annotations: bool = False):
+        """Initialize the validator
+
+        Args:
+            undefined_names: Report names that are loaded but never bound
+            missing_returns: Report functions annotated to return a value
+                that contain no return, raise or yield
+            forbidden_imports: Top-level modules generated code must not
+                import, e.g. ("os", "subprocess")
+            require_annotations: Report functions missing parameter or
+                return type hints
+        """
+        self.undefined_names = undefined_names
+        self.missing_returns = missing_returns
+        self.forbidden_imports = frozenset(forbidden_imports)
+        self.require_annotations = require_annotations
+
+    def validate(self, code: str) -> List[str]:
+        """Return the problems found in code, empty if it passed"""
+        try:
+            tree = ast.parse(code)
+            compile(tree, "<generated>", "exec", dont_inherit=True)
+        except SyntaxError as e:
+            return [f"line {e.lineno}: {e.msg}"]
+        except ValueError as e:
+            return [str(e)]
+
+        problems = []
+        bound = set()
+        loaded = []
+        star_import = False
+        for node in ast.walk(tree):
+            if type(node) is ast.Name:
+                if type(node.ctx) is ast.Load:
+                    loaded.append(node)
+                else:
+                    bound.add(node.id)
+            elif isinstance(node, (*_FUNCTIONS, ast.ClassDef)):
+                bound.add(node.name)
+                if isinstance(node, _FUNCTIONS):
+                    problems.extend(self._check_function(node))
+            elif isinstance(node, ast.arg):
+                bound.add(node.arg)
+            elif isinstance(node, (ast.Import, ast.ImportFrom)):
+                module = node.module if isinstance(node, ast.ImportFrom) else None
+                if module and not node.level and module.split(".")[0] in self.forbidden_imports:
+                    problems.append(f"line {node.lineno}: forbidden import '{module}'")
+                for alias in node.names:
+                    if alias.name == "*":
+                        star_import = True
+                    elif module is None:
+                        bound.add(alias.asname or alias.name.split(".")[0])
+                        if alias.name.split(".")[0] in self.forbidden_imports:
+                            problems.append(f"line {node.lineno}: forbidden import '{alias.name}'")
+                    else:
+                        bound.add(alias.asname or alias.name)
+            elif isinstance(node, (ast.Global, ast.Nonlocal)):
+                bound.update(node.names)
+            elif isinstance(node, (ast.ExceptHandler, ast.MatchAs, ast.MatchStar)):
+                if node.name:
+                    bound.add(node.name)
+            elif isinstance(node, ast.MatchMapping) and node.rest:
+                bound.add(node.rest)
+
+        if self.undefined_names and not star_import:
+            reported = set()
+            for node in loaded:
+                if node.id not in bound and node.id not in MODULE_NAMES \
+                        and node.id not in reported:
+                    reported.add(node.id)
+                    problems.append(f"line {node.lineno}: undefined name '{node.id}'")
+        return problems
+
+    def _check_function(self, function: ast.AST) -> List[str]:
+        """Lint checks of a single function definition"""
+        problems = []
+        returns = function.returns
+        if (self.missing_returns and returns is not None
+                and _annotation_name(returns) not in _NO_VALUE_RETURNS
+                and not _is_stub(function)
+                and not any(isinstance(node, (ast.Raise, ast.Yield, ast.YieldFrom))
+                            or isinstance(node, ast.Return) and node.value is not None
+                            for node in _own_nodes(function))):
+            problems.append(f"line {function.lineno}: function '{function.name}' "
+                            f"is annotated to return a value but never returns one")
+        if self.require_annotations:
+            args = function.args
+            params = args.posonlyargs + args.args + args.kwonlyargs
+            params += [arg for arg in (args.vararg, args.kwarg) if arg is not None]
+            missing = [arg.arg for arg in params
+                       if arg.annotation is None and arg.arg not in ("self", "cls")]
+            if missing:
+                problems.append(f"line {function.lineno}: function '{function.name}' has "
+                                f"untyped parameters: {', '.join(missing)}")
+            if returns is None and function.name != "__init__":
+                problems.append(f"line {function.lineno}: function '{function.name}' "
+                                f"has no return annotation")
+        return problems
@@ -0,0 +1,57 @@
+"""
+Helpers for checking generated code against user-supplied tests
+"""
+from dataclasses import dataclass, field
+from typing import List, Optional
+from codeweaver.sandbox import ExecutionResult
+
+# Appended after the tests so unittest.TestCase classes run too; plain
+# assert statements have already run by the time it executes
+_UNITTEST_RUNNER = """
+import sys as _sys, unittest as _unittest
+_cases = [value for value in list(globals().values())
+          if isinstance(value, type) and issubclass(value, _unittest.TestCase)]
+if _cases:
+    _suite = _unittest.TestSuite(_unittest.defaultTestLoader.loadTestsFromTestCase(case)
+                                 for case in _cases)
+    _result = _unittest.TextTestRunner(stream=_sys.stderr, verbosity=1).run(_suite)
+    if not _result.wasSuccessful():
+        raise AssertionError("unit tests failed")
+"""
+
+# Failure output fed back to the model is cut to this many characters
+MAX_FEEDBACK = 2000
+
+@dataclass
+class VerificationResult:
+    """Outcome of generate_verified"""
+    code: str
+    passed: bool
+    rounds: int = 0
+    candidates: int = 0
+    output: str = ""
+    failures: List[str] = field(default_factory=list)
+
+def build_test_program(code: str, tests: str) -> str:
+    """Combine a candidate and its tests into one program for the sandbox"""
+    return f"{code}\n\n{tests}\n{_UNITTEST_RUNNER}"
+
+def failure_output(result: ExecutionResult) -> str:
+    """The part of a failed run worth showing the model"""
+    parts = [part.strip() for part in (result.stderr, result.error) if part and part.strip()]
+    output = "\n".join(parts)
+    if len(output) > MAX_FEEDBACK:
+        output = "..." + output[-MAX_FEEDBACK:]
+    return output
+
+def repair_task(description: str, code: str, output: str, tests: Optional[str] = None) -> str:
+    """Task description asking for a failing candidate to be fixed"""
+    parts = [
+        description,
+        f"A previous attempt:\n```python\n{code}\n```",
+        f"failed with:\n{output}",
+    ]
+    if tests:
+        parts.append(f"The code must pass these tests:\n```python\n{tests}\n```")
+    parts.append("Return a corrected version of the code.")
+    return "\n\n".join(parts)
@@ -0,0 +1,113 @@
+"""
+Worker pools CPU-bound pipeline stages are offloaded to
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional, Tuple
+
+# Stages CodingAgent can offload
+STAGES = ("extract", "validate")
+
+def _timed(fn: Callable, *args) -> Tuple[Any, float]:
+    """Call fn in the worker, returning its result and the seconds it took"""
+    start = time.perf_counter()
+    return fn(*args), time.perf_counter() - start
+
+class WorkerPool:
+    """A process or thread pool running stage functions off the event loop
+
+    Process pools scale CPU-bound stages across cores; functions and their
+    arguments must be picklable and each call pays for pickling its input
+    and output, so they suit stages that take well over a millisecond.
+    Thread pools avoid that cost but only help where the work releases
+    the GIL. Counts of queued and running calls and the busy time of the
+    workers are kept for stats().
+    """
+
+    def __init__(self, kind: str = "process", workers: Optional[int] = None):
+        """Initialize the pool; workers start on first use
+
+        Args:
+            kind: "process" or "thread"
+            workers: Number of workers, defaults to the number of CPUs
+        """
+        if kind not in ("process", "thread"):
+            raise ValueError(f"Unknown worker pool kind '{kind}'")
+        self.kind = kind
+        self.workers = workers or os.cpu_count() or 1
+        self.submitted = 0
+        self.completed = 0
+        self.busy = 0.0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._executor: Optional[Executor] = None
+        self._started = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(self.workers,
+                                                    thread_name_prefix="codeweaver-worker")
+            self._started = time.perf_counter()
+        return self._executor
+
+    async def run(self, fn: Callable, *args):
+        """Run fn(*args) on a worker and return its result"""
+        executor = self._get_executor()
+        with self._lock:
+            self.submitted += 1
+            self._in_flight += 1
+        try:
+            result, seconds = await asyncio.get_running_loop().run_in_executor(
+                executor, _timed, fn, *args
+            )
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+        with self._lock:
+            self.completed += 1
+            self.busy += seconds
+        return result
+
+    @property
+    def queue_depth(self) -> int:
+        """Calls waiting for a free worker"""
+        return max(0, self._in_flight - self.workers)
+
+    @property
+    def utilization(self) -> float:
+        """Share of the workers' time spent running calls since the pool started"""
+        if self._started is None:
+            return 0.0
+        elapsed = time.perf_counter() - self._started
+        return min(1.0, self.busy / (elapsed * self.workers)) if elapsed > 0 else 0.0
+
+    def stats(self) -> dict:
+        """Snapshot of the pool's load"""
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "running": min(self._in_flight, self.workers),
+            "queue_depth": self.queue_depth,
+            "busy_seconds": self.busy,
+            "utilization": self.utilization
+        }
+
+    def close(self):
+        """Shut the workers down"""
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -2,10 +2,15 @@
 Interactive testing environment for CodeWeaver
 """
 import asyncio
+import logging
 import os
 from codeweaver.agent import CodingAgent, CodingTask
+from codeweaver.memory import TokenBudget
 
 def main():
+    # Errors go to stderr; set LOGLEVEL=DEBUG to see retries and timings
+    logging.basicConfig(level=os.getenv("LOGLEVEL", "WARNING").upper())
+    
     # Get model selection
     print("\nSelect model to use:")
     print("1. OpenAI (default)")
@@ -15,7 +20,9 @@ def main():
     model = "openai" if choice != "2" else "deepseek"
     
     try:
-        agent = CodingAgent(model=model)
+        # Keep recent turns so follow-up requests can refer back to them,
+        # without the prompt growing for the rest of the session
+        agent = CodingAgent(model=model, memory=TokenBudget(max_tokens=2000))
     except ValueError as e:
         print(f"Error: {e}")
         if model == "openai":
@@ -41,15 +48,19 @@ def main():
                     continue
                     
                 task = CodingTask(description=description)
-                print("\nGenerating code...\n")
+                print("\nGenerated Code:")
+                print("-" * 40)
                 
-                result = agent.generate(task)
+                # Print code as it streams in
+                chunks = []
+                for chunk in agent.stream(task):
+                    chunks.append(chunk)
+                    print(chunk, end="", flush=True)
+                print()
+                print("-" * 40)
+                result = "".join(chunks)
                 
                 if result:
-                    print("Generated Code:")
-                    print("-" * 40)
-                    print(result)
-                    print("-" * 40)
                     
                     # Ask if user wants to save the code
                     print("\nWould you like to save this code to a file? [y/N]:")
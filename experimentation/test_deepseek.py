@@ -3,6 +3,7 @@ Test script for comparing OpenAI and DeepSeek model outputs
 """
 import os
 import asyncio
+import time
 from codeweaver.agent import CodingAgent, CodingTask
 
 def compare_models():
@@ -23,23 +24,42 @@ def compare_models():
         
         try:
             agent = CodingAgent(model=model)
+            coding_tasks = [CodingTask(description=task) for task in tasks]
             
-            for task in tasks:
-                print(f"\nTask: {task}")
+            for result in agent.generate_many(coding_tasks, concurrency=len(tasks), ordered=True):
+                print(f"\nTask: {result.task.description}")
                 print("-" * 20)
                 
-                try:
-                    result = agent.generate(CodingTask(description=task))
-                    print("\nGenerated Code:")
+                if result.ok:
+                    print(f"\nGenerated Code ({result.elapsed:.2f}s):")
                     print("-" * 40)
-                    print(result)
+                    print(result.code)
                     print("-" * 40)
-                except Exception as e:
-                    print(f"Error generating code: {e}")
+                else:
+                    print(f"Error generating code: {result.error}")
                 
         except ValueError as e:
             print(f"Error: {e}")
             continue
             
+def race_models():
+    """Race both models on each task, keeping the first valid answer"""
+    print("\nRacing OPENAI against DEEPSEEK:")
+    print("-" * 40)
+    
+    try:
+        agent = CodingAgent(model="openai", race=["deepseek"])
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+        
+    for task in ["Write a function to find the nth Fibonacci number"]:
+        start = time.perf_counter()
+        result = agent.generate(CodingTask(description=task))
+        print(f"\nTask: {task} ({time.perf_counter() - start:.2f}s)")
+        print(result)
+    print(f"\nWins: {dict(agent.race_wins)}")
+            
 if __name__ == "__main__":
     compare_models()
+    race_models()
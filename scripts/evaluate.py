@@ -0,0 +1,81 @@
+"""
+Script to evaluate backends on a HumanEval-style task suite
+
+    python evaluate.py suite.jsonl --models openai deepseek --samples 5 --k 1 5
+
+Samples for every task and backend are generated concurrently and tested
+in a sandbox pool; pass@k, latency percentiles, tokens and cost are
+reported per backend. Runs are stored in a results database, and
+--compare prints the change from an earlier run.
+"""
+import argparse
+import logging
+import os
+import sys
+from pathlib import Path
+from codeweaver.evaluation import Evaluator, ResultsDB, load_suite
+
+def print_reports(run):
+    """Print the per-backend report table of a run"""
+    reports = run.reports()
+    ks = run.params["ks"]
+    header = f"{'backend':<12} {'tasks':>5} {'samples':>7} " + \
+        " ".join(f"{f'pass@{k}':>7}" for k in ks) + \
+        f" {'p50 s':>7} {'p90 s':>7} {'p99 s':>7} {'tokens':>9} {'cost $':>9} {'errors':>6}"
+    print(header)
+    print("-" * len(header))
+    for report in reports.values():
+        passes = " ".join(f"{report.pass_at[k]:7.3f}" if k in report.pass_at else f"{'-':>7}"
+                          for k in ks)
+        cost = f"{report.cost:9.4f}" if report.cost is not None else f"{'-':>9}"
+        print(f"{report.backend:<12} {report.tasks:>5} {report.samples:>7} {passes} "
+              f"{report.latency['p50']:7.2f} {report.latency['p90']:7.2f} "
+              f"{report.latency['p99']:7.2f} "
+              f"{report.prompt_tokens + report.completion_tokens:>9} {cost} {report.errors:>6}")
+
+def main():
+    """Run an evaluation and store its results"""
+    parser = argparse.ArgumentParser(description="Evaluate CodeWeaver backends on a task suite")
+    parser.add_argument("suite", help="HumanEval-style JSONL file of tasks")
+    parser.add_argument("--models", nargs="+", default=["openai"])
+    parser.add_argument("--samples", type=int, default=1, help="Samples per task and backend")
+    parser.add_argument("--k", type=int, nargs="+", default=[1], help="k values for pass@k")
+    parser.add_argument("--temperature", type=float)
+    parser.add_argument("--max-tokens", type=int)
+    parser.add_argument("--concurrency", type=int, default=8, help="Generations in flight per backend")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2,
+                        help="Sandbox processes running tests")
+    parser.add_argument("--timeout", type=float, default=10.0, help="Per-sample test timeout")
+    parser.add_argument("--db", default="evaluations.db", help="Results database")
+    parser.add_argument("--compare", type=int, metavar="RUN_ID",
+                        help="Print the change from an earlier run")
+    args = parser.parse_args()
+    logging.basicConfig(level=os.getenv("LOGLEVEL", "WARNING").upper())
+
+    if max(args.k) > args.samples:
+        parser.error("every k must be at most --samples")
+    suite = load_suite(args.suite)
+    evaluator = Evaluator(args.models, samples=args.samples, ks=args.k,
+                          concurrency=args.concurrency, workers=args.workers,
+                          temperature=args.temperature, max_tokens=args.max_tokens,
+                          test_timeout=args.timeout)
+    print(f"Evaluating {', '.join(args.models)} on {len(suite)} tasks, "
+          f"{args.samples} samples each")
+    run = evaluator.run(suite, name=Path(args.suite).name)
+
+    db = ResultsDB(args.db)
+    try:
+        run_id = db.save(run)
+        print(f"\nRun {run_id}")
+        print_reports(run)
+        if args.compare is not None:
+            print(f"\nChange from run {args.compare}")
+            for backend, change in db.compare(args.compare, run_id).items():
+                deltas = "  ".join(f"{name} {value:+.4f}" for name, value in change.items())
+                print(f"{backend:<12} {deltas}")
+    finally:
+        db.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,75 +1,212 @@
 """
 Script to generate code using CAMEL agent and save to outputs directory
+
+Single task:
+    python generate_code.py "<coding task description>"
+
+Batch mode, one JSON object per line ({"id": ..., "task": ...}) from a file
+or stdin, generated concurrently through one shared agent:
+    python generate_code.py --input tasks.jsonl --output results.jsonl
+    cat tasks.jsonl | python generate_code.py --input - --output results.jsonl
+
+Results are appended to the output file as each task completes, so an
+interrupted batch resumes where it stopped when run again.
 """
+import argparse
+import asyncio
+import json
+import logging
 import os
 import sys
+import time
 from pathlib import Path
 from codeweaver.agent import CodingAgent, CodingTask
+from codeweaver.store import OutputStore
+
+def generate_single(task_description, model):
+    """Generate code for one task and save it in the outputs directory"""
+    store = OutputStore("outputs")
 
-def main():
-    """Main function to generate and save code"""
-    # Ensure outputs directory exists
-    output_dir = Path("outputs")
-    output_dir.mkdir(exist_ok=True)
-    
-    # Get the coding task from command line argument
-    if len(sys.argv) < 2:
-        print("Usage: python generate_code.py \"<coding task description>\"")
-        sys.exit(1)
-        
-    task_description = sys.argv[1]
-    
     try:
         # Initialize the agent
-        agent = CodingAgent()
-        
+        agent = CodingAgent(model=model)
+
         # Create the task
         task = CodingTask(description=task_description)
-        
+
         # Generate the code
         print(f"\nGenerating code for: {task_description}")
         print("-" * 40)
-        
+
+        start = time.perf_counter()
         code = agent.generate(task)
-        
+        elapsed = time.perf_counter() - start
+
         if code:
-            # Create filename from task description
-            filename = task_description.lower()
-            filename = "".join(c if c.isalnum() else "_" for c in filename)
-            filename = filename[:30] + ".py"  # Truncate if too long
-            
-            # Full path in outputs directory
-            output_path = output_dir / filename
-            
-            # Extract and clean the code from the response
-            clean_code = code
-            if isinstance(code, str):
-                # Remove any response object text
-                if "BaseMessage" in code:
-                    # Try to extract code block from CAMEL response
-                    if "> Code:" in code:
-                        clean_code = code.split("> Code:")[1].split("2024-")[0].strip()
-                    else:
-                        clean_code = "# Error: Could not extract valid code from response"
-            
-            # Save the cleaned code
-            with open(output_path, "w") as f:
-                f.write(clean_code)
-                
+            # Save the code, already extracted and cleaned by the agent
+            usage = agent.last_completion
+            output_path = store.save(
+                task_description, code, model=agent.model, elapsed=round(elapsed, 3),
+                prompt_tokens=usage.prompt_tokens if usage else 0,
+                completion_tokens=usage.completion_tokens if usage else 0
+            )
+
             print(f"\nCode generated successfully!")
             print(f"Saved to: {output_path}")
             print("\nGenerated Code:")
             print("-" * 40)
             print(code)
             print("-" * 40)
-            
+
         else:
             print("Error: No code was generated")
             sys.exit(1)
-            
+
     except Exception as e:
         print(f"Error: {str(e)}")
         sys.exit(1)
 
+def load_checkpoint(path):
+    """Return the ids of tasks already completed successfully in an output file"""
+    done = set()
+    if not path.exists():
+        return done
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A line cut short by a crash; that task is redone
+                continue
+            if record.get("error") is None:
+                done.add(str(record["id"]))
+    return done
+
+async def read_tasks(source, done, ids, invalid):
+    """Yield the tasks still to do from a JSONL file, recording their ids in order
+
+    Lines may be objects with a "task" (or "description") and optional
+    "id", defaulting to the line number, or bare JSON strings. Lines that
+    are not valid JSON or hold another kind of value are skipped and
+    appended to invalid as (line number, error) so the rest of the batch
+    still runs. Lines are read in a worker thread so that a slow pipe on
+    stdin does not stall the generations already in flight.
+    """
+    number = 0
+    while True:
+        line = await asyncio.to_thread(source.readline)
+        if not line:
+            break
+        number += 1
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            invalid.append((number, f"Invalid JSON on line {number}: {e}"))
+            continue
+        if isinstance(record, str):
+            record = {"task": record}
+        elif not isinstance(record, dict):
+            invalid.append((number, f"Invalid task on line {number}: expected an object "
+                                    f"or a string, got {type(record).__name__}"))
+            continue
+        task_id = str(record.get("id", number))
+        if task_id in done:
+            continue
+        ids.append(task_id)
+        yield CodingTask(description=record.get("task") or record.get("description", ""))
+
+def generate_batch(args):
+    """Generate every task in a JSONL input, appending results as they complete"""
+    output_path = Path(args.output)
+    done = load_checkpoint(output_path) if args.resume else set()
+    if done:
+        print(f"Resuming: skipping {len(done)} completed tasks")
+
+    store = OutputStore(args.output_dir) if args.output_dir else None
+    source = sys.stdin if args.input == "-" else open(args.input)
+    agent = CodingAgent(model=args.model)
+    ids = []
+    invalid = []
+    completed = failed = 0
+    try:
+        with open(output_path, "a" if args.resume else "w") as out:
+            if out.tell() and output_path.read_bytes()[-1:] != b"\n":
+                # Terminate a line left half-written by a crash
+                out.write("\n")
+            def write_invalid():
+                nonlocal failed
+                while invalid:
+                    number, error = invalid.pop(0)
+                    out.write(json.dumps({"id": str(number), "task": None, "code": None,
+                                          "error": error, "line": number}) + "\n")
+                    out.flush()
+                    failed += 1
+                    print(f"Line {number} skipped: {error}", file=sys.stderr)
+
+            results = agent.generate_many(read_tasks(source, done, ids, invalid),
+                                          concurrency=args.concurrency, timeout=args.timeout)
+            for result in results:
+                write_invalid()
+                record = {
+                    "id": ids[result.index],
+                    "task": result.task.description,
+                    "code": result.code,
+                    "error": result.error,
+                    "model": agent.model,
+                    "elapsed": round(result.elapsed, 3),
+                    "prompt_tokens": result.prompt_tokens,
+                    "completion_tokens": result.completion_tokens
+                }
+                if store is not None and result.ok:
+                    path = store.save(result.task.description, result.code, task_id=record["id"],
+                                      **{k: v for k, v in record.items()
+                                         if k not in ("id", "task", "code", "error")})
+                    record["file"] = str(path)
+                out.write(json.dumps(record) + "\n")
+                # Flushed per result so a crash loses at most the tasks in flight
+                out.flush()
+                if result.ok:
+                    completed += 1
+                else:
+                    failed += 1
+                    print(f"Task {record['id']} failed: {result.error}", file=sys.stderr)
+            write_invalid()
+    finally:
+        agent.close()
+        if source is not sys.stdin:
+            source.close()
+
+    print(f"Completed {completed} tasks, {failed} failed; results in {output_path}")
+    return 1 if failed else 0
+
+def main():
+    """Main function to generate and save code"""
+    parser = argparse.ArgumentParser(description="Generate code with CodeWeaver")
+    parser.add_argument("task", nargs="?", help="Coding task description")
+    parser.add_argument("--input", help="JSONL file of tasks, or - for stdin")
+    parser.add_argument("--output", default="results.jsonl",
+                        help="JSONL file results are appended to in batch mode")
+    parser.add_argument("--output-dir", help="Also write each result's code to this directory")
+    parser.add_argument("--model", default=os.getenv("CODEWEAVER_MODEL", "openai"))
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--timeout", type=float, help="Per-task timeout in seconds")
+    parser.add_argument("--no-resume", dest="resume", action="store_false",
+                        help="Start the output file over instead of resuming it")
+    parser.add_argument("--log-level", default=os.getenv("LOGLEVEL", "WARNING"))
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level.upper(),
+                        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+                        stream=sys.stderr)
+
+    if args.input:
+        sys.exit(generate_batch(args))
+    if not args.task:
+        print("Usage: python generate_code.py \"<coding task description>\"")
+        print("       python generate_code.py --input tasks.jsonl [--output results.jsonl]")
+        sys.exit(1)
+    generate_single(args.task, args.model)
+
 if __name__ == "__main__":
     main()
@@ -1,10 +1,14 @@
 """
 Tests for the autonomous coding agent using CAMEL framework
 """
+import asyncio
+import re
+import threading
 import pytest
 import os
 from unittest.mock import patch, MagicMock, AsyncMock
 from camel.messages import BaseMessage
+from camel.types import OpenAIBackendRole
 from codeweaver.agent import CodingAgent, CodingTask
 
 @pytest.fixture
@@ -160,3 +164,78 @@ def sample():
                 result = agent.generate(task)
                 assert isinstance(result, str)
                 assert "def sample" in result
+
+def test_generate_many():
+    """Test batch generation with bounded concurrency"""
+    with patch.dict(os.environ, {"OPENAI_API_KEY": "test_key"}):
+        agent = CodingAgent()
+        tasks = [CodingTask(description=f"task {i}") for i in range(6)]
+        lock = threading.Lock()
+        steps = threading.Barrier(3, timeout=10)
+        running = peak = 0
+        
+        def slow_step(self, msg):
+            nonlocal running, peak
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            try:
+                # Like ChatAgent.step, answer the prompt in the agent's memory
+                self.update_memory(msg, OpenAIBackendRole.USER)
+                # Passes once three steps run at the same time
+                steps.wait()
+                messages, _ = self.memory.get_context()
+            finally:
+                with lock:
+                    running -= 1
+            number = re.search(r"task (\d+)", messages[-1]["content"]).group(1)
+            response = MagicMock()
+            response.content = f"def sample():\n    return {number}"
+            return response
+        
+        # Concurrent requests each step their own agent
+        with patch("camel.agents.EmbodiedAgent.step", autospec=True, side_effect=slow_step):
+            results = list(agent.generate_many(tasks, concurrency=3, ordered=True))
+            
+        assert [r.index for r in results] == list(range(6))
+        for i, result in enumerate(results):
+            assert result.task is tasks[i]
+            assert result.ok and result.code == f"def sample():\n    return {i}"
+        # Steps overlapped up to the concurrency limit, never beyond it
+        assert peak == 3
+
+def test_generate_many_timeout():
+    """Test per-task timeout in batch generation"""
+    with patch.dict(os.environ, {"OPENAI_API_KEY": "test_key"}):
+        agent = CodingAgent()
+        
+        async def stalled(task, priority=None):
+            await asyncio.sleep(10)
+        
+        with patch.object(agent, '_agenerate', side_effect=stalled):
+            results = list(agent.generate_many([CodingTask(description="stall")], timeout=0.01))
+            
+        assert len(results) == 1
+        assert not results[0].ok
+        assert "Timed out" in results[0].error
+
+def test_lazy_initialization():
+    """Test backends are built on first use and system messages shared"""
+    with patch.dict(os.environ, {"OPENAI_API_KEY": "test_key"}):
+        first = CodingAgent()
+        second = CodingAgent()
+        assert first.backend._agent is None
+        assert first.system_message is second.system_message
+        assert first.agent is first.agent
+
+def test_errors_logged_not_printed(caplog, capsys):
+    """Test generation errors go to the logger rather than stdout"""
+    with patch.dict(os.environ, {"OPENAI_API_KEY": "test_key"}):
+        agent = CodingAgent()
+        assert agent.agent.verbose is False
+        task = CodingTask(description="Write a function that adds two numbers")
+        with patch.object(agent.agent, 'step', side_effect=RuntimeError("boom")):
+            agent.generate(task)
+        agent.close()
+    assert capsys.readouterr().out == ""
+    assert any(r.levelname == "ERROR" and "boom" in r.getMessage() for r in caplog.records)
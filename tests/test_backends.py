@@ -0,0 +1,203 @@
+"""
+Tests for the model backend registry
+"""
+import asyncio
+import os
+import threading
+import pytest
+from unittest.mock import patch, MagicMock
+from camel.messages import BaseMessage
+from camel.types import OpenAIBackendRole
+from codeweaver.agent import CodingAgent, CodingTask
+from codeweaver.backends import (
+    Completion, ModelBackend, LocalBackend, OpenAIBackend, available_backends, create_backend,
+    register_backend
+)
+
+class EchoBackend(ModelBackend):
+    """Backend answering every prompt with a fixed function"""
+    name = "echo"
+    model_name = "echo-1"
+    supports_streaming = False
+    max_output_tokens = 100
+
+    async def _complete(self, system, prompt, **params):
+        return Completion("def echo():\n    return 1")
+
+def test_builtin_backends():
+    """Test the built-in providers are registered"""
+    assert {"openai", "deepseek", "local"} <= set(available_backends())
+
+def test_unsupported_backend():
+    """Test unknown model names are rejected"""
+    with pytest.raises(ValueError) as exc_info:
+        create_backend("invalid")
+    assert "Unsupported model" in str(exc_info.value)
+
+def test_custom_backend():
+    """Test CodingAgent dispatches through a registered backend"""
+    register_backend("echo", EchoBackend)
+    agent = CodingAgent(model="echo", max_tokens=1000)
+    assert agent.model == "echo"
+    assert agent.agent is None
+    assert agent.max_tokens == 100
+    
+    assert agent.generate(CodingTask(description="echo")) == "def echo():\n    return 1"
+    assert "".join(agent.stream(CodingTask(description="echo"))) == "def echo():\n    return 1"
+    agent.close()
+
+def test_local_backend():
+    """Test the local backend needs no API key and reads its endpoint from the environment"""
+    env = {"CODEWEAVER_LOCAL_BASE_URL": "http://127.0.0.1:9000/v1", "CODEWEAVER_LOCAL_MODEL": "qwen"}
+    with patch.dict(os.environ, env, clear=True):
+        backend = LocalBackend()
+        assert backend.base_url == "http://127.0.0.1:9000/v1"
+        assert backend.model_name == "qwen"
+
+async def test_backend_pools_are_separate():
+    """Test each backend owns its own client"""
+    with patch.dict(os.environ, {"DEEPSEEK_API_KEY": "test_key"}):
+        first = create_backend("deepseek", max_connections=2)
+        second = create_backend("local")
+        assert first.get_client() is not second.get_client()
+        assert str(first.get_client().base_url).startswith("https://api.deepseek.com")
+        await first.aclose()
+        await second.aclose()
+
+async def test_openai_concurrent_requests_use_own_agents():
+    """Test concurrent requests on the embodied agent backend don't share memory"""
+    steps = threading.Barrier(4, timeout=10)
+
+    def step(agent, message):
+        # Like ChatAgent.step, send what is in the agent's memory, once
+        # every request is stepping
+        agent.update_memory(message, OpenAIBackendRole.USER)
+        steps.wait()
+        messages, _ = agent.memory.get_context()
+        response = MagicMock()
+        response.content = messages[-1]["content"]
+        return response
+
+    system = BaseMessage.make_assistant_message(role_name="Programmer", content="sys")
+    with patch.dict(os.environ, {"OPENAI_API_KEY": "test_key"}), \
+            patch("camel.agents.EmbodiedAgent.step", autospec=True, side_effect=step):
+        backend = OpenAIBackend()
+        completions = await asyncio.gather(*(
+            backend._complete(system, f"task number {i}") for i in range(4)
+        ))
+    assert [completion.text for completion in completions] == [
+        f"task number {i}" for i in range(4)
+    ]
+    # One agent per concurrent request; the next request takes the first
+    assert len(backend._idle_agents) == 4
+    assert backend._acquire_agent() is backend.get_agent(system)
+    await backend.aclose()
+
+async def test_openai_concurrency_follows_max_connections():
+    """Test steps run max_connections at a time, with no more agents than that"""
+    steps = threading.Barrier(16, timeout=10)
+    lock = threading.Lock()
+    running = peak = 0
+
+    def step(agent, message):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        try:
+            # Passes only once 16 steps run at the same time
+            steps.wait()
+        finally:
+            with lock:
+                running -= 1
+        response = MagicMock()
+        response.content = "def f():\n    pass"
+        return response
+
+    system = BaseMessage.make_assistant_message(role_name="Programmer", content="sys")
+    with patch.dict(os.environ, {"OPENAI_API_KEY": "test_key"}), \
+            patch("camel.agents.EmbodiedAgent.step", autospec=True, side_effect=step):
+        backend = OpenAIBackend(max_connections=16)
+        await asyncio.gather(*(backend._complete(system, f"task {i}") for i in range(32)))
+        await backend.aclose()
+    assert peak == 16
+    assert len(backend._idle_agents) == 16
+
+def test_openai_backend_sends_params():
+    """Test temperature and max_tokens reach the embodied agent's model"""
+    configs = []
+
+    def step(agent, message):
+        configs.append(dict(agent.model_backend.model_config_dict))
+        response = MagicMock()
+        response.content = "def f():\n    pass"
+        return response
+
+    with patch.dict(os.environ, {"OPENAI_API_KEY": "test_key"}), \
+            patch("camel.agents.EmbodiedAgent.step", autospec=True, side_effect=step):
+        agent = CodingAgent(temperature=0.1, max_tokens=50, system_message="sys")
+        agent.generate(CodingTask(description="first"))
+        agent.temperature = 0.9
+        agent.generate(CodingTask(description="second"))
+        agent.close()
+    assert [(c["temperature"], c["max_tokens"]) for c in configs] == [(0.1, 50), (0.9, 50)]
+
+class SleepBackend(ModelBackend):
+    """Backend answering after a fixed delay, optionally failing"""
+    name = "sleep"
+    model_name = "sleep-1"
+
+    def __init__(self, delay, code="def f():\n    pass", fail=False, name="sleep"):
+        super().__init__()
+        self.delay = delay
+        self.code = code
+        self.fail = fail
+        self.name = name
+        self.started = 0
+        self.cancelled = 0
+
+    async def _complete(self, system, prompt, **params):
+        self.started += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.fail:
+            raise RuntimeError("provider stalled")
+        return Completion(self.code)
+
+def test_race_first_valid_wins():
+    """Test the fastest valid response wins and the rest are cancelled"""
+    slow = SleepBackend(1.0, code="def slow():\n    pass", name="slow")
+    fast = SleepBackend(0.01, code="def fast():\n    pass", name="fast")
+    agent = CodingAgent(model=slow, race=[fast], system_message="sys")
+    
+    assert agent.generate(CodingTask(description="race")) == "def fast():\n    pass"
+    assert slow.cancelled == 1
+    assert agent.race_wins["fast"] == 1
+    agent.close()
+
+def test_race_skips_failures():
+    """Test a failing backend does not win the race"""
+    broken = SleepBackend(0.0, fail=True, name="broken")
+    healthy = SleepBackend(0.02, name="healthy")
+    agent = CodingAgent(model=broken, race=[healthy], system_message="sys")
+    
+    assert agent.generate(CodingTask(description="race")) == "def f():\n    pass"
+    assert agent.race_wins["healthy"] == 1
+    agent.close()
+
+def test_hedge_delay():
+    """Test the hedge request only starts once the primary is slow"""
+    primary = SleepBackend(0.01, name="primary")
+    hedge = SleepBackend(0.01, name="hedge")
+    agent = CodingAgent(model=primary, race=[hedge], hedge_delay=0.5, system_message="sys")
+    agent.generate(CodingTask(description="hedge"))
+    assert hedge.started == 0
+    
+    primary.delay = 1.0
+    agent.generate(CodingTask(description="hedge"))
+    assert hedge.started == 1
+    assert agent.race_wins["hedge"] == 1
+    agent.close()
@@ -0,0 +1,138 @@
+"""
+Tests for the response cache
+"""
+import os
+import time
+from unittest.mock import patch, MagicMock
+from codeweaver.agent import CodingAgent, CodingTask
+from codeweaver.cache import LRUCache, ResponseCache, SemanticCache, cache_key, task_words
+
+def test_cache_key_stable():
+    """Test keys are independent of argument order and sensitive to content"""
+    assert cache_key(model="m", prompt="p") == cache_key(prompt="p", model="m")
+    assert cache_key(model="m", prompt="p") != cache_key(model="m", prompt="q")
+
+def test_lru_eviction():
+    """Test least recently used entries are evicted first"""
+    cache = LRUCache(max_size=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    assert cache.get("a") == "1"
+    cache.set("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert len(cache) == 2
+
+def test_lru_ttl():
+    """Test expired entries are dropped"""
+    cache = LRUCache(ttl=60)
+    cache.set("a", "1", stored_at=time.time() - 120)
+    assert cache.get("a") is None
+
+def test_disk_tier(tmp_path):
+    """Test responses persist across cache instances"""
+    cache = ResponseCache(path=tmp_path / "cache.db")
+    cache.set("key", "def f(): pass")
+    cache.close()
+    
+    cache = ResponseCache(path=tmp_path / "cache.db")
+    assert cache.get("key") == "def f(): pass"
+    assert cache.get("other") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+    cache.close()
+
+def test_agent_cache_hits():
+    """Test repeated tasks are served from the cache"""
+    with patch.dict(os.environ, {"OPENAI_API_KEY": "test_key"}):
+        agent = CodingAgent(cache=ResponseCache())
+        task = CodingTask(description="Write a function that adds two numbers")
+        
+        mock_response = MagicMock()
+        mock_response.content = "def add(a: int, b: int) -> int:\n    return a + b"
+        
+        with patch.object(agent.agent, 'step') as mock_step:
+            mock_step.return_value = mock_response
+            first = agent.generate(task)
+            second = agent.generate(task)
+            
+            assert first == second
+            mock_step.assert_called_once()
+            assert agent.cache_hits == 1
+            assert agent.cache_misses == 1
+
+def test_agent_cache_skips_errors():
+    """Test placeholder responses are not cached"""
+    with patch.dict(os.environ, {"OPENAI_API_KEY": "test_key"}):
+        agent = CodingAgent(cache=ResponseCache())
+        task = CodingTask(description="Write a simple function")
+        
+        mock_response = MagicMock()
+        mock_response.content = ""
+        
+        with patch.object(agent.agent, 'step') as mock_step:
+            mock_step.return_value = mock_response
+            agent.generate(task)
+            agent.generate(task)
+            assert mock_step.call_count == 2
+            assert agent.cache_hits == 0
+
+def test_task_words():
+    """Test descriptions are reduced to normalized content words, in order"""
+    assert task_words("Write a function to calculate Fibonacci numbers") == ("fibonacci", "number")
+    assert task_words("Convert Fahrenheit to Kelvin") == ("convert", "fahrenheit", "kelvin")
+
+def test_semantic_paraphrase_hit():
+    """Test paraphrased descriptions hit and unrelated ones miss"""
+    cache = SemanticCache()
+    cache.set("ns", "Write a function to calculate fibonacci numbers", "def fib(n): ...")
+    cache.set("ns", "Check if a number is prime", "def is_prime(n): ...")
+    assert cache.get("ns", "find the nth Fibonacci number") == "def fib(n): ..."
+    assert cache.get("ns", "Write a function that checks whether a number is prime") == \
+        "def is_prime(n): ..."
+    assert cache.get("ns", "calculate the factorial of a number") is None
+    assert cache.get("ns", "sort a list of numbers") is None
+    assert cache.get("other", "find the nth Fibonacci number") is None
+    assert cache.hits == 2
+    assert cache.misses == 3
+
+def test_semantic_opposites_miss():
+    """Test tasks differing only in direction or negation don't hit"""
+    cache = SemanticCache()
+    cache.set("ns", "Convert Celsius to Fahrenheit", "def c_to_f(c): ...")
+    cache.set("ns", "Check if a number is prime", "def is_prime(n): ...")
+    cache.set("ns", "Sort a list of numbers in ascending order", "def sort_asc(xs): ...")
+    assert cache.get("ns", "Convert Fahrenheit to Celsius") is None
+    assert cache.get("ns", "Check if a number is not prime") is None
+    assert cache.get("ns", "Sort a list of numbers in descending order") is None
+    assert cache.hits == 0
+
+def test_semantic_eviction():
+    """Test the least recently used entries are evicted"""
+    cache = SemanticCache(max_size=2)
+    cache.set("ns", "reverse a string", "a")
+    cache.set("ns", "merge two sorted lists", "b")
+    assert cache.get("ns", "reverse string") == "a"
+    cache.set("ns", "parse an ISO date", "c")
+    assert len(cache) == 2
+    assert cache.get("ns", "merge two sorted lists") is None
+    assert cache.get("ns", "reverse a string") == "a"
+
+def test_agent_semantic_cache():
+    """Test the agent skips the API for a near-duplicate task"""
+    with patch.dict(os.environ, {"OPENAI_API_KEY": "test_key"}):
+        agent = CodingAgent(cache=ResponseCache(), semantic_cache=SemanticCache())
+        
+        mock_response = MagicMock()
+        mock_response.content = "def fib(n: int) -> int:\n    return n"
+        
+        with patch.object(agent.agent, 'step') as mock_step:
+            mock_step.return_value = mock_response
+            first = agent.generate(CodingTask("Write a function to calculate fibonacci numbers"))
+            second = agent.generate(CodingTask("find the nth Fibonacci number"))
+            
+            assert first == second
+            mock_step.assert_called_once()
+            assert agent.semantic_cache.hits == 1
+            # The near-duplicate hit is not stored under the second task's exact key
+            assert len(agent.cache.memory) == 1
+
@@ -0,0 +1,86 @@
+"""
+Tests for the backend evaluation harness
+"""
+import json
+import pytest
+from codeweaver.backends import create_backend
+from codeweaver.evaluation import (
+    EvalTask, Evaluator, ResultsDB, Sample, load_suite, pass_at_k, summarize
+)
+from codeweaver.mock_server import MockLLMServer
+
+SUITE = [
+    {"task_id": "t/0", "entry_point": "add",
+     "prompt": "def add(a: int, b: int) -> int:\n    \"\"\"Return a + b\"\"\"\n",
+     "test": "def check(candidate):\n    assert candidate(2, 3) == 5\n",
+     "canonical_solution": "    return a + b\n"},
+    {"task_id": "t/1", "entry_point": "neg",
+     "prompt": "def neg(x: int) -> int:\n    \"\"\"Return -x\"\"\"\n",
+     "test": "def check(candidate):\n    assert candidate(4) == -4\n"},
+]
+
+def respond(prompt):
+    """Right answer for add, wrong one for neg"""
+    if "def add" in prompt:
+        return "```python\ndef add(a: int, b: int) -> int:\n    return a + b\n```"
+    return "```python\ndef neg(x: int) -> int:\n    return x\n```"
+
+def test_pass_at_k():
+    """Test the unbiased pass@k estimator"""
+    assert pass_at_k(5, 0, 1) == 0.0
+    assert pass_at_k(5, 5, 3) == 1.0
+    assert pass_at_k(4, 1, 1) == pytest.approx(0.25)
+    assert pass_at_k(4, 1, 2) == pytest.approx(0.5)
+
+def test_summarize():
+    """Test pass@k, latency percentiles and cost per backend"""
+    samples = [Sample("a", "t", i, passed=i == 0, elapsed=float(i + 1),
+                      prompt_tokens=1_000_000, completion_tokens=0) for i in range(4)]
+    report = summarize(samples, {"a": "gpt-4o-mini"}, ks=(1, 2, 5))["a"]
+    assert report.pass_at == {1: pytest.approx(0.25), 2: pytest.approx(0.5)}
+    assert report.latency == {"p50": 2.0, "p90": 4.0, "p99": 4.0}
+    assert report.cost == pytest.approx(0.6)
+
+async def test_evaluate_and_compare(tmp_path):
+    """Test a run over two backends is tested, stored and compared"""
+    suite_path = tmp_path / "suite.jsonl"
+    suite_path.write_text("".join(json.dumps(task) + "\n" for task in SUITE))
+    suite = load_suite(suite_path)
+    assert suite[0] == EvalTask("t/0", SUITE[0]["prompt"], SUITE[0]["test"], "add")
+
+    async with MockLLMServer(latency=0, response=respond) as good, \
+            MockLLMServer(latency=0, error_rate=1.0, error_status=400) as broken:
+        first = create_backend("local", base_url=good.base_url, api_key="test")
+        second = create_backend("local", base_url=broken.base_url, api_key="test")
+        second.name = "broken"
+        evaluator = Evaluator([first, second], samples=3, ks=(1, 3), workers=2)
+        run = await evaluator.arun(suite, name="suite.jsonl")
+
+    reports = run.reports()
+    assert reports["local"].samples == 6
+    assert reports["local"].pass_at == {1: 0.5, 3: 0.5}
+    assert reports["local"].completion_tokens > 0
+    assert reports["broken"].errors == 6
+    assert reports["broken"].pass_at == {1: 0.0, 3: 0.0}
+
+    db = ResultsDB(tmp_path / "results.db")
+    base_id = db.save(run)
+    for sample in run.samples:
+        sample.passed = sample.backend == "local"
+    new_id = db.save(run)
+    assert [r["run_id"] for r in db.runs()] == [base_id, new_id]
+    assert db.load(base_id).reports()["local"].pass_at[1] == 0.5
+    assert db.compare(base_id, new_id)["local"]["pass@1"] == pytest.approx(0.5)
+    db.close()
+
+async def test_samples_use_prompt_context():
+    """Test completions relying on the prompt's imports are tested, each from one request"""
+    task = EvalTask("t/typed", "from typing import List\n\n\n"
+                    "def total(xs: List[int]) -> int:\n    \"\"\"Sum xs\"\"\"\n",
+                    "def check(candidate):\n    assert candidate([1, 2]) == 3\n", "total")
+    response = "```python\ndef total(xs: List[int]) -> int:\n    return sum(xs)\n```"
+    async with MockLLMServer(latency=0, response=response) as server:
+        backend = create_backend("local", base_url=server.base_url, api_key="test")
+        run = await Evaluator([backend], samples=2, workers=1).arun([task])
+        assert server.requests == 2
+    assert all(sample.passed and sample.error is None for sample in run.samples)
@@ -0,0 +1,96 @@
+"""
+Tests for code extraction from model responses
+"""
+from codeweaver.extraction import CodeSegment, StreamExtractor, extract_code, extract_segments
+
+CAMEL_RESPONSE = """
+\x1b[35m> Explanation:
+Some explanation here
+\x1b[35m> Code:
+def show_time():
+    return "12:00"
+2024-12-08 INFO - Some debug info"""
+
+def _stream(text, size):
+    """Feed text through a StreamExtractor in fixed-size chunks"""
+    extractor = StreamExtractor()
+    output = [extractor.feed(text[i:i + size]) for i in range(0, len(text), size)]
+    output.append(extractor.finish())
+    return "".join(output)
+
+def test_stream_camel_format():
+    """Test the explanation is skipped and log output truncated"""
+    for size in (1, 5, 1000):
+        result = _stream(CAMEL_RESPONSE, size)
+        assert result.startswith("def show_time():")
+        assert "Explanation" not in result
+        assert "INFO -" not in result
+        assert "\x1b" not in result
+
+def test_stream_plain_code():
+    """Test plain code passes through with blank lines preserved"""
+    code = "def f():\n\n    return 1"
+    assert _stream("\n\n" + code + "\n\n", 3) == code
+
+def test_stream_emits_early():
+    """Test complete lines are emitted before the stream ends"""
+    extractor = StreamExtractor()
+    assert extractor.feed("def f():\n    ret") == "def f():"
+    assert extractor.feed("urn 1\n") == "\n    return 1"
+    assert extractor.finish() == ""
+
+def test_stream_explanation_only():
+    """Test a labelled response without a code marker is returned whole"""
+    assert _stream("> Explanation:\nno code here\n", 4) == "> Explanation:\nno code here"
+
+def test_extract_camel_format():
+    """Test the code section is extracted and the log line removed"""
+    assert extract_code(CAMEL_RESPONSE) == 'def show_time():\n    return "12:00"'
+
+def test_extract_fenced_blocks():
+    """Test multiple fenced blocks are returned with their languages"""
+    response = "Here you go:\n```python\ndef a():\n    pass\n```\nand\n```\nb = 1\n```\n"
+    assert extract_segments(response) == [
+        CodeSegment("python", "def a():\n    pass"),
+        CodeSegment(None, "b = 1")
+    ]
+    assert extract_code(response) == "def a():\n    pass\n\nb = 1"
+
+def test_extract_unterminated_fence():
+    """Test a fence cut off by the token limit still yields its code"""
+    assert extract_code("```python\ndef a():\n    if x > LIMIT:") == "def a():\n    if x > LIMIT:"
+
+def test_extract_full_ansi_sequences():
+    """Test non-color CSI sequences are stripped too"""
+    assert extract_code("\x1b[2K\x1b[1;32mdef f():\x1b[0m\n    pass") == "def f():\n    pass"
+
+def test_extract_keeps_code_mentioning_levels():
+    """Test only timestamped log lines are treated as logging"""
+    code = "def f():\n    print('ERROR - failed')"
+    assert extract_code(code) == code
+
+def test_extract_skips_shell_blocks():
+    """Test install commands ahead of the Python block are not taken as code"""
+    response = ("```bash\npip install requests\n```\nThen:\n"
+                "```python\nimport requests\n\ndef fetch(url):\n    return requests.get(url)\n```\n")
+    code = "import requests\n\ndef fetch(url):\n    return requests.get(url)"
+    assert extract_code("Install it first:\n" + response) == code
+    for size in (1, 7, 1000):
+        assert _stream(response, size) == code
+    # With no Python block, the other languages are all there is
+    shell_only = "```bash\npip install requests\n```"
+    assert extract_code(shell_only) == "pip install requests"
+    assert _stream(shell_only, 3) == "pip install requests"
+
+def test_stream_matches_extract():
+    """Test streamed extraction agrees with one-shot extraction"""
+    responses = [
+        CAMEL_RESPONSE,
+        "```python\ndef a():\n    pass\n```\n```\nb = 1\n```",
+        "> Code:\ndef f():\n    pass\n> Explanation:\nmore\n> Code:\ng = 1",
+        "```sh\nls\n\npwd\n```\n```js\nlet a = 1\n```",
+        "```Python\ndef a():\n    pass\n```\n```sh\nls\n```\n```\nb = 1",
+    ]
+    for response in responses:
+        for size in (1, 7, 1000):
+            assert _stream(response, size) == extract_code(response)
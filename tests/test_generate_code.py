@@ -0,0 +1,45 @@
+"""
+Tests for the batch mode of scripts/generate_code.py
+"""
+import asyncio
+import importlib.util
+import io
+import threading
+from pathlib import Path
+
+_spec = importlib.util.spec_from_file_location(
+    "generate_code", Path(__file__).parent.parent / "scripts" / "generate_code.py")
+generate_code = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(generate_code)
+
+async def test_read_tasks_skips_invalid_lines():
+    """Test malformed lines and non-object values are reported, not fatal"""
+    source = io.StringIO('{"id": "a", "task": "Double a number"}\n{"task": broken\n42\n'
+                         'null\n[1]\n\n"Triple a number"\n')
+    ids, invalid = [], []
+    tasks = [task async for task in generate_code.read_tasks(source, set(), ids, invalid)]
+    assert [task.description for task in tasks] == ["Double a number", "Triple a number"]
+    assert ids == ["a", "7"]
+    assert [number for number, _ in invalid] == [2, 3, 4, 5]
+    assert invalid[0][1].startswith("Invalid JSON on line 2")
+    assert invalid[1][1] == "Invalid task on line 3: expected an object or a string, got int"
+    assert "got NoneType" in invalid[2][1] and "got list" in invalid[3][1]
+
+class SlowPipe:
+    """File whose next line only arrives once released, like a slow stdin"""
+    def __init__(self):
+        self.release = threading.Event()
+
+    def readline(self):
+        self.release.wait(10)
+        return ""
+
+async def test_read_tasks_does_not_block_loop():
+    """Test waiting for input leaves the event loop free for generations in flight"""
+    pipe = SlowPipe()
+    reader = asyncio.ensure_future(anext(generate_code.read_tasks(pipe, set(), [], []), None))
+    # Another coroutine keeps running while the reader waits on the pipe
+    await asyncio.sleep(0.05)
+    assert not reader.done()
+    pipe.release.set()
+    assert await reader is None
@@ -0,0 +1,171 @@
+"""
+Tests for circuit breakers and failover between backends
+"""
+import asyncio
+import time
+from unittest.mock import patch
+import pytest
+from codeweaver.agent import CodingAgent, CodingTask, ERROR_RESPONSE
+from codeweaver.backends import create_backend
+from codeweaver.health import (
+    ABANDONED, CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+)
+from codeweaver.mock_server import MockLLMServer
+
+def make_backend(server, **kwargs):
+    backend = create_backend("local", base_url=server.base_url, api_key="test",
+                             breaker=CircuitBreaker(**kwargs))
+    backend.scheduler.max_retries = 0
+    return backend
+
+def test_breaker_states():
+    """Test the breaker opens on errors, half-opens after the timeout and closes on success"""
+    breaker = CircuitBreaker(failure_rate=0.5, window=4, min_calls=4, reset_timeout=0.05)
+    for ok in (True, False, True):
+        breaker.record(ok)
+    assert breaker.state == CLOSED
+    breaker.record(False)
+    assert breaker.state == OPEN and not breaker.available
+    assert not breaker.try_trial()
+
+    time.sleep(0.06)
+    assert breaker.state == HALF_OPEN
+    assert breaker.try_trial()
+    assert not breaker.try_trial()
+    breaker.record(False)
+    assert breaker.state == OPEN
+
+    time.sleep(0.06)
+    assert breaker.try_trial()
+    breaker.record(True)
+    assert breaker.state == CLOSED and breaker.opened == 2
+
+def test_slow_calls_open_breaker():
+    """Test calls slower than the slow call threshold count as failures"""
+    breaker = CircuitBreaker(min_calls=2, slow_call=0.5)
+    breaker.record(True, latency=0.1)
+    breaker.record(True, latency=2.0)
+    assert breaker.state == OPEN
+
+async def test_open_circuit_fails_fast():
+    """Test a backend with an open circuit refuses requests without calling the API"""
+    async with MockLLMServer(latency=0.2, error_rate=1.0, error_status=503) as server:
+        backend = make_backend(server, min_calls=2, reset_timeout=60)
+        for _ in range(2):
+            with pytest.raises(Exception):
+                await backend.complete("sys", "task")
+        start = time.perf_counter()
+        with pytest.raises(CircuitOpenError):
+            await backend.complete("sys", "task")
+        assert time.perf_counter() - start < 0.05
+        assert server.requests == 2
+        await backend.aclose()
+
+async def test_failover_and_recovery():
+    """Test traffic fails over while the primary is down and returns once a probe succeeds"""
+    async with MockLLMServer(latency=0, error_rate=1.0, error_status=503) as primary_server, \
+            MockLLMServer(latency=0) as fallback_server:
+        primary = make_backend(primary_server, min_calls=2, reset_timeout=0.1)
+        fallback = make_backend(fallback_server)
+        fallback.name = "fallback"
+        agent = CodingAgent(model=primary, fallback=[fallback], system_message="sys")
+
+        for i in range(5):
+            assert await agent.agenerate(CodingTask(f"task {i}")) != ERROR_RESPONSE
+        assert primary_server.requests == 2
+        assert fallback_server.requests == 5
+        assert agent.backend_health == {"local": OPEN, "fallback": CLOSED}
+
+        # Once the timeout passes, a background probe finds the primary healthy again
+        primary_server.error_rate = 0.0
+        await asyncio.sleep(0.15)
+        await agent.agenerate(CodingTask("task 5"))
+        await asyncio.sleep(0.05)
+        assert agent.backend_health["local"] == CLOSED
+        await agent.agenerate(CodingTask("task 6"))
+        assert primary_server.requests == 4
+        await agent.aclose()
+
+class RecordingBreaker(CircuitBreaker):
+    """Breaker keeping every outcome it is given"""
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.outcomes = []
+
+    def record(self, ok: bool, latency: float = 0.0):
+        self.outcomes.append(ok)
+        super().record(ok, latency)
+
+class BrokenStream:
+    """Chat completion stream that fails after its first chunk"""
+    def __init__(self, stream):
+        self.stream = stream
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.stream is None:
+            raise ConnectionError("stream cut off")
+        chunk = await self.stream.__anext__()
+        self.stream = None
+        return chunk
+
+    async def close(self):
+        pass
+
+async def test_stream_records_one_outcome():
+    """Test a streamed call counts once on the breaker, when it finishes or fails"""
+    async with MockLLMServer(latency=0) as server:
+        breaker = RecordingBreaker()
+        backend = create_backend("local", base_url=server.base_url, api_key="test",
+                                 breaker=breaker)
+        assert "".join([chunk async for chunk in backend.stream("sys", "task")])
+        assert breaker.outcomes == [True]
+
+        create = backend.get_client().chat.completions.create
+
+        async def broken_create(**kwargs):
+            return BrokenStream(await create(**kwargs))
+
+        with patch.object(backend.get_client().chat.completions, "create", broken_create):
+            with pytest.raises(ConnectionError):
+                async for _ in backend.stream("sys", "task"):
+                    pass
+        assert breaker.outcomes == [True, False]
+        await backend.aclose()
+
+async def test_timeouts_open_breaker():
+    """Test calls to a hanging backend cut off by timeouts count as failures"""
+    async with MockLLMServer(latency=3.0) as server:
+        backend = make_backend(server, min_calls=4, reset_timeout=60)
+        agent = CodingAgent(model=backend, system_message="sys")
+        results = [await agent.agenerate_result(CodingTask(f"task {i}"), timeout=0.1)
+                   for i in range(4)]
+        assert all(result.error == "Timed out after 0.1s" for result in results)
+        assert backend.breaker.state == OPEN
+        result = await agent.agenerate_result(CodingTask("task 4"), timeout=0.1)
+        assert result.error.startswith("CircuitOpenError")
+        assert server.requests == 4
+        await agent.aclose()
+
+async def test_abandoned_calls_not_recorded():
+    """Test requests cancelled because their result is unwanted leave the breaker alone"""
+    async with MockLLMServer(latency=3.0) as server:
+        breaker = RecordingBreaker()
+        backend = create_backend("local", base_url=server.base_url, api_key="test",
+                                 breaker=breaker)
+        calls = [asyncio.create_task(backend.complete("sys", f"task {i}")) for i in range(2)]
+        await asyncio.sleep(0.1)
+        calls[0].cancel(ABANDONED)
+        calls[1].cancel()
+        await asyncio.gather(*calls, return_exceptions=True)
+        assert breaker.outcomes == [False]
+
+        # A stream the caller stops reading early was served fine
+        server.latency = 0
+        deltas = backend.stream("sys", "task")
+        assert await anext(deltas)
+        await deltas.aclose()
+        assert breaker.outcomes == [False, True]
+        await backend.aclose()
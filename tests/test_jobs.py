@@ -0,0 +1,100 @@
+"""
+Tests for the durable job queue and its workers
+"""
+import os
+import sys
+import time
+from unittest.mock import patch
+from codeweaver.agent import CodingAgent
+from codeweaver.backends import create_backend
+from codeweaver.jobs import DONE, FAILED, LEASED, QUEUED, JobQueue, JobWorker, main, run_workers
+from codeweaver.mock_server import MockLLMServer
+
+def test_lease_ack_and_retry(tmp_path):
+    """Test jobs are deduplicated, leased once, and retried until attempts run out"""
+    queue = JobQueue(tmp_path / "jobs.db", max_attempts=2, retry_delay=0)
+    assert queue.enqueue(["Double a number", ("triple", "Triple a number")]) == 2
+    assert queue.enqueue(["Double a number"]) == 0
+
+    first, second = queue.lease("a", count=5)
+    assert queue.lease("b") == []
+    assert queue.counts()[LEASED] == 2
+    assert queue.ack(first, "def f(n): return n * 2", 0.1, 10, 5)
+    assert queue.fail(second, "RuntimeError: boom", 0.2)
+    assert queue.counts() == {QUEUED: 1, LEASED: 0, DONE: 1, FAILED: 0}
+
+    retried, = queue.lease("b")
+    assert retried.key == "triple" and retried.attempts == 2
+    queue.fail(retried, "RuntimeError: boom again", 0.3)
+    assert queue.finished()
+    done, failed = queue.results()
+    assert done.status == DONE and done.completion_tokens == 5
+    assert failed.status == FAILED and failed.error == "RuntimeError: boom again"
+    queue.close()
+
+def test_expired_lease_reclaimed(tmp_path):
+    """Test a job whose owner stopped heartbeating goes to another worker"""
+    queue = JobQueue(tmp_path / "jobs.db", lease_seconds=0.1)
+    queue.enqueue(["Double a number"])
+    job, = queue.lease("crashed")
+    assert queue.heartbeat("crashed") == 1
+    time.sleep(0.2)
+    reclaimed, = queue.lease("alive")
+    assert reclaimed.id == job.id and reclaimed.owner == "alive"
+    assert not queue.ack(job, "stale", 0.1)
+    assert queue.ack(reclaimed, "def f(n): return n * 2", 0.1)
+    queue.close()
+
+async def test_worker_records_real_errors(tmp_path):
+    """Test failed generations are recorded with their error, not placeholder code"""
+    queue = JobQueue(tmp_path / "jobs.db", max_attempts=2, retry_delay=0)
+    queue.enqueue(["Double a number", " "])
+    async with MockLLMServer(latency=0, error_rate=1.0, error_status=400) as server:
+        backend = create_backend("local", base_url=server.base_url, api_key="test")
+        backend.scheduler.max_retries = 0
+        agent = CodingAgent(model=backend, system_message="sys")
+        worker = JobWorker(queue, agent, concurrency=2, poll_interval=0.05)
+        await worker.arun()
+        await agent.aclose()
+    # The API error is retried; the invalid task fails the same way every time
+    assert worker.failed == 3 and worker.completed == 0
+    failed, invalid = sorted(queue.results(), key=lambda job: job.task != "Double a number")
+    assert failed.error.startswith("BadRequestError") or "400" in failed.error
+    assert failed.attempts == 2
+    assert invalid.error == "InvalidTaskError: Invalid task input"
+    assert invalid.attempts == 1
+    queue.close()
+
+def test_run_workers(tmp_path):
+    """Test several worker processes share a queue, each job generated exactly once"""
+    path = tmp_path / "jobs.db"
+    queue = JobQueue(path, lease_seconds=1.0)
+    queue.enqueue([f"Double a number, variant {i}" for i in range(12)])
+    # A worker that died holding a lease
+    queue.lease("crashed", count=2)
+    with MockLLMServer(latency=0.01) as server, \
+            patch.dict(os.environ, {"CODEWEAVER_LOCAL_BASE_URL": server.base_url}):
+        codes = run_workers(path, workers=2, concurrency=3,
+                            queue_options={"lease_seconds": 1.0}, model="local",
+                            system_message="sys")
+        requests = server.requests
+    assert codes == [0, 0]
+    assert queue.counts()[DONE] == 12
+    assert requests == 12
+    assert all("return n * 2" in job.code for job in queue.results())
+    queue.close()
+
+def test_enqueue_files_without_ids(tmp_path, capsys):
+    """Test id-less tasks from a second file are keyed by description, not line number"""
+    db = tmp_path / "jobs.db"
+    for name, tasks in (("first", ["Double a number", "Triple a number"]),
+                        ("second", ["Halve a number", "Double a number"])):
+        path = tmp_path / f"{name}.jsonl"
+        path.write_text("".join(f'{{"task": "{task}"}}\n' for task in tasks))
+        with patch.object(sys, "argv", ["jobs", "--db", str(db), "enqueue", str(path)]):
+            assert main() == 0
+    assert capsys.readouterr().out.splitlines() == ["Enqueued 2 new tasks of 2",
+                                                    "Enqueued 1 new tasks of 2"]
+    queue = JobQueue(db)
+    assert queue.counts()[QUEUED] == 3
+    queue.close()
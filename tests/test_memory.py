@@ -0,0 +1,95 @@
+"""
+Tests for conversation memory policies
+"""
+import os
+from unittest.mock import MagicMock, patch
+from codeweaver.agent import CodingAgent, CodingTask
+from codeweaver.backends import Completion, ModelBackend, OpenAIBackend, create_backend
+from codeweaver.memory import SlidingWindow, Stateless, TokenBudget, Turn
+from codeweaver.mock_server import MockLLMServer
+
+def make_turn(i, size=10):
+    return Turn(f"task {i}", f"prompt {i} " + "x" * size, f"def f{i}():\n    return {i}")
+
+class RecordingBackend(ModelBackend):
+    """Backend remembering the history sent with each request"""
+    name = "recording"
+    supports_streaming = False
+
+    def __init__(self):
+        super().__init__()
+        self.histories = []
+
+    async def _complete(self, system, prompt, history=(), **params):
+        self.histories.append(list(history))
+        return Completion("def f():\n    pass", prompt_tokens=len(history) + 1)
+
+def test_stateless_sends_no_history():
+    """Test the default policy never sends earlier turns"""
+    backend = RecordingBackend()
+    agent = CodingAgent(model=backend, system_message="sys")
+    assert isinstance(agent.memory, Stateless)
+    for i in range(3):
+        agent.generate(CodingTask(description=f"task {i}"))
+    assert backend.histories == [[], [], []]
+    agent.close()
+
+def test_sliding_window():
+    """Test only the last N turns are kept"""
+    memory = SlidingWindow(2)
+    for i in range(5):
+        memory.record(make_turn(i))
+    context = memory.context()
+    assert [message["role"] for message in context] == ["user", "assistant"] * 2
+    assert context[0]["content"].startswith("prompt 3")
+    assert context[-1]["content"] == "def f4():\n    return 4"
+
+def test_agent_sends_window():
+    """Test the agent sends its remembered turns and reports prompt tokens"""
+    backend = RecordingBackend()
+    agent = CodingAgent(model=backend, system_message="sys", memory=SlidingWindow(1))
+    agent.generate(CodingTask(description="first"))
+    assert agent.last_completion.prompt_tokens == 1
+    agent.generate(CodingTask(description="second"))
+    agent.generate(CodingTask(description="third"))
+    assert [len(history) for history in backend.histories] == [0, 2, 2]
+    assert "second" in backend.histories[2][0]["content"]
+    assert agent.last_completion.prompt_tokens == 3
+    agent.close()
+
+def test_token_budget_summarizes():
+    """Test older turns are folded into a summary that stays within budget"""
+    memory = TokenBudget(max_tokens=120)
+    for i in range(20):
+        memory.record(make_turn(i, size=100))
+    context = memory.context()
+    assert context[0]["content"].startswith("Summary of earlier requests")
+    assert memory.summary.endswith("- task 17 -> defined f17")
+    assert "task 0 " not in memory.summary
+    assert context[-1]["content"] == "def f19():\n    return 19"
+    used = sum(turn.tokens for turn in memory.turns) + len(memory.summary) // 4 + 1
+    assert used <= 120
+
+    memory.clear()
+    assert memory.context() == []
+
+def test_openai_backend_rebuilds_agent_memory():
+    """Test the embodied agent's memory is replaced by the policy's history"""
+    with patch.dict(os.environ, {"OPENAI_API_KEY": "test_key"}):
+        backend = OpenAIBackend()
+    agent = MagicMock()
+    history = [{"role": "user", "content": "a"}, {"role": "assistant", "content": "b"}]
+    backend._step(agent, "prompt", history)
+    agent.reset.assert_called_once()
+    assert agent.update_memory.call_count == 2
+    assert agent.step.call_args[0][0].content == "prompt"
+
+def test_batch_reports_tokens():
+    """Test batch results carry the usage reported by the server"""
+    with MockLLMServer(latency=0) as server:
+        backend = create_backend("local", base_url=server.base_url, api_key="test")
+        agent = CodingAgent(model=backend, system_message="sys")
+        results = list(agent.generate_many([CodingTask("Double a number")]))
+        agent.close()
+    assert results[0].prompt_tokens > 0
+    assert results[0].completion_tokens > 0
@@ -0,0 +1,52 @@
+"""
+Tests for CodingAgent's real client path against the local mock server
+"""
+from codeweaver.agent import CodingAgent, CodingTask, ERROR_RESPONSE
+from codeweaver.backends import create_backend
+from codeweaver.mock_server import MockLLMServer
+
+EXPECTED = "def solution(n: int) -> int:\n    \"\"\"Return n doubled\"\"\"\n    return n * 2"
+
+def make_agent(server, **scheduler):
+    """Create an agent using the local backend pointed at the server"""
+    backend = create_backend("local", base_url=server.base_url, api_key="test")
+    for name, value in scheduler.items():
+        setattr(backend.scheduler, name, value)
+    return CodingAgent(model=backend)
+
+async def test_agenerate_through_client():
+    """Test a full request round trip over HTTP"""
+    async with MockLLMServer(latency=0) as server:
+        agent = make_agent(server)
+        assert await agent.agenerate(CodingTask("Double a number")) == EXPECTED
+        await agent.aclose()
+    assert server.requests == 1
+    assert "Double a number" in server.prompts[0]
+
+async def test_astream_through_client():
+    """Test streamed responses are parsed from server-sent events"""
+    async with MockLLMServer(latency=0, tokens_per_second=1000) as server:
+        agent = make_agent(server)
+        chunks = [chunk async for chunk in agent.astream(CodingTask("Double a number"))]
+        await agent.aclose()
+    assert len(chunks) > 1
+    assert "".join(chunks) == EXPECTED
+
+async def test_injected_errors_are_retried():
+    """Test rate-limit errors from the server go through the scheduler's retries"""
+    async with MockLLMServer(latency=0, error_rate=1.0) as server:
+        agent = make_agent(server, max_retries=2, base_delay=0.01)
+        assert await agent.agenerate(CodingTask("Double a number")) == ERROR_RESPONSE
+        await agent.aclose()
+    assert server.requests == 3
+    assert agent.backend.scheduler.retries == 2
+
+def test_generate_many_against_threaded_server():
+    """Test the blocking batch path against a server on its own thread"""
+    with MockLLMServer(latency=0.01) as server:
+        agent = make_agent(server)
+        tasks = [CodingTask(f"Task {i}") for i in range(8)]
+        results = list(agent.generate_many(tasks, concurrency=4))
+        agent.close()
+    assert server.requests == 8
+    assert all(result.code == EXPECTED for result in results)
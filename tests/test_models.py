@@ -33,3 +33,69 @@ def test_missing_api_keys():
         with pytest.raises(ValueError) as exc_info:
             CodingAgent(model="deepseek")
         assert "DEEPSEEK_API_KEY" in str(exc_info.value)
+
+def _mock_completion(text):
+    """Build a mock chat completion response"""
+    response = MagicMock()
+    response.choices[0].message.content = text
+    return response
+
+async def test_deepseek_agenerate():
+    """Test the DeepSeek path awaits the API and returns text"""
+    with patch.dict(os.environ, {"DEEPSEEK_API_KEY": "test_key", "OPENAI_API_KEY": "test_key"}):
+        agent = CodingAgent(model="deepseek")
+        client = agent.backend.get_client()
+        with patch.object(client.chat.completions, 'create', new_callable=AsyncMock) as mock_create:
+            mock_create.return_value = _mock_completion("def add(a, b):\n    return a + b")
+            result = await agent.agenerate(CodingTask(description="add two numbers"))
+            assert result == "def add(a, b):\n    return a + b"
+            mock_create.assert_awaited_once()
+        await agent.aclose()
+
+async def test_client_reused():
+    """Test the pooled client is shared between calls on the same loop"""
+    with patch.dict(os.environ, {"DEEPSEEK_API_KEY": "test_key", "OPENAI_API_KEY": "test_key"}):
+        agent = CodingAgent(model="deepseek")
+        assert agent.backend.get_client() is agent.backend.get_client()
+        await agent.aclose()
+
+def test_sync_generate_deepseek():
+    """Test the blocking wrapper runs the async DeepSeek path"""
+    with patch.dict(os.environ, {"DEEPSEEK_API_KEY": "test_key", "OPENAI_API_KEY": "test_key"}):
+        agent = CodingAgent(model="deepseek")
+        with patch("openai.resources.chat.completions.AsyncCompletions.create", new_callable=AsyncMock) as mock_create:
+            mock_create.return_value = _mock_completion("def f():\n    pass")
+            assert agent.generate(CodingTask(description="noop")) == "def f():\n    pass"
+            assert agent.generate(CodingTask(description="noop")) == "def f():\n    pass"
+            assert mock_create.await_count == 2
+        agent.close()
+
+class _MockStream:
+    """Async iterable standing in for a streamed chat completion"""
+
+    def __init__(self, deltas):
+        self.deltas = deltas
+        self.closed = False
+
+    async def __aiter__(self):
+        for delta in self.deltas:
+            chunk = MagicMock()
+            chunk.choices[0].delta.content = delta
+            yield chunk
+
+    async def close(self):
+        self.closed = True
+
+def test_stream_deepseek():
+    """Test streaming yields extracted code incrementally"""
+    with patch.dict(os.environ, {"DEEPSEEK_API_KEY": "test_key", "OPENAI_API_KEY": "test_key"}):
+        agent = CodingAgent(model="deepseek")
+        stream = _MockStream(["> Code:\ndef f():\n", "    return 1\n", "2024-12-08 INFO - done"])
+        with patch("openai.resources.chat.completions.AsyncCompletions.create", new_callable=AsyncMock) as mock_create:
+            mock_create.return_value = stream
+            chunks = list(agent.stream(CodingTask(description="return one")))
+            
+        assert len(chunks) > 1
+        assert "".join(chunks) == "def f():\n    return 1"
+        assert stream.closed
+        agent.close()
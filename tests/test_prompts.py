@@ -0,0 +1,46 @@
+"""
+Tests for prompt templates and cached-token reporting
+"""
+from codeweaver.agent import CodingAgent, CodingTask
+from codeweaver.backends import Completion, create_backend
+from codeweaver.mock_server import MockLLMServer
+from codeweaver.prompts import PromptTemplate
+
+def test_task_rendered_last():
+    """Test prompts for different tasks share the whole static prefix"""
+    template = PromptTemplate()
+    first = template.render("add two numbers")
+    second = template.render("reverse a string")
+    assert first.startswith(template.prefix)
+    assert second.startswith(template.prefix)
+    assert first.endswith("add two numbers")
+    assert "Requirements:\n1. Include proper error handling" in template.prefix
+
+def test_examples_in_prefix():
+    """Test few-shot examples are part of the static prefix"""
+    template = PromptTemplate(examples=(("square a number", "def square(x):\n    return x * x"),))
+    assert "Example task:\nsquare a number" in template.prefix
+    assert template.prefix.index("Requirements") < template.prefix.index("Example task")
+
+def test_usage_parsing():
+    """Test cached tokens are read from OpenAI and DeepSeek usage formats"""
+    openai_usage = {"prompt_tokens": 2000, "completion_tokens": 10,
+                    "prompt_tokens_details": {"cached_tokens": 1536}}
+    assert Completion.from_usage("x", openai_usage).cached_tokens == 1536
+    deepseek_usage = {"prompt_tokens": 2000, "completion_tokens": 10,
+                      "prompt_cache_hit_tokens": 1900}
+    assert Completion.from_usage("x", deepseek_usage).cached_tokens == 1900
+    assert Completion.from_usage("x", None).cached_tokens == 0
+
+def test_prefix_cache_hits():
+    """Test repeated static prefixes are reported as cached by the server"""
+    with MockLLMServer(latency=0, cache_block=64) as server:
+        backend = create_backend("local", base_url=server.base_url, api_key="test")
+        agent = CodingAgent(model=backend, system_message="You write Python.")
+        agent.generate(CodingTask("add two numbers"))
+        assert agent.last_completion.cached_tokens == 0
+        agent.generate(CodingTask("reverse a string"))
+        cached = agent.last_completion.cached_tokens
+        agent.close()
+    prefix_tokens = len(PromptTemplate().prefix) // 4
+    assert prefix_tokens - 16 <= cached <= prefix_tokens + 16
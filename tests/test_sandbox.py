@@ -0,0 +1,64 @@
+"""
+Tests for the warm sandbox pool
+"""
+import asyncio
+import sys
+import pytest
+from codeweaver.sandbox import SandboxPool
+
+async def test_run_captures_output():
+    """Test snippets run and their output is captured"""
+    async with SandboxPool(size=1) as pool:
+        result = await pool.run("import json\nprint(json.dumps([1, 2]))")
+    assert result.ok
+    assert result.stdout == "[1, 2]\n"
+
+async def test_errors_reported():
+    """Test exceptions are returned as tracebacks and the worker is reused"""
+    async with SandboxPool(size=1) as pool:
+        result = await pool.run("def f():\n    return 1 / 0\nf()")
+        assert not result.ok
+        assert "ZeroDivisionError" in result.error
+        assert (await pool.run("print('still warm')")).ok
+        assert pool.started == 1
+
+async def test_fresh_namespace():
+    """Test names defined by one snippet are not visible to the next"""
+    async with SandboxPool(size=1) as pool:
+        await pool.run("leaked = 1")
+        result = await pool.run("print(leaked)")
+    assert "NameError" in result.error
+
+async def test_timeout_replaces_worker():
+    """Test a stuck snippet is killed and the pool keeps serving"""
+    async with SandboxPool(size=1) as pool:
+        result = await pool.run("while True:\n    pass", timeout=0.5)
+        assert result.timed_out
+        assert (await pool.run("print(1)")).stdout == "1\n"
+        assert pool.started == 2
+
+async def test_recycled_after_max_uses():
+    """Test workers are replaced after running max_uses snippets"""
+    async with SandboxPool(size=1, max_uses=2) as pool:
+        pids = [(await pool.run("import os\nprint(os.getpid())")).stdout for _ in range(4)]
+    assert pids[0] == pids[1]
+    assert pids[1] != pids[2]
+    assert pool.recycled == 2
+
+async def test_concurrent_runs():
+    """Test snippets run in parallel across workers"""
+    async with SandboxPool(size=4) as pool:
+        start = asyncio.get_running_loop().time()
+        results = await asyncio.gather(*(pool.run("import time\ntime.sleep(0.3)")
+                                         for _ in range(4)))
+        elapsed = asyncio.get_running_loop().time() - start
+    assert all(result.ok for result in results)
+    assert elapsed < 0.3 * 3
+
+@pytest.mark.skipif(sys.platform == "win32", reason="memory limits need the resource module")
+async def test_memory_limit():
+    """Test allocations beyond the memory limit fail"""
+    async with SandboxPool(size=1, memory_limit=256 * 2**20) as pool:
+        result = await pool.run("data = bytearray(1024 * 2**20)")
+    assert not result.ok
+    assert "MemoryError" in result.error
@@ -0,0 +1,69 @@
+"""
+Tests for the rate limiting scheduler
+"""
+import asyncio
+import time
+import pytest
+from codeweaver.scheduler import BATCH, INTERACTIVE, RequestScheduler, TokenBucket
+
+class RateLimited(Exception):
+    """Stand-in for a provider 429 response"""
+    status_code = 429
+
+def test_token_bucket_wait_time():
+    """Test the bucket reports how long until tokens are available"""
+    bucket = TokenBucket(per_minute=60)
+    assert bucket.wait_time(60) == 0
+    bucket.take(60)
+    assert 0.9 < bucket.wait_time(1) <= 1.0
+
+async def test_requests_per_minute():
+    """Test requests beyond the burst wait for the refill"""
+    scheduler = RequestScheduler(requests_per_minute=600)
+    scheduler.requests.level = 1
+    start = time.monotonic()
+    await scheduler.acquire()
+    await scheduler.acquire()
+    assert time.monotonic() - start >= 0.09
+
+async def test_priority_order():
+    """Test interactive requests jump ahead of queued batch requests"""
+    scheduler = RequestScheduler(requests_per_minute=1200)
+    scheduler.requests.level = 0
+    order = []
+    
+    async def request(name, priority):
+        await scheduler.acquire(priority=priority)
+        order.append(name)
+    
+    batch = [asyncio.create_task(request(f"batch{i}", BATCH)) for i in range(3)]
+    await asyncio.sleep(0)
+    interactive = asyncio.create_task(request("interactive", INTERACTIVE))
+    await asyncio.gather(*batch, interactive)
+    assert order[0] == "interactive"
+    assert order[1:] == ["batch0", "batch1", "batch2"]
+
+async def test_retry_on_rate_limit():
+    """Test 429 responses are retried with backoff"""
+    scheduler = RequestScheduler(base_delay=0.01)
+    calls = []
+    
+    async def request():
+        calls.append(1)
+        if len(calls) < 3:
+            raise RateLimited()
+        return "ok"
+    
+    assert await scheduler.run(request) == "ok"
+    assert scheduler.retries == 2
+
+async def test_no_retry_on_client_error():
+    """Test non-retryable errors are raised immediately"""
+    scheduler = RequestScheduler(base_delay=0.01)
+    
+    async def request():
+        raise ValueError("bad request")
+    
+    with pytest.raises(ValueError):
+        await scheduler.run(request)
+    assert scheduler.retries == 0
@@ -0,0 +1,99 @@
+"""
+Tests for the CodeWeaver HTTP service
+"""
+import asyncio
+import json
+import httpx
+from codeweaver.agent import CodingAgent
+from codeweaver.backends import create_backend
+from codeweaver.mock_server import MockLLMServer
+from codeweaver.service import MAX_BODY, CodeWeaverService
+
+def make_service(upstream, agents=2):
+    def factory():
+        backend = create_backend("local", base_url=upstream.base_url, api_key="test")
+        backend.scheduler.max_retries = 0
+        return CodingAgent(model=backend, system_message="sys")
+    return CodeWeaverService(port=0, agents=agents, agent_factory=factory)
+
+async def test_identical_requests_coalesced():
+    """Test concurrent identical requests share one upstream call"""
+    async with MockLLMServer(latency=0.1) as upstream, make_service(upstream) as service:
+        async with httpx.AsyncClient(base_url=service.url) as client:
+            responses = await asyncio.gather(*(
+                client.post("/v1/generate", json={"task": "Double a number"}) for _ in range(5)
+            ), client.post("/v1/generate", json={"task": "Triple a number"}))
+            health = (await client.get("/health")).json()
+
+    bodies = [response.json() for response in responses]
+    assert all(response.status_code == 200 for response in responses)
+    assert all("return n * 2" in body["code"] for body in bodies)
+    assert sum(body["coalesced"] for body in bodies) == 4
+    assert upstream.requests == 2
+    assert health["requests"] == 6 and health["upstream_calls"] == 2
+    assert health["idle_agents"] == 2 and health["backends"] == {"local": "closed"}
+
+async def test_streaming():
+    """Test streamed code arrives as server-sent events, shared by coalesced callers"""
+    async def consume(client):
+        chunks = []
+        async with client.stream("POST", "/v1/generate",
+                                 json={"task": "Double a number", "stream": True}) as response:
+            assert response.headers["content-type"] == "text/event-stream"
+            async for line in response.aiter_lines():
+                if line.startswith("data: ") and line != "data: [DONE]":
+                    chunks.append(json.loads(line[6:])["code"])
+        return "".join(chunks)
+
+    async with MockLLMServer(latency=0.05, tokens_per_second=200) as upstream, \
+            make_service(upstream) as service:
+        async with httpx.AsyncClient(base_url=service.url) as client:
+            first, second = await asyncio.gather(consume(client), consume(client))
+    assert "return n * 2" in first
+    assert first == second
+    assert upstream.requests == 1
+
+async def test_streaming_and_plain_requests_coalesced():
+    """Test streaming and non-streaming callers of one task share the upstream call"""
+    async with MockLLMServer(latency=0.1) as upstream, make_service(upstream) as service:
+        async with httpx.AsyncClient(base_url=service.url) as client:
+            async def stream():
+                async with client.stream("POST", "/v1/generate",
+                                         json={"task": "Double a number",
+                                               "stream": True}) as response:
+                    return "".join([json.loads(line[6:])["code"]
+                                    async for line in response.aiter_lines()
+                                    if line.startswith("data: ") and line != "data: [DONE]"])
+
+            streamed, plain = await asyncio.gather(
+                stream(), client.post("/v1/generate", json={"task": "Double a number"}))
+    assert streamed == plain.json()["code"]
+    assert plain.json()["coalesced"]
+    assert upstream.requests == 1
+
+async def test_errors():
+    """Test bad requests and failed generations are reported"""
+    async with MockLLMServer(latency=0, error_rate=1.0, error_status=400) as upstream, \
+            make_service(upstream, agents=1) as service:
+        async with httpx.AsyncClient(base_url=service.url) as client:
+            assert (await client.post("/v1/generate", json={"task": " "})).status_code == 400
+            assert (await client.post("/v1/generate", content=b"[1]")).status_code == 400
+            assert (await client.get("/v1/missing")).status_code == 404
+            response = await client.post("/v1/generate", json={"task": "Double a number"})
+    assert response.status_code == 502
+    assert response.json()["error"] == "Code generation failed"
+
+async def test_oversized_body_rejected():
+    """Test a body over the limit gets a 413 without being read, and the connection closes"""
+    async with MockLLMServer(latency=0) as upstream, make_service(upstream, agents=1) as service:
+        host, port = service.url.rsplit("//", 1)[1].split(":")
+        reader, writer = await asyncio.open_connection(host, int(port))
+        writer.write(f"POST /v1/generate HTTP/1.1\r\nHost: {host}\r\n"
+                     f"Content-Length: {MAX_BODY + 1}\r\n\r\n".encode())
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), timeout=5)
+        writer.close()
+        assert upstream.requests == 0
+    head, _, body = response.partition(b"\r\n\r\n")
+    assert head.startswith(b"HTTP/1.1 413 Payload Too Large")
+    assert json.loads(body) == {"error": "Request body too large"}
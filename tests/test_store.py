@@ -0,0 +1,65 @@
+"""
+Tests for the generated code output store
+"""
+import json
+import multiprocessing
+import os
+import stat
+from concurrent.futures import ThreadPoolExecutor
+from codeweaver.store import OutputStore
+
+PREFIX = "write a function that sorts a list of integers "
+
+def test_similar_tasks_do_not_collide(tmp_path):
+    """Test tasks sharing a long prefix get separate files"""
+    store = OutputStore(tmp_path)
+    first = store.save(PREFIX + "ascending", "def a():\n    pass")
+    second = store.save(PREFIX + "descending", "def d():\n    pass")
+    assert first != second
+    assert first.read_text() == "def a():\n    pass"
+    assert second.read_text() == "def d():\n    pass"
+    assert first.name.startswith("write_a_function_that_sorts_a")
+
+def test_resave_replaces(tmp_path):
+    """Test saving a task again replaces its file and leaves no temp files"""
+    store = OutputStore(tmp_path)
+    store.save("task", "v1", task_id="42")
+    path = store.save("task", "v2", task_id="42", model="local", elapsed=0.5)
+    assert path.read_text() == "v2"
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted([path.name, "manifest.jsonl"])
+    record = store.index()["42"]
+    assert record["file"] == path.name
+    assert record["model"] == "local"
+
+def test_file_mode(tmp_path):
+    """Test new files get the umask default mode and resaves keep an existing mode"""
+    store = OutputStore(tmp_path)
+    umask = os.umask(0)
+    os.umask(umask)
+    path = store.save("task", "v1", task_id="1")
+    assert stat.S_IMODE(path.stat().st_mode) == 0o666 & ~umask
+    path.chmod(0o640)
+    store.save("task", "v2", task_id="1")
+    assert stat.S_IMODE(path.stat().st_mode) == 0o640
+
+def _save_many(root, worker, count):
+    store = OutputStore(root)
+    for i in range(count):
+        store.save(f"task {worker}-{i}", f"# {worker}-{i}\n" * 200, task_id=f"{worker}-{i}")
+
+def test_concurrent_writers(tmp_path):
+    """Test threads and processes writing one store keep the manifest intact"""
+    with ThreadPoolExecutor(4) as pool:
+        list(pool.map(lambda worker: _save_many(tmp_path, f"t{worker}", 25), range(4)))
+    processes = [multiprocessing.Process(target=_save_many, args=(tmp_path, f"p{i}", 25))
+                 for i in range(3)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    lines = (tmp_path / "manifest.jsonl").read_text().splitlines()
+    assert len(lines) == 7 * 25
+    assert all(json.loads(line)["file"] for line in lines)
+    assert len(OutputStore(tmp_path).index()) == 7 * 25
+    assert len(list(tmp_path.glob("*.py"))) == 7 * 25
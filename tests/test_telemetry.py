@@ -0,0 +1,92 @@
+"""
+Tests for per-call telemetry and its exporters
+"""
+import io
+import json
+import urllib.request
+from codeweaver.agent import CodingAgent, CodingTask, ERROR_RESPONSE
+from codeweaver.backends import create_backend
+from codeweaver.cache import ResponseCache
+from codeweaver.mock_server import MockLLMServer
+from codeweaver.telemetry import JSONLExporter, PrometheusExporter, Telemetry
+
+def make_agent(server, *hooks, **kwargs):
+    backend = create_backend("local", base_url=server.base_url, api_key="test")
+    backend.scheduler.base_delay = 0.01
+    return CodingAgent(model=backend, system_message="sys",
+                       telemetry=Telemetry(*hooks), **kwargs)
+
+def test_generate_stages():
+    """Test a generate call reports its stages, usage and cache status"""
+    events = []
+    with MockLLMServer(latency=0.01) as server:
+        agent = make_agent(server, lambda event, record: events.append((event, record)),
+                           cache=ResponseCache())
+        agent.generate(CodingTask("Double a number"))
+        agent.generate(CodingTask("Double a number"))
+        agent.close()
+    names = [event for event, _ in events]
+    assert names[:6] == ["prompt", "cache", "backend", "extract", "validate", "call"]
+    first = events[5][1]
+    assert first.cache == "miss"
+    assert first.stages["backend"] >= 0.01
+    assert first.prompt_tokens > 0 and first.completion_tokens > 0
+    second = events[-1][1]
+    assert second.cache == "hit"
+    assert "backend" not in second.stages
+
+def test_retries_and_fallback():
+    """Test scheduler retries are counted and failures marked as fallbacks"""
+    stream = io.StringIO()
+    with MockLLMServer(latency=0, error_rate=1.0) as server:
+        agent = make_agent(server, JSONLExporter(stream))
+        assert agent.generate(CodingTask("Double a number")) == ERROR_RESPONSE
+        agent.close()
+    record = json.loads(stream.getvalue())
+    assert record["retries"] == 3
+    assert record["outcome"] == "fallback"
+    # No fallback backend was tried
+    assert "fallback" not in record["stages"]
+
+def test_failover_stage():
+    """Test time spent on fallback backends is reported as the fallback stage"""
+    records = []
+    with MockLLMServer(latency=0, error_rate=1.0, error_status=400) as primary_server, \
+            MockLLMServer(latency=0.05) as fallback_server:
+        fallback = create_backend("local", base_url=fallback_server.base_url, api_key="test")
+        fallback.name = "fallback"
+        agent = make_agent(primary_server, lambda event, record: records.append(record)
+                           if event == "call" else None, fallback=[fallback])
+        assert agent.generate(CodingTask("Double a number")) != ERROR_RESPONSE
+        agent.close()
+    record, = records
+    assert record.outcome == "ok" and record.backend == "fallback"
+    assert record.stages["fallback"] >= 0.05
+
+def test_stream_first_token():
+    """Test streams report time to first token"""
+    records = []
+    with MockLLMServer(latency=0.02, tokens_per_second=500) as server:
+        agent = make_agent(server, lambda event, record: records.append(record)
+                           if event == "call" else None)
+        "".join(agent.stream(CodingTask("Double a number")))
+        agent.close()
+    assert 0.02 <= records[0].stages["first_token"] <= records[0].total
+
+def test_prometheus_endpoint():
+    """Test metrics are aggregated and served in the text format"""
+    exporter = PrometheusExporter()
+    with MockLLMServer(latency=0) as server:
+        agent = make_agent(server, exporter)
+        for i in range(3):
+            agent.generate(CodingTask(f"task {i}"))
+        agent.close()
+    http_server = exporter.serve(port=0)
+    try:
+        url = f"http://127.0.0.1:{http_server.server_address[1]}/metrics"
+        body = urllib.request.urlopen(url).read().decode()
+    finally:
+        exporter.shutdown()
+    assert 'codeweaver_calls_total{backend="local",outcome="ok"} 3' in body
+    assert 'codeweaver_stage_seconds_count{backend="local",stage="backend"} 3' in body
+    assert "# TYPE codeweaver_stage_seconds histogram" in body
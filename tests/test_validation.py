@@ -0,0 +1,89 @@
+"""
+Tests for static validation of generated code
+"""
+from codeweaver.agent import CodingAgent, CodingTask, ERROR_RESPONSE
+from codeweaver.backends import create_backend
+from codeweaver.mock_server import DEFAULT_RESPONSE, MockLLMServer
+from codeweaver.validation import CodeValidator
+
+VALID = '''
+import math
+from collections import Counter as C
+
+class Stack:
+    """A stack"""
+    def __init__(self, items=None):
+        self.items = list(items or [])
+
+    def pop(self) -> int:
+        if not self.items:
+            raise IndexError("empty")
+        return self.items.pop()
+
+def stats(values: list, *args, **kwargs) -> dict:
+    counts = C(v for v in values)
+    try:
+        total = sum(values)
+    except TypeError as error:
+        raise ValueError(str(error))
+    if (n := len(values)):
+        mean = total / n
+    else:
+        mean = math.nan
+    return {"counts": counts, "mean": mean, "squares": [x * x for x in values]}
+
+def walk(n: int):
+    yield from range(n)
+'''
+
+def test_valid_code_passes():
+    """Test ordinary code, including comprehensions and walrus, has no problems"""
+    assert CodeValidator().validate(VALID) == []
+
+def test_syntax_errors():
+    """Test prose and code that only fails to compile are rejected"""
+    validator = CodeValidator()
+    assert validator.validate("Not a valid code block")
+    assert "outside function" in validator.validate("return 1")[0]
+
+def test_lint_checks():
+    """Test undefined names, missing returns and forbidden imports are reported"""
+    validator = CodeValidator(forbidden_imports=["subprocess", "os"])
+    problems = validator.validate(
+        "import os.path\n"
+        "from subprocess import run\n"
+        "def area(r: float) -> float:\n"
+        "    result = pi * r ** 2\n"
+    )
+    assert problems == [
+        "line 1: forbidden import 'os.path'",
+        "line 2: forbidden import 'subprocess'",
+        "line 3: function 'area' is annotated to return a value but never returns one",
+        "line 4: undefined name 'pi'",
+    ]
+    assert validator.validate("from math import *\ndef f(r):\n    return pi * r") == []
+
+def test_require_annotations():
+    """Test optional type-hint checks"""
+    validator = CodeValidator(require_annotations=True)
+    assert validator.validate("def f(x: int) -> int:\n    return x") == []
+    assert validator.validate("class A:\n    def f(self, x):\n        return x") == [
+        "line 2: function 'f' has untyped parameters: x",
+        "line 2: function 'f' has no return annotation",
+    ]
+
+def test_invalid_code_is_regenerated():
+    """Test a response failing validation is regenerated with the problems fed back"""
+    def respond(prompt):
+        return DEFAULT_RESPONSE if "A previous attempt" in prompt else "def f():\n    return x"
+
+    with MockLLMServer(latency=0, response=respond) as server:
+        backend = create_backend("local", base_url=server.base_url, api_key="test")
+        agent = CodingAgent(model=backend, system_message="sys")
+        assert "return n * 2" in agent.generate(CodingTask("Double a number"))
+        assert server.requests == 2
+        assert "undefined name 'x'" in server.prompts[1]
+
+        agent.regenerate = 0
+        assert agent.generate(CodingTask("Return x")) == ERROR_RESPONSE
+        agent.close()
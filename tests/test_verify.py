@@ -0,0 +1,108 @@
+"""
+Tests for generate-test-repair with parallel candidates
+"""
+import asyncio
+import itertools
+from codeweaver.agent import CodingAgent, CodingTask
+from codeweaver.backends import Completion, ModelBackend
+from codeweaver.sandbox import SandboxPool
+
+CORRECT = "def add(a, b):\n    return a + b"
+WRONG = "def add(a, b):\n    return a - b"
+TESTS = "assert add(2, 3) == 5"
+
+class ScriptedBackend(ModelBackend):
+    """Backend answering with a scripted sequence of code, repaired on request"""
+    name = "scripted"
+    supports_streaming = False
+
+    def __init__(self, answers, repaired=CORRECT, delay=0.0):
+        super().__init__()
+        self.answers = itertools.cycle(answers)
+        self.repaired = repaired
+        self.delay = delay
+        self.prompts = []
+
+    async def _complete(self, system, prompt, **params):
+        self.prompts.append(prompt)
+        answer = self.repaired if "A previous attempt" in prompt else next(self.answers)
+        await asyncio.sleep(self.delay)
+        return Completion(f"```python\n{answer}\n```")
+
+def make_agent(backend):
+    return CodingAgent(model=backend, system_message="sys", sandbox=SandboxPool(size=2))
+
+async def test_first_passing_candidate_wins():
+    """Test a passing candidate is returned without a repair round"""
+    backend = ScriptedBackend([WRONG, CORRECT, WRONG])
+    agent = make_agent(backend)
+    result = await agent.agenerate_verified(CodingTask("add two numbers"), TESTS, candidates=3)
+    assert result.passed
+    assert result.code == CORRECT
+    assert result.rounds == 1
+    assert len(backend.prompts) == 3
+    await agent.sandbox.close()
+
+async def test_candidates_tested_in_parallel():
+    """Test candidates' test runs overlap on the sandbox pool"""
+    backend = ScriptedBackend([WRONG, WRONG, CORRECT])
+    agent = CodingAgent(model=backend, system_message="sys", sandbox=SandboxPool(size=3))
+    await agent.sandbox.start()
+    run = agent.sandbox.run
+    running = peak = 0
+
+    async def counted_run(*args, **kwargs):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        try:
+            return await run(*args, **kwargs)
+        finally:
+            running -= 1
+
+    agent.sandbox.run = counted_run
+    slow_tests = "import time\ntime.sleep(0.5)\n" + TESTS
+    result = await agent.agenerate_verified(CodingTask("add two numbers"), slow_tests,
+                                            candidates=3, repair_rounds=0)
+    assert result.passed
+    assert peak == 3
+    await agent.sandbox.close()
+
+async def test_repair_round():
+    """Test failing output is fed back and the repaired code is verified"""
+    backend = ScriptedBackend([WRONG])
+    agent = make_agent(backend)
+    result = await agent.agenerate_verified(CodingTask("add two numbers"), TESTS,
+                                            candidates=2, repair_rounds=1)
+    assert result.passed
+    assert result.rounds == 2
+    assert "AssertionError" in result.failures[0]
+    assert "AssertionError" in backend.prompts[-1]
+    assert backend.prompts[-1].rstrip().endswith("Return a corrected version of the code.")
+    await agent.sandbox.close()
+
+async def test_unittest_cases():
+    """Test unittest.TestCase classes in the tests are run"""
+    tests = (
+        "import unittest\n"
+        "class TestAdd(unittest.TestCase):\n"
+        "    def test_add(self):\n"
+        "        self.assertEqual(add(2, 3), 5)\n"
+    )
+    agent = make_agent(ScriptedBackend([WRONG], repaired=WRONG))
+    result = await agent.agenerate_verified(CodingTask("add two numbers"), tests,
+                                            candidates=1, repair_rounds=1)
+    assert not result.passed
+    assert result.rounds == 2
+    assert result.candidates == 2
+    assert "FAILED" in result.output
+    await agent.sandbox.close()
+
+def test_generate_verified_blocking():
+    """Test the blocking wrapper starts and closes its own sandbox"""
+    agent = CodingAgent(model=ScriptedBackend([CORRECT]), system_message="sys")
+    result = agent.generate_verified(CodingTask("add two numbers"), TESTS, candidates=2)
+    assert result.passed
+    assert agent.sandbox is not None
+    agent.close()
+    assert agent.sandbox is None
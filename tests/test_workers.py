@@ -0,0 +1,59 @@
+"""
+Tests for the worker pools CPU-bound stages are offloaded to
+"""
+import asyncio
+import os
+import time
+import pytest
+from codeweaver.agent import CodingAgent, CodingTask
+from codeweaver.backends import create_backend
+from codeweaver.extraction import extract_code
+from codeweaver.mock_server import MockLLMServer
+from codeweaver.workers import WorkerPool
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+    return seconds
+
+def busy_when_released(release, seconds):
+    """Wait until the release file exists, then spin for a while"""
+    while not os.path.exists(release):
+        time.sleep(0.005)
+    return busy(seconds)
+
+@pytest.mark.parametrize("kind", ["thread", "process"])
+async def test_pool_stats(kind, tmp_path):
+    """Test calls run on the pool and its queue depth and utilization are tracked"""
+    release = tmp_path / "release"
+    with WorkerPool(kind, workers=2) as pool:
+        assert await pool.run(extract_code, "```python\nx = 1\n```") == "x = 1"
+        calls = [asyncio.ensure_future(pool.run(busy_when_released, str(release), 0.05))
+                 for _ in range(6)]
+        # No call can finish before the release, so the depth settles at 4
+        deadline = time.monotonic() + 5
+        while pool.queue_depth != 4 and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        assert pool.queue_depth == 4
+        release.touch()
+        await asyncio.gather(*calls)
+        stats = pool.stats()
+    assert stats["submitted"] == stats["completed"] == 7
+    assert stats["queue_depth"] == 0
+    assert stats["busy_seconds"] >= 0.3
+    assert 0 < stats["utilization"] <= 1
+
+def test_agent_offloads_stages():
+    """Test the agent runs extraction and validation on the given pools"""
+    with pytest.raises(ValueError):
+        CodingAgent(model="local", offload={"format": WorkerPool()})
+    with MockLLMServer(latency=0) as server, WorkerPool("process", workers=1) as processes, \
+            WorkerPool("thread", workers=1) as threads:
+        backend = create_backend("local", base_url=server.base_url, api_key="test")
+        agent = CodingAgent(model=backend, system_message="sys",
+                            offload={"extract": processes, "validate": threads})
+        results = list(agent.generate_many([CodingTask(f"task {i}") for i in range(4)]))
+        agent.close()
+    assert all("return n * 2" in result.code for result in results)
+    assert processes.completed == 4 and threads.completed == 4